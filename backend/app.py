@@ -5,17 +5,45 @@ Integração com Supabase para autenticação e banco de dados
 """
 
 import os
+import re
 import uuid
 import asyncio
 import time
 import io
 import jwt
+import json
 import base64
+import hashlib
+import shutil
 import threading
+import mimetypes
+import requests
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from functools import wraps
-from flask import Flask, request, jsonify, send_file, after_this_request
+from werkzeug.security import safe_join
+from werkzeug.middleware.proxy_fix import ProxyFix
+from flask import Flask, Response, request, jsonify, send_file, after_this_request
 # from flask_cors import CORS
+import aiohttp
 import edge_tts
+from disk_cache import DiskLRUCache, content_key
+from db import Database
+from storage import (
+    DATA_DIR, UPLOADS_DIR, COVERS_DIR, AUDIO_UPLOADS_DIR, DB_PATH, AUDIO_UPLOADS_URL_PREFIX,
+    migrate_track_columns, uploaded_audio_path
+)
+from catalog_search import create_search_index, search_audiobooks
+from job_store import JobStore, current_worker_id
+from job_scheduler import FairScheduler
+from background_loop import BackgroundLoop
+from chunker import iter_chunks, provider_limit
+from mp3_frames import Mp3ConcatWriter, OrderedChunkWriter, probe_mp3
+from file_serving import send_ranged_file, UPLOADS_OFFLOAD
+from text_cleanup import LineJoiner, clean_extracted_text, TEXT_CLEANUP_VERSION, CHAPTER_HEADING_RE
+from resumable_uploads import UploadSessionStore, UploadError
+from cover_images import PIL_SUPPORT, COVER_RENDITIONS, COVER_RENDITIONS_VERSION, process_cover, rendition_path
 
 # Google Cloud TTS
 try:
@@ -29,12 +57,9 @@ except ImportError:
 import sqlite3
 from datetime import datetime
 
-# Configuração de Armazenamento Local
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UPLOADS_DIR = os.path.join(BASE_DIR, 'uploads')
-COVERS_DIR = os.path.join(UPLOADS_DIR, 'covers')
-AUDIO_UPLOADS_DIR = os.path.join(UPLOADS_DIR, 'audiobooks')
-DB_PATH = os.path.join(BASE_DIR, 'audiobooks.db')
+# Configuração de Armazenamento Local (caminhos em storage.py, compartilhados com os scripts)
+# Conexão por thread, reaproveitada entre requisições (WAL + pragmas, ver db.py)
+DB = Database(DB_PATH)
 
 # Cria diretórios se não existirem
 os.makedirs(COVERS_DIR, exist_ok=True)
@@ -42,7 +67,7 @@ os.makedirs(AUDIO_UPLOADS_DIR, exist_ok=True)
 
 def init_db():
     """Inicializa o banco de dados SQLite local"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = DB.connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -73,6 +98,9 @@ def init_db():
             label TEXT NOT NULL,
             audio_url TEXT NOT NULL,
             duration_seconds REAL DEFAULT 0,
+            bitrate INTEGER,
+            frame_count INTEGER,
+            position INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (audiobook_id) REFERENCES audiobooks(id) ON DELETE CASCADE
         )
@@ -95,13 +123,38 @@ def init_db():
         # mas podemos apenas ignorar ou criar nova tabela)
         # Por segurança no ambiente de produção do usuário, vamos apenas manter mas ignorar.
         print(f"✅ Migrados {len(existing)} áudios!")
+    
+    # Migração: metadados do MP3 e posição da faixa (ver storage.TRACK_MIGRATED_COLUMNS)
+    migrate_track_columns(cursor)
+
+    # Ordem de exibição sempre preenchida: o catálogo ordena e pagina direto pelo índice
+    cursor.execute("UPDATE audiobooks SET display_order = 0 WHERE display_order IS NULL")
+    # Índices das consultas do catálogo (lista paginada, filtro por categoria e faixas por projeto)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_audiobooks_display_order "
+        "ON audiobooks (display_order, created_at DESC, id DESC)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_audiobooks_category "
+        "ON audiobooks (category_id, display_order, created_at DESC, id DESC)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_audiobook_tracks_audiobook "
+        "ON audiobook_tracks (audiobook_id, position)"
+    )
         
     conn.commit()
-    conn.close()
     print("✅ Banco de dados SQLite inicializado!")
 
 init_db()
 
+# Busca do catálogo (FTS5); sem FTS5 no SQLite do sistema, a busca usa LIKE
+FTS_ENABLED = create_search_index(DB.connection())
+if FTS_ENABLED:
+    print("✅ Busca FTS5 do catálogo ativa!")
+else:
+    print("⚠️ SQLite sem FTS5: busca do catálogo via LIKE (sem ranking)")
+
 # Mantemos as variáveis SUPABASE apenas para não quebrar referências se houverem, 
 # mas marcamos como False para desativar a lógica antiga.
 SUPABASE_ENABLED = False
@@ -111,6 +164,7 @@ SUPABASE_JWT_SECRET = os.environ.get('SUPABASE_JWT_SECRET', 'xt9aS00eMoQzMeJrL5z
 # Imports para leitura de documentos
 try:
     import PyPDF2
+    from pdf_pages import iter_pdf_pages, pdf_page_count
     PDF_SUPPORT = True
 except ImportError:
     PDF_SUPPORT = False
@@ -123,6 +177,11 @@ except ImportError:
 
 
 app = Flask(__name__)
+# Quantos proxies reversos (Nginx) ficam na frente do gunicorn. Só os N últimos valores de
+# X-Forwarded-For/-Proto são confiáveis: o resto pode ter vindo do cliente. 0 = acesso direto.
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 1))
+if TRUSTED_PROXY_HOPS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
 # CORS desativado no Flask pois o Nginx já gerencia os headers (evita erro '*, *')
 # CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 
@@ -133,14 +192,41 @@ app = Flask(__name__)
 #     return response
 
 
+@app.teardown_request
+def release_db_connection(exc):
+    # A conexão da thread continua aberta para a próxima requisição; só não pode levar transação pendente
+    DB.release()
+
+
 # Diretório para arquivos temporários
-TEMP_DIR = os.path.join(os.path.dirname(__file__), 'temp_audio')
+TEMP_DIR = os.path.join(DATA_DIR, 'temp_audio')
 os.makedirs(TEMP_DIR, exist_ok=True)
 
 # ==================== SISTEMA DE JOBS EM BACKGROUND ====================
-# Armazena o status dos jobs de geração de áudio
-# Formato: { job_id: { 'status': 'pending'|'processing'|'done'|'error', 'progress': 0-100, 'file_path': str, 'error': str } }
-JOBS = {}
+# Status dos jobs de geração de áudio, persistido no SQLite (compartilhado entre workers)
+# Campos: status 'pending'|'processing'|'done'|'error', progress 0-100, file_path, error, timings
+# Notificação em processo: streams de eventos acordam assim que um job muda
+# (mudanças feitas por outros processos são vistas no próximo ciclo de consulta)
+JOB_EVENTS = threading.Condition()
+
+
+def notify_job_change(job_id: str):
+    with JOB_EVENTS:
+        JOB_EVENTS.notify_all()
+
+
+# Jobs encerrados ficam disponíveis por este tempo (segundos, a partir do fim), ou 1 hora após o download
+JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', 24 * 3600))
+JOB_STORE = JobStore(DB, on_change=notify_job_change, retention_seconds=JOB_RETENTION_SECONDS)
+# Cada processo registra um batimento; jobs de processos sem batimento são retomados por outro
+JOB_HEARTBEAT_SECONDS = int(os.environ.get('JOB_HEARTBEAT_SECONDS', 30))
+JOB_STALE_SECONDS = JOB_HEARTBEAT_SECONDS * 3
+
+# ==================== CACHE DE SÍNTESE ====================
+# Áudios já gerados, indexados por hash de (texto normalizado, voz, provedor, config de áudio)
+SYNTHESIS_CACHE_DIR = os.path.join(DATA_DIR, 'cache', 'synthesis')
+SYNTHESIS_CACHE_MAX_MB = int(os.environ.get('SYNTHESIS_CACHE_MAX_MB', 2048))
+SYNTHESIS_CACHE = DiskLRUCache(SYNTHESIS_CACHE_DIR, SYNTHESIS_CACHE_MAX_MB * 1024 * 1024, suffix='.mp3')
 
 
 # ==================== VOZES DISPONÍVEIS ====================
@@ -171,6 +257,34 @@ if GOOGLE_API_KEY:
     AVAILABLE_VOICES.update(GOOGLE_VOICES)
     print("✅ Vozes Google Cloud TTS habilitadas!")
 
+# Edge-TTS: tamanho de cada chunk (bytes) e quantos são sintetizados ao mesmo tempo
+EDGE_CHUNK_LIMIT = int(os.environ.get('EDGE_CHUNK_LIMIT', 3000))
+EDGE_MAX_CONCURRENCY = int(os.environ.get('EDGE_MAX_CONCURRENCY', 4))
+EDGE_CHUNK_RETRIES = int(os.environ.get('EDGE_CHUNK_RETRIES', 2))
+# Total de conexões simultâneas ao Edge por processo (somando todos os jobs)
+EDGE_MAX_CONNECTIONS = int(os.environ.get('EDGE_MAX_CONNECTIONS', 16))
+
+# Google TTS: endpoint REST, paralelismo das requisições e configuração de áudio
+GOOGLE_TTS_API_URL = os.environ.get('GOOGLE_TTS_API_URL', 'https://texttospeech.googleapis.com/v1/text:synthesize')
+GOOGLE_MAX_CONCURRENCY = int(os.environ.get('GOOGLE_MAX_CONCURRENCY', 8))
+GOOGLE_CHUNK_LIMIT = int(os.environ.get('GOOGLE_CHUNK_LIMIT', 4500))
+GOOGLE_TTS_TIMEOUT = int(os.environ.get('GOOGLE_TTS_TIMEOUT', 60))
+# Novas tentativas por chunk em falhas temporárias (limite de taxa, erro 5xx, conexão/timeout)
+GOOGLE_CHUNK_RETRIES = int(os.environ.get('GOOGLE_CHUNK_RETRIES', 2))
+GOOGLE_RETRY_BACKOFF_SECONDS = float(os.environ.get('GOOGLE_RETRY_BACKOFF_SECONDS', 1.5))
+GOOGLE_RETRY_STATUSES = (429, 500, 502, 503, 504)
+GOOGLE_AUDIO_CONFIG = {
+    "audioEncoding": "MP3",
+    "sampleRateHertz": 24000,
+    "speakingRate": 1.0,
+    "pitch": 0.0
+}
+
+# Janela de síntese: um chunk só começa se estiver a menos de (paralelismo x fator) chunks do
+# primeiro ainda não entregue. Limita quantos chunks prontos esperam em memória pela vez de serem
+# gravados (OrderedChunkWriter) quando um chunk do começo demora ou é refeito
+SYNTHESIS_WINDOW_FACTOR = int(os.environ.get('SYNTHESIS_WINDOW_FACTOR', 2))
+
 # Textos de preview para cada idioma
 PREVIEW_TEXTS = {
     'pt-BR': 'Olá! Ouça como soa a minha voz no AudioLoop.',
@@ -181,176 +295,592 @@ PREVIEW_TEXTS = {
 
 # ==================== FUNÇÕES DE GERAÇÃO DE ÁUDIO ====================
 
-async def generate_audio_edge(text: str, voice: str, output_path: str):
-    """Gera áudio usando Edge-TTS (Microsoft)"""
+class JobCancelled(Exception):
+    """Levantada quando um job é cancelado durante a geração"""
+
+
+def update_job_progress(job_id: str, progress: int, **fields):
+    """Atualiza o progresso de um job (se existir)"""
+    if job_id:
+        JOB_STORE.update(job_id, progress=progress, **fields)
+
+
+def chunk_progress_reporter(job_id: str, total: int, already_done: int = 0, labels=None):
+    """
+    Cria o callback on_chunk_done(i, audio) usado pelos provedores:
+    loga cada chunk recebido e atualiza o progresso real do job (de 5% a 95%)
+    """
+    lock = threading.Lock()
+    state = {'done': already_done}
+
+    def on_chunk_done(i, audio):
+        # A gravação fica dentro do lock: os chunks chegam por várias threads e, fora dele,
+        # um contador antigo poderia ser gravado depois de um mais novo (progresso voltando)
+        with lock:
+            state['done'] += 1
+            done = state['done']
+            update_job_progress(job_id, 5 + int((done / total) * 90), chunks_done=done, chunks_total=total)
+        label = labels[i] if labels else i + 1
+        print(f"✅ Chunk {label}/{total} recebido ({len(audio)} bytes)", flush=True)
+
+    return on_chunk_done
+
+
+def ordered_chunk_sink(writer: Mp3ConcatWriter, job_id: str, total: int):
+    """Callback on_chunk_done que grava os chunks no writer na ordem do texto e reporta o progresso"""
+    ordered = OrderedChunkWriter(writer)
+    report = chunk_progress_reporter(job_id, total)
+
+    def on_chunk_done(i, audio):
+        ordered.add(i, audio)
+        report(i, audio)
+
+    return on_chunk_done
+
+
+class SharedTCPConnector(aiohttp.TCPConnector):
+    """
+    Connector reaproveitado por todas as chamadas ao Edge-TTS.
+    O edge-tts cria uma ClientSession por chamada e a fecha no fim, o que fecharia
+    o connector junto; aqui o close() vira no-op para ele sobreviver entre requisições.
+    """
+
+    def close(self, **kwargs):
+        return _noop()
+
+
+async def _noop():
+    return None
+
+
+_edge_connector = None
+_edge_connector_loop = None
+
+
+def get_edge_connector():
+    """
+    Connector compartilhado (criado dentro do loop persistente): mantém cache de DNS
+    e limita o total de conexões simultâneas ao Edge entre todos os jobs do processo.
+    O serviço encerra o websocket ao fim de cada síntese, então o handshake em si não
+    é reaproveitável; o que se reaproveita é o que o provedor permite.
+    """
+    global _edge_connector, _edge_connector_loop
+    loop = asyncio.get_running_loop()
+    if _edge_connector is None or _edge_connector_loop is not loop:
+        _edge_connector = SharedTCPConnector(
+            limit=EDGE_MAX_CONNECTIONS,
+            ttl_dns_cache=600
+        )
+        _edge_connector_loop = loop
+    return _edge_connector
+
+
+async def synthesize_chunk_edge(chunk: str, voice: str) -> bytes:
+    """Sintetiza um único chunk com Edge-TTS e retorna os bytes MP3"""
+    last_error = None
+    for attempt in range(EDGE_CHUNK_RETRIES + 1):
+        try:
+            # Simplificado para evitar erros de 'Invalid pitch'.
+            # O edge-tts já gera áudio otimizado por padrão.
+            communicate = edge_tts.Communicate(chunk, voice, connector=get_edge_connector())
+            audio = bytearray()
+            async for message in communicate.stream():
+                if message['type'] == 'audio':
+                    audio.extend(message['data'])
+            return bytes(audio)
+        except Exception as e:
+            last_error = e
+            if attempt < EDGE_CHUNK_RETRIES:
+                await asyncio.sleep(1.5 * (attempt + 1))
+    raise last_error
+
+
+async def synthesize_chunks_edge(chunks: list, voice: str, on_chunk_done=None, should_stop=None):
+    """
+    Sintetiza vários chunks em paralelo (limitado por semáforo e pela janela de síntese).
+    Cada chunk é entregue a on_chunk_done(i, audio) assim que fica pronto (sem acumular o livro em memória).
+    Os callbacks bloqueiam (SQLite, disco, fsync) e rodam em threads: o loop é compartilhado por
+    todos os jobs e previews (BackgroundLoop) e não pode parar esperando I/O de um job.
+    """
+    semaphore = asyncio.Semaphore(EDGE_MAX_CONCURRENCY)
+    window = EDGE_MAX_CONCURRENCY * SYNTHESIS_WINDOW_FACTOR
+    callbacks = set()
+
+    async def render(i, chunk):
+        async with semaphore:
+            # Job cancelado: não faz mais chamadas ao provedor
+            if should_stop and await asyncio.to_thread(should_stop):
+                raise JobCancelled()
+            audio = await synthesize_chunk_edge(chunk, voice)
+        if on_chunk_done:
+            callback = asyncio.ensure_future(asyncio.to_thread(on_chunk_done, i, audio))
+            callbacks.add(callback)
+            # shield: cancelar o chunk não interrompe uma gravação que já começou
+            await asyncio.shield(callback)
+
+    # Os chunks são entregues em ordem: o chunk i só é disparado depois que i - window foi entregue
+    tasks = []
     try:
-        # Simplificado para evitar erros de 'Invalid pitch'. 
-        # O edge-tts já gera áudio otimizado por padrão.
-        communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(output_path)
+        for i in range(len(chunks)):
+            while len(tasks) < min(len(chunks), i + window):
+                tasks.append(asyncio.ensure_future(render(len(tasks), chunks[len(tasks)])))
+            await tasks[i]
+    except BaseException:
+        # Um chunk falhou definitivamente (ou o job foi cancelado): cancela os que ainda estão rodando
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # e espera as gravações em andamento antes de quem chamou fechar/descartar o writer
+        await asyncio.gather(*callbacks, return_exceptions=True)
+        raise
+
+
+async def generate_audio_edge(text: str, voice: str, output_path: str, job_id: str = None):
+    """Gera áudio usando Edge-TTS (Microsoft), sintetizando chunks em paralelo"""
+    try:
+        chunks = split_text_for_google(text, limit=provider_chunk_limit('edge'))
+        if not chunks:
+            raise Exception("Texto vazio após normalização")
+
+        print(f"🔄 Processando {len(chunks)} partes com Edge-TTS (até {EDGE_MAX_CONCURRENCY} simultâneas)...", flush=True)
+
+        # Cada chunk vai para o arquivo assim que chega (na ordem original)
+        with Mp3ConcatWriter(output_path) as writer:
+            await synthesize_chunks_edge(chunks, voice, ordered_chunk_sink(writer, job_id, len(chunks)))
+
+        update_job_progress(job_id, 100)
+        print(f"✅ Áudio Edge gerado e combinado: {voice} ({len(chunks)} partes, {writer.duration:.0f}s)")
     except Exception as e:
         print(f"❌ Erro no edge-tts: {str(e)}")
         raise e
 
 
 def split_text_for_google(text, limit=4500):
-    """Divide o texto em chunks respeitando o limite de bytes do Google"""
-    chunks = []
-    current_chunk = ""
-    
-    # Normaliza quebras de linha
-    text = text.replace('\r\n', '\n').replace('\r', '\n')
-    
-    # Divide primeiro por parágrafos para preservar estrutura
-    paragraphs = text.split('\n')
-    
-    for para in paragraphs:
-        if not para.strip():
-            continue
-            
-        # Se adicionar o parágrafo estourar o limite
-        if len((current_chunk + "\n" + para).encode('utf-8')) > limit:
-            # Se tem algo no buffer, salva
-            if current_chunk.strip():
-                chunks.append(current_chunk.strip())
-                current_chunk = ""
-            
-            # Se o parágrafo sozinho é maior que o limite, divide por frases
-            if len(para.encode('utf-8')) > limit:
-                import re
-                # Split por pontuação final (. ? !)
-                sentences = re.split(r'(?<=[.!?])\s+', para)
-                for sent in sentences:
-                    if len((current_chunk + " " + sent).encode('utf-8')) > limit:
-                        if current_chunk:
-                            chunks.append(current_chunk)
-                            current_chunk = ""
-                        # Se a frase sozinha é gigante (muito raro), corta na força bruta
-                        if len(sent.encode('utf-8')) > limit:
-                             # Corta a cada limit caracteres (aproximado)
-                             while sent:
-                                 part = sent[:limit]
-                                 # Tenta não cortar palavra no meio
-                                 last_space_idx = part.rfind(' ')
-                                 if last_space_idx > limit - 100:
-                                     part = sent[:last_space_idx]
-                                     sent = sent[last_space_idx:].strip()
-                                 else:
-                                     # Se não achar espaço, corta bruto
-                                     sent = sent[len(part):].strip()
-                                 chunks.append(part)
-                        else:
-                            current_chunk = sent
-                    else:
-                        current_chunk += (" " if current_chunk else "") + sent
-            else:
-                current_chunk = para
-        else:
-            current_chunk += ("\n" if current_chunk else "") + para
-            
-    if current_chunk:
-        chunks.append(current_chunk)
-        
-    return chunks
+    """Divide o texto em chunks respeitando o limite de bytes do Google (ver chunker.iter_chunks)"""
+    return list(iter_chunks(text, limit))
 
 
-def generate_audio_google(text: str, voice_name: str, output_path: str, job_id: str = None):
-    """Gera áudio usando Google Cloud TTS via REST API com suporte a textos longos"""
-    import requests
-    import base64
-    
-    # Função auxiliar para atualizar progresso
-    def update_progress(p):
-        if job_id and job_id in JOBS:
-            JOBS[job_id]['progress'] = p
+_google_session = None
+_google_session_lock = threading.Lock()
+
 
+def get_google_session():
+    """Sessão HTTP compartilhada (keep-alive) para as chamadas ao Google TTS"""
+    global _google_session
+    with _google_session_lock:
+        if _google_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=GOOGLE_MAX_CONCURRENCY
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _google_session = session
+        return _google_session
+
+
+def synthesize_chunk_google(chunk: str, voice_name: str, api_key: str, should_stop=None) -> bytes:
+    """
+    Sintetiza um único chunk com a API REST do Google e retorna os bytes MP3.
+    Entre as tentativas, should_stop() é consultado: um job cancelado não espera os retries.
+    """
+    # Configuração da voz
+    language_code = voice_name.split('-')[0] + '-' + voice_name.split('-')[1]  # ex: pt-BR
+
+    # Payload para a API
+    payload = {
+        "input": {"text": chunk},
+        "voice": {
+            "languageCode": language_code,
+            "name": voice_name
+        },
+        "audioConfig": GOOGLE_AUDIO_CONFIG
+    }
+
+    last_error = None
+    for attempt in range(GOOGLE_CHUNK_RETRIES + 1):
+        try:
+            # Chamada à API (reaproveita a conexão TLS do pool)
+            response = get_google_session().post(
+                f"{GOOGLE_TTS_API_URL}?key={api_key}",
+                json=payload,
+                timeout=GOOGLE_TTS_TIMEOUT
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            last_error = e
+        else:
+            if response.status_code == 200:
+                return base64.b64decode(response.json()['audioContent'])
+            try:
+                error_msg = response.json().get('error', {}).get('message', 'Erro desconhecido')
+            except ValueError:
+                error_msg = f'HTTP {response.status_code}'
+            last_error = Exception(error_msg)
+            # Erros do pedido (texto inválido, chave sem permissão...) não melhoram tentando de novo
+            if response.status_code not in GOOGLE_RETRY_STATUSES:
+                raise last_error
+        if attempt < GOOGLE_CHUNK_RETRIES:
+            if should_stop and should_stop():
+                raise JobCancelled()
+            time.sleep(GOOGLE_RETRY_BACKOFF_SECONDS * (attempt + 1))
+            if should_stop and should_stop():
+                raise JobCancelled()
+    raise last_error
+
+
+def synthesize_chunks_google(chunks: list, voice_name: str, on_chunk_done=None, should_stop=None):
+    """
+    Sintetiza vários chunks em paralelo (pool de threads limitado e janela de síntese).
+    Cada chunk é entregue a on_chunk_done(i, audio) assim que fica pronto (sem acumular o livro em memória).
+    """
     GOOGLE_API_KEY = os.environ.get('GOOGLE_TTS_API_KEY', '')
     
     if not GOOGLE_API_KEY:
         raise Exception("GOOGLE_TTS_API_KEY não configurada")
     
+    def render(i):
+        # Job cancelado: não faz mais chamadas ao provedor
+        if should_stop and should_stop():
+            raise JobCancelled()
+        try:
+            chunk_content = synthesize_chunk_google(chunks[i], voice_name, GOOGLE_API_KEY, should_stop)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            print(f"❌ Erro no chunk {i+1}: {e}")
+            raise Exception(f"Google TTS API error (Chunk {i+1}): {e}")
+        if on_chunk_done:
+            on_chunk_done(i, chunk_content)
+    
+    window = GOOGLE_MAX_CONCURRENCY * SYNTHESIS_WINDOW_FACTOR
+    executor = ThreadPoolExecutor(max_workers=GOOGLE_MAX_CONCURRENCY)
+    try:
+        # Os chunks são entregues em ordem: o chunk i só é enviado depois que i - window foi entregue
+        futures = {}
+        submitted = 0
+        for i in range(len(chunks)):
+            while submitted < min(len(chunks), i + window):
+                futures[submitted] = executor.submit(render, submitted)
+                submitted += 1
+            futures.pop(i).result()
+    finally:
+        # Em caso de erro, não dispara os chunks que ainda estão na fila
+        # (e não espera as requisições em andamento para liberar o worker na hora)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def generate_audio_google(text: str, voice_name: str, output_path: str, job_id: str = None):
+    """Gera áudio usando Google Cloud TTS via REST API com suporte a textos longos"""
     try:
-        # Configuração da voz
-        language_code = voice_name.split('-')[0] + '-' + voice_name.split('-')[1]  # ex: pt-BR
-        
-        # URL API REST
-        url = f"https://texttospeech.googleapis.com/v1/text:synthesize?key={GOOGLE_API_KEY}"
-        
         # Divide o texto em pedaços seguros
-        chunks = split_text_for_google(text)
-        combined_audio = b""
+        chunks = [c for c in split_text_for_google(text, limit=provider_chunk_limit('google')) if c.strip()]
         
-        print(f"🔄 Processando {len(chunks)} partes com Google TTS...", flush=True)
+        print(f"🔄 Processando {len(chunks)} partes com Google TTS (até {GOOGLE_MAX_CONCURRENCY} simultâneas)...", flush=True)
         
-        for i, chunk in enumerate(chunks):
-            if not chunk.strip():
-                continue
-
-            # Atualiza progresso real (ex: de 5% a 95%)
-            real_progress = 5 + int((i / len(chunks)) * 90)
-            update_progress(real_progress)
-            
-            # Payload para a API
-            payload = {
-                "input": {"text": chunk},
-                "voice": {
-                    "languageCode": language_code,
-                    "name": voice_name
-                },
-                "audioConfig": {
-                    "audioEncoding": "MP3",
-                    "sampleRateHertz": 24000,
-                    "speakingRate": 1.0,
-                    "pitch": 0.0
-                }
-            }
-            
-            # Chamada à API
-            response = requests.post(url, json=payload)
-            
-            if response.status_code != 200:
-                error_msg = response.json().get('error', {}).get('message', 'Erro desconhecido')
-                print(f"❌ Erro no chunk {i+1}: {error_msg}")
-                raise Exception(f"Google TTS API error (Chunk {i+1}): {error_msg}")
+        # Cada chunk vai para o arquivo assim que chega (na ordem dos chunks)
+        with Mp3ConcatWriter(output_path) as writer:
+            synthesize_chunks_google(chunks, voice_name, ordered_chunk_sink(writer, job_id, len(chunks)))
             
-            # Decodifica e concatena
-            chunk_content = base64.b64decode(response.json()['audioContent'])
-            combined_audio += chunk_content
-            
-            # Log de progresso
-            print(f"✅ Chunk {i+1}/{len(chunks)} recebido ({len(chunk_content)} bytes)", flush=True)
-            
-        # Salva o arquivo final
-        with open(output_path, "wb") as out:
-            out.write(combined_audio)
-            
-        update_progress(100)
-        print(f"✅ Áudio Google gerado e combinado: {voice_name} ({len(chunks)} partes)")
+        update_job_progress(job_id, 100)
+        print(f"✅ Áudio Google gerado e combinado: {voice_name} ({len(chunks)} partes, {writer.duration:.0f}s)")
         
     except Exception as e:
         print(f"❌ Erro no Google TTS: {str(e)}")
         raise e
 
 
-def generate_audio(text: str, voice: str, output_path: str, job_id: str = None):
-    """Função principal que escolhe o provedor correto"""
+def get_voice_provider(voice: str) -> str:
+    """Retorna o provedor efetivo ('edge' ou 'google') usado para a voz"""
     voice_config = AVAILABLE_VOICES.get(voice, {})
     provider = voice_config.get('provider', 'edge') if isinstance(voice_config, dict) else 'edge'
-    
     if provider == 'google' and os.environ.get('GOOGLE_TTS_API_KEY'):
+        return 'google'
+    return 'edge'
+
+
+def provider_audio_config(provider: str) -> str:
+    """Descrição estável da configuração de áudio do provedor (entra nas chaves de cache)"""
+    if provider == 'google':
+        return repr(sorted(GOOGLE_AUDIO_CONFIG.items()))
+    return f'edge-default:{EDGE_CHUNK_LIMIT}'
+
+
+def provider_chunk_limit(provider: str) -> int:
+    """Tamanho máximo (bytes) de cada chunk enviado ao provedor"""
+    configured = GOOGLE_CHUNK_LIMIT if provider == 'google' else EDGE_CHUNK_LIMIT
+    return provider_limit(provider, configured)
+
+
+def synthesize_chunks(chunks: list, voice: str, on_chunk_done=None, should_stop=None):
+    """Sintetiza uma lista de chunks com o provedor da voz; on_chunk_done(i, audio) recebe cada um"""
+    if get_voice_provider(voice) == 'google':
+        return synthesize_chunks_google(chunks, voice, on_chunk_done, should_stop)
+    return run_async(synthesize_chunks_edge(chunks, voice, on_chunk_done, should_stop))
+
+
+def normalize_text_for_cache(text: str) -> str:
+    """Normaliza o texto para que variações irrelevantes (espaços, quebras de linha) gerem o mesmo hash"""
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    lines = (' '.join(line.split()) for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def synthesis_cache_key(text: str, voice: str) -> str:
+    """Chave do cache de síntese para o par texto/voz"""
+    provider = get_voice_provider(voice)
+    return content_key(normalize_text_for_cache(text), voice, provider, provider_audio_config(provider))
+
+
+# ==================== GERAÇÃO INCREMENTAL ====================
+# Para documentos com document_id, cada chunk sintetizado vira um segmento guardado por hash.
+# Um manifesto por (documento, voz) registra a lista de hashes da última versão gerada;
+# ao reenviar o texto revisado, só os chunks cujo hash mudou são sintetizados de novo.
+SEGMENTS_DIR = os.path.join(DATA_DIR, 'cache', 'segments')
+MANIFESTS_DIR = os.path.join(DATA_DIR, 'cache', 'manifests')
+SEGMENT_CACHE_MAX_MB = int(os.environ.get('SEGMENT_CACHE_MAX_MB', 4096))
+SEGMENT_CACHE = DiskLRUCache(SEGMENTS_DIR, SEGMENT_CACHE_MAX_MB * 1024 * 1024, suffix='.mp3')
+os.makedirs(MANIFESTS_DIR, exist_ok=True)
+
+# Em média, 1 a cada N parágrafos fecha uma seção (fronteira estável entre versões)
+INCREMENTAL_ANCHOR_EVERY = int(os.environ.get('INCREMENTAL_ANCHOR_EVERY', 4))
+
+
+def split_text_incremental(text: str, limit: int) -> list:
+    """
+    Divide o texto em chunks com fronteiras estáveis entre revisões.
+    O split_text_for_google empacota parágrafos de forma gulosa, então uma edição no
+    começo deslocaria todas as fronteiras seguintes. Aqui os parágrafos são agrupados
+    em seções que terminam em parágrafos "âncora" (escolhidos pelo hash do conteúdo),
+    e cada seção é dividida com split_text_for_google. Uma edição só afeta a sua seção.
+    """
+    chunks = []
+    section = []
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    for para in text.split('\n'):
+        if not para.strip():
+            continue
+        section.append(para)
+        if int(content_key(para.strip())[:8], 16) % INCREMENTAL_ANCHOR_EVERY == 0:
+            chunks.extend(split_text_for_google('\n'.join(section), limit=limit))
+            section = []
+    if section:
+        chunks.extend(split_text_for_google('\n'.join(section), limit=limit))
+    return chunks
+
+
+def segment_key(chunk: str, voice: str) -> str:
+    provider = get_voice_provider(voice)
+    return content_key('segment', chunk, voice, provider, provider_audio_config(provider))
+
+
+def manifest_path(document_id: str, voice: str) -> str:
+    return os.path.join(MANIFESTS_DIR, f'{content_key(str(document_id), voice)}.json')
+
+
+def load_manifest(document_id: str, voice: str) -> dict:
+    try:
+        with open(manifest_path(document_id, voice), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'document_id': document_id, 'voice': voice, 'chunks': []}
+
+
+def save_manifest(document_id: str, voice: str, chunk_hashes: list):
+    """Grava o manifesto de forma atômica"""
+    path = manifest_path(document_id, voice)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'document_id': document_id,
+            'voice': voice,
+            'chunks': chunk_hashes,
+            'updated_at': time.time()
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def render_chunks_with_store(chunks: list, voice: str, output_path: str, store: DiskLRUCache,
+                             job_id: str = None, should_stop=None) -> dict:
+    """
+    Sintetiza apenas os chunks que ainda não estão no store (cada um é gravado assim que
+    chega) e costura o MP3 final a partir dos segmentos guardados.
+    Retorna {'hashes': [...], 'synthesized': n}
+    """
+    hashes = [segment_key(chunk, voice) for chunk in chunks]
+
+    # Chunks ainda não sintetizados (sem duplicar chunks repetidos no texto)
+    missing = {}
+    for i, key in enumerate(hashes):
+        if key not in missing and not store.get(key):
+            missing[key] = i
+    missing_indexes = list(missing.values())
+
+    if missing_indexes:
+        print(f"🔄 {len(missing_indexes)} de {len(chunks)} partes a sintetizar...", flush=True)
+        report = chunk_progress_reporter(
+            job_id, len(chunks),
+            already_done=len(chunks) - len(missing_indexes),
+            labels=[i + 1 for i in missing_indexes]
+        )
+
+        def on_chunk_done(j, audio):
+            store.put_bytes(hashes[missing_indexes[j]], audio)
+            report(j, audio)
+
+        synthesize_chunks([chunks[i] for i in missing_indexes], voice, on_chunk_done, should_stop)
+
+    # Costura o MP3 final a partir dos segmentos (guardados + novos), um segmento por vez
+    with Mp3ConcatWriter(output_path) as writer:
+        for i, key in enumerate(hashes):
+            segment_path = store.get(key)
+            if not segment_path:
+                raise Exception(f"Segmento do chunk {i+1} não encontrado")
+            with open(segment_path, 'rb') as segment:
+                writer.append(segment.read())
+
+    update_job_progress(job_id, 100)
+    return {'hashes': hashes, 'synthesized': len(missing_indexes)}
+
+
+def generate_audio_incremental(text: str, voice: str, output_path: str, document_id: str,
+                               job_id: str = None, should_stop=None):
+    """Gera o áudio de um documento reaproveitando os segmentos de chunks que não mudaram"""
+    provider = get_voice_provider(voice)
+    chunks = split_text_incremental(text, provider_chunk_limit(provider))
+    if not chunks:
+        raise Exception("Texto vazio após normalização")
+
+    previous = set(load_manifest(document_id, voice)['chunks'])
+    changed = sum(1 for chunk in chunks if segment_key(chunk, voice) not in previous)
+    print(f"🔄 Documento {document_id}: {len(chunks)} partes, {changed} alteradas desde a última versão ({provider})", flush=True)
+
+    result = render_chunks_with_store(chunks, voice, output_path, SEGMENT_CACHE, job_id, should_stop)
+
+    save_manifest(document_id, voice, result['hashes'])
+    print(f"✅ Documento {document_id}: áudio costurado ({len(chunks)} partes, {result['synthesized']} novas)")
+
+
+def generate_audio_checkpointed(text: str, voice: str, output_path: str, checkpoint_dir: str,
+                                job_id: str = None, should_stop=None):
+    """Gera o áudio gravando cada chunk concluído em checkpoint_dir, retomando de onde parou"""
+    provider = get_voice_provider(voice)
+    chunks = [c for c in split_text_for_google(text, limit=provider_chunk_limit(provider)) if c.strip()]
+    if not chunks:
+        raise Exception("Texto vazio após normalização")
+
+    # Sem orçamento de tamanho: os checkpoints vivem só enquanto o job existir
+    store = DiskLRUCache(checkpoint_dir, max_bytes=float('inf'), suffix='.mp3')
+    result = render_chunks_with_store(chunks, voice, output_path, store, job_id, should_stop)
+    print(f"✅ Áudio gerado com checkpoints: {voice} ({len(chunks)} partes, {len(chunks) - result['synthesized']} retomadas)")
+
+
+def generate_audio(text: str, voice: str, output_path: str, job_id: str = None, document_id: str = None,
+                   checkpoint_dir: str = None, should_stop=None):
+    """Função principal que escolhe o provedor correto"""
+    if document_id:
+        generate_audio_incremental(text, voice, output_path, document_id, job_id, should_stop)
+    elif checkpoint_dir:
+        generate_audio_checkpointed(text, voice, output_path, checkpoint_dir, job_id, should_stop)
+    elif get_voice_provider(voice) == 'google':
         generate_audio_google(text, voice, output_path, job_id)
     else:
-        run_async(generate_audio_edge(text, voice, output_path))
+        run_async(generate_audio_edge(text, voice, output_path, job_id))
+
+
+# Um único event loop por processo, numa thread dedicada (evita criar/fechar um loop por chamada)
+ASYNC_LOOP = BackgroundLoop('tts-asyncio')
 
 
 def run_async(coro):
-    """Helper para executar função assíncrona"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    """Helper para executar função assíncrona (no loop persistente)"""
+    return ASYNC_LOOP.run(coro)
+
+
+def iter_async(agen):
+    """Consome um gerador assíncrono a partir de código síncrono (ex: corpo de resposta Flask)"""
+    return ASYNC_LOOP.iterate(agen)
+
+
+# ==================== STREAMING DE ÁUDIO ====================
+# Em vez de gravar o arquivo inteiro antes de responder, os bytes MP3 saem para o
+# cliente na ordem do texto, à medida que o provedor os entrega.
+
+async def stream_chunks_edge(chunks: list, voice: str):
+    """
+    Gera os bytes MP3 dos chunks em ordem, repassando os frames do Edge-TTS assim que chegam.
+    Os chunks seguintes já vão sendo sintetizados em paralelo; o semáforo só é liberado
+    quando o consumidor termina de ler um chunk, limitando quanto áudio fica em memória.
+    """
+    semaphore = asyncio.Semaphore(EDGE_MAX_CONCURRENCY)
+    queues = [asyncio.Queue() for _ in chunks]
+
+    async def produce(i, chunk):
+        await semaphore.acquire()
+        for attempt in range(EDGE_CHUNK_RETRIES + 1):
+            emitted = False
+            try:
+                communicate = edge_tts.Communicate(chunk, voice, connector=get_edge_connector())
+                async for message in communicate.stream():
+                    if message['type'] == 'audio':
+                        emitted = True
+                        queues[i].put_nowait(message['data'])
+                queues[i].put_nowait(None)
+                return
+            except Exception as e:
+                # Só dá para tentar de novo se nada deste chunk foi enviado ainda
+                if emitted or attempt == EDGE_CHUNK_RETRIES:
+                    queues[i].put_nowait(e)
+                    return
+                await asyncio.sleep(1.5 * (attempt + 1))
+
+    tasks = [asyncio.ensure_future(produce(i, chunk)) for i, chunk in enumerate(chunks)]
+    try:
+        for queue in queues:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            semaphore.release()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def stream_chunks_google(chunks: list, voice_name: str):
+    """Gera os bytes MP3 dos chunks em ordem, mantendo no máximo GOOGLE_MAX_CONCURRENCY requisições adiantadas"""
+    GOOGLE_API_KEY = os.environ.get('GOOGLE_TTS_API_KEY', '')
+    if not GOOGLE_API_KEY:
+        raise Exception("GOOGLE_TTS_API_KEY não configurada")
+
+    executor = ThreadPoolExecutor(max_workers=GOOGLE_MAX_CONCURRENCY)
+    pending = deque()
+    next_index = 0
     try:
-        return loop.run_until_complete(coro)
+        while pending or next_index < len(chunks):
+            while next_index < len(chunks) and len(pending) < GOOGLE_MAX_CONCURRENCY:
+                pending.append(executor.submit(synthesize_chunk_google, chunks[next_index], voice_name, GOOGLE_API_KEY))
+                next_index += 1
+            yield pending.popleft().result()
     finally:
-        loop.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def stream_audio(text: str, voice: str):
+    """Gerador síncrono com os bytes MP3 do texto completo, na ordem, sem arquivo temporário"""
+    provider = get_voice_provider(voice)
+    chunks = [c for c in split_text_for_google(text, limit=provider_chunk_limit(provider)) if c.strip()]
+    if not chunks:
+        raise Exception("Texto vazio após normalização")
+
+    print(f"🔄 Streaming de {len(chunks)} partes com {provider}...", flush=True)
+    if provider == 'google':
+        yield from stream_chunks_google(chunks, voice)
+    else:
+        yield from iter_async(stream_chunks_edge(chunks, voice))
 
 
 @app.route('/api/voices', methods=['GET'])
@@ -368,6 +898,20 @@ def get_voices():
     return jsonify({'voices': voices})
 
 
+def estimate_processing_seconds(char_count: int) -> float:
+    """Estimativa do tempo de processamento (segundos) para um texto"""
+    # Estimativa baseada em testes: ~200 caracteres por segundo de processamento
+    # Mais overhead inicial de ~3 segundos
+    estimated_seconds = max(5, (char_count / 200) + 3)
+    
+    # Para textos muito longos, pode ser mais lento
+    if char_count > 50000:
+        estimated_seconds *= 1.2
+    if char_count > 100000:
+        estimated_seconds *= 1.3
+    return estimated_seconds
+
+
 @app.route('/api/estimate', methods=['POST'])
 def estimate_time():
     """
@@ -381,16 +925,7 @@ def estimate_time():
         
         text = data.get('text', '').strip()
         char_count = len(text)
-        
-        # Estimativa baseada em testes: ~200 caracteres por segundo de processamento
-        # Mais overhead inicial de ~3 segundos
-        estimated_seconds = max(5, (char_count / 200) + 3)
-        
-        # Para textos muito longos, pode ser mais lento
-        if char_count > 50000:
-            estimated_seconds *= 1.2
-        if char_count > 100000:
-            estimated_seconds *= 1.3
+        estimated_seconds = estimate_processing_seconds(char_count)
             
         return jsonify({
             'char_count': char_count,
@@ -403,6 +938,89 @@ def estimate_time():
         return jsonify({'error': str(e)}), 500
 
 
+# ==================== CACHE DE PREVIEWS ====================
+# O preview é determinístico por voz: renderizamos uma vez e guardamos os bytes em memória.
+# A impressão digital muda se AVAILABLE_VOICES ou PREVIEW_TEXTS mudarem, invalidando tudo.
+PREVIEW_CACHE = {}  # voice -> {'audio': bytes, 'etag': str}
+PREVIEW_CACHE_MAX_AGE = int(os.environ.get('PREVIEW_CACHE_MAX_AGE', 7 * 24 * 3600))
+PREVIEW_WARMUP = os.environ.get('PREVIEW_WARMUP', 'true').lower() == 'true'
+_preview_cache_fingerprint = None
+_preview_cache_lock = threading.Lock()
+_preview_render_locks = {}
+
+
+def get_preview_text(voice: str) -> str:
+    """Texto de preview no idioma da voz"""
+    lang = voice.split('-')[0] + '-' + voice.split('-')[1]
+    return PREVIEW_TEXTS.get(lang, PREVIEW_TEXTS['pt-BR'])
+
+
+def compute_preview_fingerprint() -> str:
+    voices = sorted(
+        (key, sorted(config.items()) if isinstance(config, dict) else config)
+        for key, config in AVAILABLE_VOICES.items()
+    )
+    return content_key(repr(voices), repr(sorted(PREVIEW_TEXTS.items())))
+
+
+def get_preview_audio(voice: str) -> dict:
+    """Retorna {'audio', 'etag'} do preview da voz, renderizando na primeira vez"""
+    global _preview_cache_fingerprint
+    with _preview_cache_lock:
+        fingerprint = compute_preview_fingerprint()
+        if fingerprint != _preview_cache_fingerprint:
+            PREVIEW_CACHE.clear()
+            _preview_cache_fingerprint = fingerprint
+        entry = PREVIEW_CACHE.get(voice)
+        if entry:
+            return entry
+        render_lock = _preview_render_locks.setdefault(voice, threading.Lock())
+
+    # Um lock por voz evita renderizar o mesmo preview duas vezes em paralelo
+    with render_lock:
+        entry = PREVIEW_CACHE.get(voice)
+        if entry:
+            return entry
+
+        output_path = os.path.join(TEMP_DIR, f'preview_{uuid.uuid4()}.mp3')
+        try:
+            generate_audio(get_preview_text(voice), voice, output_path)
+            with open(output_path, 'rb') as f:
+                audio = f.read()
+        finally:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+
+        entry = {'audio': audio, 'etag': content_key(audio)[:32]}
+        with _preview_cache_lock:
+            if _preview_cache_fingerprint == fingerprint:
+                PREVIEW_CACHE[voice] = entry
+        return entry
+
+
+def warm_preview_cache():
+    """Pré-renderiza os previews de todas as vozes (roda em background no startup)"""
+    for voice in list(AVAILABLE_VOICES):
+        try:
+            get_preview_audio(voice)
+        except Exception as e:
+            print(f'⚠️ Não foi possível pré-renderizar o preview de {voice}: {e}')
+    print(f'✅ Previews em cache: {len(PREVIEW_CACHE)} vozes')
+
+
+def preview_response(voice: str):
+    """Responde com o preview em cache, com ETag forte e cache longo"""
+    if voice not in AVAILABLE_VOICES:
+        return jsonify({'error': f'Voz {voice} não suportada'}), 400
+
+    entry = get_preview_audio(voice)
+    response = Response(entry['audio'], mimetype='audio/mpeg')
+    response.set_etag(entry['etag'])
+    response.cache_control.public = True
+    response.cache_control.max_age = PREVIEW_CACHE_MAX_AGE
+    return response.make_conditional(request)
+
+
 @app.route('/api/preview', methods=['POST'])
 def generate_preview():
     """
@@ -414,59 +1032,58 @@ def generate_preview():
             return jsonify({'error': 'Dados não fornecidos'}), 400
         
         voice = data.get('voice', 'pt-BR-AntonioNeural')
+        return preview_response(voice)
         
-        if voice not in AVAILABLE_VOICES:
-            return jsonify({'error': f'Voz {voice} não suportada'}), 400
-        
-        # Determina o idioma da voz
-        lang = voice.split('-')[0] + '-' + voice.split('-')[1]
-        preview_text = PREVIEW_TEXTS.get(lang, PREVIEW_TEXTS['pt-BR'])
-        
-        # Gera um nome único para o arquivo
-        file_id = str(uuid.uuid4())
-        output_filename = f'preview_{file_id}.mp3'
-        output_path = os.path.join(TEMP_DIR, output_filename)
-        
-        # Gera o áudio
-        generate_audio(preview_text, voice, output_path)
-        
-        if not os.path.exists(output_path):
-            return jsonify({'error': 'Falha ao gerar o preview'}), 500
-        
-        # Configura a limpeza do arquivo após o envio
-        @after_this_request
-        def cleanup(response):
-            try:
-                import threading
-                def remove_file():
-                    try:
-                        if os.path.exists(output_path):
-                            os.remove(output_path)
-                    except Exception:
-                        pass
-                timer = threading.Timer(10.0, remove_file)
-                timer.daemon = True
-                timer.start()
-            except Exception:
-                pass
-            return response
-        
-        return send_file(
-            output_path,
-            mimetype='audio/mpeg',
-            as_attachment=False
-        )
-        
     except Exception as e:
         print(f'❌ Erro ao gerar preview: {e}')
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 
+@app.route('/api/preview/<voice>', methods=['GET'])
+def get_preview(voice):
+    """Preview via GET (permite cache do navegador/CDN com If-None-Match)"""
+    try:
+        return preview_response(voice)
+    except Exception as e:
+        print(f'❌ Erro ao gerar preview: {e}')
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+
+def streaming_audio_response(text: str, voice: str):
+    """Resposta HTTP chunked com o áudio sendo gerado"""
+    audio_stream = stream_audio(text, voice)
+    # Busca o primeiro pedaço antes de responder: erros iniciais ainda viram JSON 500
+    first = next(audio_stream, None)
+    if not first:
+        return jsonify({'error': 'O provedor de voz não retornou áudio para este texto'}), 500
+    start_time = time.time()
+
+    def body():
+        sent = len(first)
+        yield first
+        try:
+            for data in audio_stream:
+                sent += len(data)
+                yield data
+            print(f'✅ Streaming concluído em {time.time() - start_time:.2f}s - {sent} bytes - Voz: {voice}')
+        except Exception as e:
+            # Cabeçalhos (200) já enviados: propaga o erro para o servidor abortar a conexão sem o
+            # terminador do chunked, e o cliente ver o download como falho (não um MP3 truncado "ok")
+            print(f'❌ Erro durante o streaming após {sent} bytes: {e}')
+            raise
+
+    return Response(body(), mimetype='audio/mpeg', headers={
+        'Content-Disposition': 'attachment; filename=audiobook.mp3',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 @app.route('/api/generate', methods=['POST'])
 def generate_audiobook():
     """
     Endpoint principal para gerar o audiobook
-    Recebe: { text: string, voice: string }
+    Recebe: { text: string, voice: string, document_id?: string, stream?: bool }
     Retorna: arquivo OGG/MP3 para download
     """
     try:
@@ -477,6 +1094,7 @@ def generate_audiobook():
         
         text = data.get('text', '').strip()
         voice = data.get('voice', 'pt-BR-AntonioNeural')
+        document_id = data.get('document_id')
         
         if not text:
             return jsonify({'error': 'Texto não pode estar vazio'}), 400
@@ -486,8 +1104,26 @@ def generate_audiobook():
         if voice not in AVAILABLE_VOICES:
             return jsonify({'error': f'Voz {voice} não suportada'}), 400
         
+        # Mesmo texto + mesma voz: serve direto do cache, sem sintetizar
+        cache_key = synthesis_cache_key(text, voice)
+        cached_path = SYNTHESIS_CACHE.get(cache_key)
+        if cached_path:
+            print(f'⚡ Cache hit para {len(text)} caracteres - Voz: {voice}')
+            return send_file(
+                cached_path,
+                mimetype='audio/mpeg',
+                as_attachment=True,
+                download_name='audiobook.mp3'
+            )
+        
+        # Modo streaming: envia os frames MP3 conforme o provedor entrega (sem arquivo temporário)
+        stream = data.get('stream') or request.args.get('stream', '').lower() == 'true'
+        if stream:
+            return streaming_audio_response(text, voice)
+        
         # Mudamos para MP3 para maior compatibilidade na concatenação
         ext = 'mp3'
+        file_id = str(uuid.uuid4())
         output_filename = f'audiobook_{file_id}.{ext}'
         output_path = os.path.join(TEMP_DIR, output_filename)
         
@@ -495,7 +1131,7 @@ def generate_audiobook():
         start_time = time.time()
         
         # Executa a geração de áudio
-        generate_audio(text, voice, output_path)
+        generate_audio(text, voice, output_path, document_id=document_id)
         
         processing_time = time.time() - start_time
         print(f'✅ Audiobook gerado em {processing_time:.2f}s - {len(text)} caracteres - Voz: {voice}')
@@ -504,6 +1140,8 @@ def generate_audiobook():
         if not os.path.exists(output_path):
             return jsonify({'error': 'Falha ao gerar o arquivo de áudio'}), 500
         
+        store_in_synthesis_cache(cache_key, output_path)
+        
         # Configura a limpeza do arquivo após o envio
         @after_this_request
         def cleanup(response):
@@ -542,13 +1180,67 @@ def generate_audiobook():
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 
+def store_in_synthesis_cache(cache_key: str, output_path: str):
+    """Guarda o áudio gerado no cache (falhas no cache não derrubam a geração)"""
+    try:
+        SYNTHESIS_CACHE.put_file(cache_key, output_path)
+    except Exception as e:
+        print(f'⚠️ Não foi possível salvar no cache de síntese: {e}')
+
+
 # ==================== SISTEMA DE JOBS EM BACKGROUND ====================
 
-def process_audio_job(job_id: str, text: str, voice: str):
-    """Processa o áudio em background e atualiza o status do job"""
+# Entrada e checkpoints de cada job ficam em disco até ele terminar:
+# jobs/<job_id>/input.json e jobs/<job_id>/chunks/<hash>.mp3
+JOBS_DIR = os.path.join(TEMP_DIR, 'jobs')
+os.makedirs(JOBS_DIR, exist_ok=True)
+
+
+def job_dir(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, job_id)
+
+
+def save_job_input(job_id: str, **job_input):
+    """Persiste a entrada do job para poder retomá-lo depois de um crash ou erro"""
+    os.makedirs(job_dir(job_id), exist_ok=True)
+    path = os.path.join(job_dir(job_id), 'input.json')
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(job_input, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_job_input(job_id: str):
+    try:
+        with open(os.path.join(job_dir(job_id), 'input.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def remove_job_dir(job_id: str):
+    shutil.rmtree(job_dir(job_id), ignore_errors=True)
+
+
+def job_is_cancelled(job_id: str) -> bool:
+    job = JOB_STORE.get(job_id)
+    return not job or job['status'] == 'cancelled'
+
+
+def process_audio_job(job_id: str, text: str, voice: str, document_id: str = None, publish: dict = None):
+    """
+    Processa o áudio em background e atualiza o status do job.
+    Com publish ({'audiobook_id', 'label', 'position', 'base_url'}), o áudio pronto
+    vira uma faixa do projeto assim que termina (geração por capítulos).
+    """
+    output_path = None
+    track = None
     try:
-        JOBS[job_id]['status'] = 'processing'
-        JOBS[job_id]['progress'] = 5
+        # Claim atômico: garante que só um worker processa o job (e ignora jobs cancelados)
+        if not JOB_STORE.claim(job_id):
+            print(f"⚠️ Job {job_id}: já foi assumido, cancelado ou removido")
+            return
+        JOB_STORE.update(job_id, progress=5)
         
         # Determina extensão
         ext = 'mp3'
@@ -557,23 +1249,119 @@ def process_audio_job(job_id: str, text: str, voice: str):
         
         print(f"🚀 Job {job_id}: Iniciando geração de áudio ({len(text)} caracteres)")
         
-        # Gera o áudio
-        generate_audio(text, voice, output_path, job_id)
+        # Gera o áudio (cada chunk concluído vira checkpoint em disco)
+        generate_audio(
+            text, voice, output_path, job_id, document_id,
+            checkpoint_dir=os.path.join(job_dir(job_id), 'chunks'),
+            should_stop=lambda: job_is_cancelled(job_id)
+        )
         
         # Verifica se foi criado
         if os.path.exists(output_path):
-            JOBS[job_id]['status'] = 'done'
-            JOBS[job_id]['progress'] = 100
-            JOBS[job_id]['file_path'] = output_path
+            store_in_synthesis_cache(synthesis_cache_key(text, voice), output_path)
+            audio_info = probe_audio_file(output_path)
+            if publish:
+                track = publish_job_track(output_path, publish, audio_info)
+            if not JOB_STORE.update(job_id, only_if_status='processing', status='done', progress=100,
+                                    file_path=output_path, finished_at=time.time(),
+                                    duration_seconds=audio_info['duration_seconds'] if audio_info else None,
+                                    track_id=track['id'] if track else None):
+                raise JobCancelled()
+            remove_job_dir(job_id)
             print(f"✅ Job {job_id}: Áudio gerado com sucesso!")
         else:
-            JOBS[job_id]['status'] = 'error'
-            JOBS[job_id]['error'] = 'Falha ao gerar arquivo de áudio'
+            JOB_STORE.update(job_id, only_if_status='processing', status='error',
+                             error='Falha ao gerar arquivo de áudio', finished_at=time.time())
             
+    except JobCancelled:
+        print(f"🛑 Job {job_id}: Cancelado")
+        if track:
+            delete_track(track['id'])
+        if output_path and os.path.exists(output_path):
+            os.remove(output_path)
+        remove_job_dir(job_id)
     except Exception as e:
+        # Os checkpoints ficam em disco: /api/generate/retry retoma do último chunk bom
         print(f"❌ Job {job_id}: Erro - {str(e)}")
-        JOBS[job_id]['status'] = 'error'
-        JOBS[job_id]['error'] = str(e)
+        JOB_STORE.update(job_id, only_if_status='processing', status='error', error=str(e), finished_at=time.time())
+
+
+# Pool fixo de workers com fila justa (por usuário) e prioridade para textos curtos
+GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', 2))
+JOB_SCHEDULER = FairScheduler(
+    workers=GENERATION_WORKERS,
+    handler=process_audio_job,
+    estimate_seconds=estimate_processing_seconds,
+    on_queue_change=JOB_STORE.set_queue_positions
+)
+
+
+def get_request_user_key() -> str:
+    """Identifica quem fez a requisição (email do token ou IP) para a fila justa"""
+    token = request.headers.get('Authorization', '')
+    if token:
+        user_data = verify_token(token)
+        if user_data and user_data.get('email'):
+            return user_data['email'].lower()
+    # remote_addr já vem corrigido pelo ProxyFix (nunca o X-Forwarded-For cru, que o cliente forja)
+    return request.remote_addr or 'anon'
+
+
+def can_manage_job(job: dict) -> bool:
+    """Só quem criou o job (mesma chave de usuário) ou um admin pode cancelar/retomar"""
+    if job.get('owner') and job['owner'] == get_request_user_key():
+        return True
+    token = request.headers.get('Authorization', '')
+    user_data = verify_token(token) if token else None
+    return bool(user_data) and is_admin(user_data.get('email'))
+
+
+def purge_expired_jobs():
+    """Remove jobs expirados e seus arquivos (sobrevive a reinícios, ao contrário de timers)"""
+    try:
+        for job in JOB_STORE.pop_expired():
+            file_path = job.get('file_path')
+            # Arquivos do cache de síntese pertencem ao cache, não ao job
+            if file_path and not job.get('cached') and os.path.exists(file_path):
+                os.remove(file_path)
+            remove_job_dir(job['id'])
+            print(f"🧹 Job {job['id']} removido")
+    except Exception as e:
+        print(f"Erro ao limpar jobs: {e}")
+
+
+def resubmit_job(job_id: str, job_input: dict):
+    """Coloca de volta na fila um job adotado por este processo"""
+    JOB_SCHEDULER.submit(
+        job_id, job_input.get('user', 'anon'), len(job_input['text']),
+        job_input['text'], job_input['voice'], job_input.get('document_id'), job_input.get('publish')
+    )
+
+
+def recover_orphaned_jobs():
+    """Retoma jobs de processos que morreram (crash/restart), a partir dos checkpoints"""
+    for job in JOB_STORE.orphaned_jobs(JOB_STALE_SECONDS):
+        job_input = load_job_input(job['id'])
+        if not job_input:
+            JOB_STORE.update(job['id'], only_if_status=('pending', 'processing'), status='error',
+                             error='Job interrompido e sem dados para retomar', finished_at=time.time())
+            continue
+        if JOB_STORE.adopt(job['id'], job['worker']):
+            print(f"♻️ Job {job['id']}: retomado após interrupção (progresso anterior {job['progress']}%)")
+            resubmit_job(job['id'], job_input)
+
+
+def job_maintenance_loop():
+    """Batimento do processo + recuperação de jobs órfãos + limpeza de jobs expirados e uploads abandonados"""
+    while True:
+        try:
+            JOB_STORE.heartbeat(JOB_STALE_SECONDS)
+            recover_orphaned_jobs()
+            purge_expired_jobs()
+            purge_expired_uploads()
+        except Exception as e:
+            print(f"⚠️ Erro na manutenção de jobs: {e}")
+        time.sleep(JOB_HEARTBEAT_SECONDS)
 
 
 @app.route('/api/generate/start', methods=['POST'])
@@ -590,6 +1378,8 @@ def start_generation_job():
         
         text = data.get('text', '').strip()
         voice = data.get('voice', 'pt-BR-AntonioNeural')
+        # Opcional: identifica o documento para regenerar só os trechos alterados
+        document_id = data.get('document_id')
         
         if not text:
             return jsonify({'error': 'Texto não pode estar vazio'}), 400
@@ -599,24 +1389,44 @@ def start_generation_job():
         
         # Cria o job
         job_id = str(uuid.uuid4())
-        JOBS[job_id] = {
-            'status': 'pending',
-            'progress': 0,
-            'file_path': None,
-            'error': None,
-            'created_at': time.time()
+        user = get_request_user_key()
+        job_fields = {
+            'worker': current_worker_id(),
+            'owner': user,
+            'voice': voice,
+            'char_count': len(text),
+            'document_id': document_id
         }
         
+        # Cache hit: o job já nasce concluído apontando para o áudio em cache
+        cached_path = SYNTHESIS_CACHE.get(synthesis_cache_key(text, voice))
+        if cached_path:
+            now = time.time()
+            audio_info = probe_audio_file(cached_path)
+            JOB_STORE.create(job_id, status='done', progress=100, file_path=cached_path, cached=1,
+                             started_at=now, finished_at=now,
+                             duration_seconds=audio_info['duration_seconds'] if audio_info else None,
+                             **job_fields)
+            print(f"⚡ Job {job_id}: Cache hit para {len(text)} caracteres")
+            return jsonify({
+                'job_id': job_id,
+                'status': 'done',
+                'message': 'Áudio recuperado do cache'
+            })
+        
+        save_job_input(job_id, text=text, voice=voice, document_id=document_id, user=user)
+        JOB_STORE.create(job_id, **job_fields)
         print(f"📝 Job {job_id}: Criado para {len(text)} caracteres")
         
-        # Inicia o processamento em background
-        thread = threading.Thread(target=process_audio_job, args=(job_id, text, voice))
-        thread.daemon = True
-        thread.start()
+        # Enfileira no pool de workers
+        JOB_SCHEDULER.submit(job_id, user, len(text), text, voice, document_id)
+        job = JOB_STORE.get(job_id)
         
         return jsonify({
             'job_id': job_id,
-            'status': 'pending',
+            'status': job['status'],
+            'queue_position': job['queue_position'],
+            'estimated_start_at': job['estimated_start_at'],
             'message': 'Geração iniciada em background'
         })
         
@@ -630,15 +1440,169 @@ def get_job_status(job_id):
     """
     Retorna o status atual de um job de geração.
     """
-    if job_id not in JOBS:
+    job = JOB_STORE.get(job_id)
+    if not job:
         return jsonify({'error': 'Job não encontrado'}), 404
     
-    job = JOBS[job_id]
+    return jsonify(job_status_payload(job))
+
+
+def job_status_payload(job: dict) -> dict:
+    """Representação pública do job (status, progresso, fila e timings)"""
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'error': job['error'],
+        'queue_position': job['queue_position'],
+        'estimated_start_at': job['estimated_start_at'],
+        'estimated_start_in': (
+            max(0, round(job['estimated_start_at'] - time.time()))
+            if job['status'] == 'pending' and job['estimated_start_at'] else None
+        ),
+        'chunks_done': job['chunks_done'],
+        'chunks_total': job['chunks_total'],
+        'duration_seconds': job['duration_seconds'],
+        'track_id': job['track_id'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at']
+    }
+
+
+# Eventos finais de cada status (o nome 'error' é reservado pelo EventSource do navegador)
+JOB_FINAL_EVENTS = {'done': 'ready', 'error': 'failed', 'cancelled': 'cancelled'}
+SSE_POLL_SECONDS = float(os.environ.get('SSE_POLL_SECONDS', 1.0))
+SSE_KEEPALIVE_SECONDS = 15
+# Depois disso o stream fecha e o EventSource reconecta sozinho (3 s depois): cada stream prende
+# uma thread do gunicorn, então conexões curtas devolvem a thread com frequência
+SSE_MAX_SECONDS = int(os.environ.get('SSE_MAX_SECONDS', 25))
+# Streams simultâneos por processo. Acima disso a resposta é 503 e o navegador cai para o polling
+# de /api/generate/status; o resto das threads (--threads 8 no Dockerfile) fica livre para a API
+SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', 4))
+SSE_STREAM_SLOTS = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/api/generate/events/<job_id>', methods=['GET'])
+def job_events(job_id):
+    """
+    Stream Server-Sent Events com o andamento do job:
+    'progress' (a cada mudança), 'chunk' (a cada chunk concluído) e um evento final
+    'ready' | 'failed' | 'cancelled'. Substitui o polling de /api/generate/status.
+    """
+    if not JOB_STORE.get(job_id):
+        return jsonify({'error': 'Job não encontrado'}), 404
+    if not SSE_STREAM_SLOTS.acquire(blocking=False):
+        return jsonify({'error': 'Muitos streams abertos, use /api/generate/status'}), 503
+
+    def stream():
+        started = time.time()
+        last_sent = started
+        last_snapshot = None
+        last_chunks = None
+        yield 'retry: 3000\n\n'
+        while True:
+            job = JOB_STORE.get(job_id)
+            if not job:
+                yield sse_event('failed', {'job_id': job_id, 'error': 'Job não encontrado'})
+                return
+
+            payload = job_status_payload(job)
+            snapshot = (job['status'], job['progress'], job['chunks_done'], job['queue_position'])
+            if snapshot != last_snapshot:
+                if job['chunks_done'] and job['chunks_done'] != last_chunks:
+                    yield sse_event('chunk', {
+                        'job_id': job_id,
+                        'chunks_done': job['chunks_done'],
+                        'chunks_total': job['chunks_total']
+                    })
+                    last_chunks = job['chunks_done']
+                yield sse_event('progress', payload)
+                last_snapshot = snapshot
+                last_sent = time.time()
+
+            if job['status'] in JOB_FINAL_EVENTS:
+                yield sse_event(JOB_FINAL_EVENTS[job['status']], payload)
+                return
+
+            now = time.time()
+            if now - started > SSE_MAX_SECONDS:
+                return
+            if now - last_sent > SSE_KEEPALIVE_SECONDS:
+                yield ': keepalive\n\n'
+                last_sent = now
+
+            with JOB_EVENTS:
+                JOB_EVENTS.wait(timeout=SSE_POLL_SECONDS)
+
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Chamado pelo servidor ao fim da resposta, inclusive se o cliente desconectar no meio
+    response.call_on_close(SSE_STREAM_SLOTS.release)
+    return response
+
+
+@app.route('/api/generate/cancel/<job_id>', methods=['POST'])
+def cancel_job(job_id):
+    """
+    Cancela um job na fila ou em andamento.
+    O worker para antes da próxima chamada ao provedor e o slot é liberado.
+    """
+    job = JOB_STORE.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    if not can_manage_job(job):
+        return jsonify({'error': 'Acesso negado. O job pertence a outro usuário.'}), 403
+    
+    cancelled = JOB_STORE.update(
+        job_id, only_if_status=('pending', 'processing'),
+        status='cancelled', finished_at=time.time(), queue_position=None, estimated_start_at=None
+    )
+    if not cancelled:
+        return jsonify({'error': 'Job já finalizado', 'status': job['status']}), 409
+    
+    # Se ainda estava na fila deste processo, sai dela na hora
+    if JOB_SCHEDULER.remove(job_id) or job['status'] == 'pending':
+        remove_job_dir(job_id)
+    
+    print(f"🛑 Job {job_id}: Cancelamento solicitado")
+    return jsonify({'job_id': job_id, 'status': 'cancelled'})
+
+
+@app.route('/api/generate/retry/<job_id>', methods=['POST'])
+def retry_job(job_id):
+    """
+    Tenta de novo um job que falhou, reaproveitando os chunks já gerados (checkpoints).
+    """
+    job = JOB_STORE.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    if not can_manage_job(job):
+        return jsonify({'error': 'Acesso negado. O job pertence a outro usuário.'}), 403
+    
+    if job['status'] != 'error':
+        return jsonify({'error': 'Só jobs com erro podem ser retomados', 'status': job['status']}), 409
+    
+    job_input = load_job_input(job_id)
+    if not job_input:
+        return jsonify({'error': 'Dados do job não estão mais disponíveis'}), 410
+    
+    if not JOB_STORE.adopt(job_id, job['worker'], from_statuses=('error',)):
+        return jsonify({'error': 'Job já foi retomado'}), 409
+    
+    resubmit_job(job_id, job_input)
+    job = JOB_STORE.get(job_id)
     return jsonify({
         'job_id': job_id,
         'status': job['status'],
-        'progress': job['progress'],
-        'error': job['error']
+        'queue_position': job['queue_position'],
+        'estimated_start_at': job['estimated_start_at']
     })
 
 
@@ -647,34 +1611,23 @@ def download_job_result(job_id):
     """
     Baixa o áudio gerado por um job concluído.
     """
-    if job_id not in JOBS:
+    job = JOB_STORE.get(job_id)
+    if not job:
         return jsonify({'error': 'Job não encontrado'}), 404
     
-    job = JOBS[job_id]
-    
     if job['status'] != 'done':
         return jsonify({'error': 'Áudio ainda não está pronto', 'status': job['status']}), 400
     
     if not job['file_path'] or not os.path.exists(job['file_path']):
         return jsonify({'error': 'Arquivo não encontrado'}), 404
     
-    # Limpa o job da memória após 1 hora
-    def cleanup_job():
-        try:
-            if job_id in JOBS:
-                file_path = JOBS[job_id].get('file_path')
-                if file_path and os.path.exists(file_path):
-                    os.remove(file_path)
-                del JOBS[job_id]
-                print(f"🧹 Job {job_id} limpo da memória")
-        except Exception as e:
-            print(f"Erro ao limpar job: {e}")
-    
-    timer = threading.Timer(3600.0, cleanup_job)  # 1 hora
-    timer.daemon = True
-    timer.start()
+    # Limpa o job após 1 hora (a limpeza efetiva acontece em purge_expired_jobs)
+    expires_at = time.time() + 3600
+    if not job['expires_at'] or job['expires_at'] > expires_at:
+        JOB_STORE.update(job_id, expires_at=expires_at)
     
-    return send_file(
+    # Range/If-Range: downloads interrompidos continuam de onde pararam
+    return send_ranged_file(
         job['file_path'],
         mimetype='audio/mpeg',
         as_attachment=True,
@@ -685,13 +1638,156 @@ def download_job_result(job_id):
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Endpoint de verificação de saúde do servidor"""
-    return jsonify({'status': 'ok', 'message': 'Servidor funcionando', 'jobs_ativos': len(JOBS)})
+    return jsonify({
+        'status': 'ok',
+        'message': 'Servidor funcionando',
+        'jobs_ativos': JOB_STORE.count(),
+        'scheduler': JOB_SCHEDULER.stats(),
+        'synthesis_cache': SYNTHESIS_CACHE.stats(),
+        'extract_cache': EXTRACT_CACHE.stats(),
+        'uploads_offload': UPLOADS_OFFLOAD
+    })
+
+
+# ==================== EXTRAÇÃO DE TEXTO ====================
+# PDFs são extraídos em lotes de páginas num pool de processos (PyPDF2 é Python puro).
+# 0 desativa o pool (extração em série na própria thread da requisição).
+PDF_EXTRACT_WORKERS = int(os.environ.get('PDF_EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))
+# Os processos do pool não nascem de um fork deste processo: quando o pool é criado já rodam aqui
+# o loop asyncio, o agendador e as threads de manutenção, e um fork herdaria locks presos por elas
+# (logging, stdio, sqlite). Com forkserver, os filhos saem de um servidor limpo que já importou pdf_pages.
+PDF_POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+_pdf_executor = None
+_pdf_executor_pid = None
+_pdf_executor_lock = threading.Lock()
+
+# Texto extraído e limpo, guardado pelo hash dos bytes enviados: reenviar o mesmo arquivo é instantâneo
+EXTRACT_CACHE_DIR = os.path.join(DATA_DIR, 'cache', 'extract')
+EXTRACT_CACHE_MAX_MB = int(os.environ.get('EXTRACT_CACHE_MAX_MB', 256))
+EXTRACT_CACHE = DiskLRUCache(EXTRACT_CACHE_DIR, EXTRACT_CACHE_MAX_MB * 1024 * 1024, suffix='.json')
+
+
+def get_pdf_executor():
+    """Pool de processos para extração de PDF (criado sob demanda, um por processo do gunicorn)"""
+    global _pdf_executor, _pdf_executor_pid
+    if PDF_EXTRACT_WORKERS <= 0:
+        return None
+    with _pdf_executor_lock:
+        if _pdf_executor is None or _pdf_executor_pid != os.getpid():
+            context = multiprocessing.get_context(PDF_POOL_START_METHOD)
+            if PDF_POOL_START_METHOD == 'forkserver':
+                context.set_forkserver_preload(['pdf_pages'])
+            _pdf_executor = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS, mp_context=context)
+            _pdf_executor_pid = os.getpid()
+        return _pdf_executor
+
+
+def requested_page_range(page_count: int):
+    """first_page/last_page (base 1, inclusive) da query string ou do form; padrão: o PDF inteiro"""
+    first_page = max(1, request.values.get('first_page', 1, type=int))
+    last_page = min(page_count, request.values.get('last_page', page_count, type=int))
+    if first_page > last_page:
+        raise ValueError(f'Intervalo de páginas inválido (o PDF tem {page_count} páginas)')
+    return first_page, last_page
+
+
+def hash_upload(file) -> str:
+    """sha256 dos bytes enviados (lidos em blocos; o stream volta ao início)"""
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.stream.read(1024 * 1024), b''):
+        digest.update(block)
+    file.stream.seek(0)
+    return digest.hexdigest()
+
+
+def extract_cache_key(content_hash: str, is_pdf: bool = True) -> str:
+    """Chave do cache de extração: hash do arquivo + regras de limpeza + páginas pedidas"""
+    pages = (request.values.get('first_page', ''), request.values.get('last_page', '')) if is_pdf else ('', '')
+    return content_key('extract', str(TEXT_CLEANUP_VERSION), content_hash, *pages)
+
+
+def load_extract_cache(cache_key: str):
+    data = EXTRACT_CACHE.get_bytes(cache_key)
+    try:
+        return json.loads(data) if data else None
+    except ValueError:
+        return None
+
+
+def store_extract_cache(cache_key: str, result: dict):
+    """Guarda o resultado da extração (falhas no cache não derrubam a requisição)"""
+    try:
+        EXTRACT_CACHE.put_bytes(cache_key, json.dumps(result, ensure_ascii=False).encode('utf-8'))
+    except Exception as e:
+        print(f'⚠️ Não foi possível salvar no cache de extração: {e}')
+
+
+def stream_cached_text(result: dict, content_hash: str):
+    """Corpo NDJSON de um cache hit: mesmo formato do streaming, com o texto inteiro de uma vez"""
+    yield ndjson_line({
+        'type': 'meta', 'page_count': result.get('page_count'), 'first_page': result.get('first_page'),
+        'last_page': result.get('last_page'), 'content_hash': content_hash, 'cached': True
+    })
+    yield ndjson_line({
+        'type': 'done', 'paragraphs': result['text'].split('\n'),
+        'char_count': result['char_count'], 'word_count': result['word_count']
+    })
+
+
+def ndjson_line(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False) + '\n'
+
+
+def stream_pdf_text(pdf_path: str, first_page: int, last_page: int, page_count: int,
+                    content_hash: str = None, cache_key: str = None):
+    """
+    Corpo NDJSON: uma linha 'meta', uma linha 'page' por página com os parágrafos que ficaram
+    completos nela (um parágrafo pode continuar na página seguinte) e uma linha 'done'.
+    Juntar todos os parágrafos com "\n" dá o mesmo texto da resposta JSON.
+    """
+    char_count = word_count = 0
+    all_paragraphs = []
+    try:
+        yield ndjson_line({
+            'type': 'meta', 'page_count': page_count, 'first_page': first_page,
+            'last_page': last_page, 'content_hash': content_hash, 'cached': False
+        })
+        joiner = LineJoiner()
+        pages = iter_pdf_pages(pdf_path, first_page, last_page, get_pdf_executor())
+        for page, content in pages:
+            paragraphs = joiner.feed(content) if content else []
+            all_paragraphs.extend(paragraphs)
+            yield ndjson_line({'type': 'page', 'page': page, 'paragraphs': paragraphs})
+
+        paragraphs = joiner.close()
+        all_paragraphs.extend(paragraphs)
+        text = "\n".join(all_paragraphs)
+        char_count, word_count = len(text), len(text.split())
+        if cache_key and text:
+            store_extract_cache(cache_key, {
+                'text': text, 'char_count': char_count, 'word_count': word_count,
+                'page_count': page_count, 'first_page': first_page, 'last_page': last_page
+            })
+        yield ndjson_line({
+            'type': 'done',
+            'paragraphs': paragraphs,
+            'char_count': char_count,
+            'word_count': word_count
+        })
+    except Exception as e:
+        print(f"Erro ao extrair PDF em streaming: {e}", flush=True)
+        yield ndjson_line({'type': 'error', 'error': f'Erro ao ler PDF: {str(e)}'})
+    finally:
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
 
 
 @app.route('/api/extract', methods=['POST'])
 def extract_text():
     """
     Extrai texto de arquivos PDF, DOCX ou TXT com limpeza avançada
+    PDF: first_page/last_page limitam as páginas; stream=true responde em NDJSON página a página
+    O resultado fica em cache pelo hash do arquivo (content_hash na resposta)
     """
     try:
         print("Recebida requisição em /api/extract", flush=True)
@@ -705,12 +1801,24 @@ def extract_text():
         filename = file.filename.lower()
         print(f"Processando arquivo: {filename}", flush=True)
         
+        is_pdf = filename.endswith('.pdf')
+        stream = is_pdf and request.values.get('stream', '').lower() in ('1', 'true')
+        content_hash = hash_upload(file)
+        cache_key = extract_cache_key(content_hash, is_pdf)
+        cached = load_extract_cache(cache_key)
+        if cached:
+            print(f"⚡ Extração em cache: {content_hash[:12]}", flush=True)
+            if stream:
+                return Response(stream_cached_text(cached, content_hash), mimetype='application/x-ndjson')
+            return jsonify({**cached, 'content_hash': content_hash, 'cached': True})
+        
         text = ''
+        pdf_info = {}
         
         # --- TXT ---
         if filename.endswith('.txt'):
             try:
-                text = file.read().decode('utf-8', errors='ignore')
+                text = clean_extracted_text(file.read().decode('utf-8', errors='ignore'))
             except Exception as e:
                 return jsonify({'error': f'Erro ao ler TXT: {str(e)}'}), 400
 
@@ -718,16 +1826,36 @@ def extract_text():
         elif filename.endswith('.pdf'):
             if not PDF_SUPPORT:
                 return jsonify({'error': 'Suporte a PDF (PyPDF2) não instalado'}), 400
+            # Os processos do pool leem o PDF do disco
+            pdf_path = os.path.join(TEMP_DIR, f'extract_{uuid.uuid4()}.pdf')
+            file.save(pdf_path)
+            try:
+                page_count = pdf_page_count(pdf_path)
+                first_page, last_page = requested_page_range(page_count)
+            except Exception as e:
+                os.remove(pdf_path)
+                return jsonify({'error': f'Erro ao ler PDF: {str(e)}'}), 400
+
+            if stream:
+                return Response(
+                    stream_pdf_text(pdf_path, first_page, last_page, page_count, content_hash, cache_key),
+                    mimetype='application/x-ndjson'
+                )
+
             try:
-                pdf_reader = PyPDF2.PdfReader(file)
-                raw_pages = []
-                for page in pdf_reader.pages:
-                    content = page.extract_text()
+                # Parágrafos são limpos página a página (o parágrafo em aberto passa para a próxima)
+                joiner = LineJoiner()
+                paragraphs = []
+                for page, content in iter_pdf_pages(pdf_path, first_page, last_page, get_pdf_executor()):
                     if content:
-                        raw_pages.append(content)
-                text = "\n".join(raw_pages)
+                        paragraphs.extend(joiner.feed(content))
+                paragraphs.extend(joiner.close())
+                text = "\n".join(paragraphs)
+                pdf_info = {'page_count': page_count, 'first_page': first_page, 'last_page': last_page}
             except Exception as e:
                 return jsonify({'error': f'Erro ao ler PDF: {str(e)}'}), 400
+            finally:
+                os.remove(pdf_path)
 
         # --- DOCX ---
         elif filename.endswith('.docx'):
@@ -740,7 +1868,7 @@ def extract_text():
                     clean_p = para.text.strip()
                     if clean_p: # Ignora parágrafos vazios
                         paragraphs.append(clean_p)
-                text = "\n".join(paragraphs)
+                text = clean_extracted_text("\n".join(paragraphs))
             except Exception as e:
                 return jsonify({'error': f'Erro ao ler DOCX: {str(e)}'}), 400
         
@@ -750,59 +1878,32 @@ def extract_text():
         if not text:
             return jsonify({'error': 'Não foi possível extrair texto (arquivo vazio?)'}), 400
 
-        # --- LIMPEZA E RECONSTRUÇÃO INTELIGENTE ---
-        import re
-        
-        # 1. Normalização básica de caracteres
-        text = text.replace('\r', '')
-        
-        # 2. Divide em linhas para processamento
-        lines = text.split('\n')
-        cleaned_lines = []
-        buffer = ""
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Limpa espaços duplicados dentro da linha (resolve o problema "2 espaços a cada palavra")
-            line = re.sub(r'\s+', ' ', line)
-            
-            if not buffer:
-                buffer = line
-                continue
-            
-            # Lógica de Junção:
-            # Se o buffer termina em pontuação final (. ? !), assume que é fim de parágrafo.
-            # Caso contrário, assume que a frase continua na próxima linha (para corrigir quebras do PDF).
-            if buffer.endswith(('.', '!', '?', ':', ';')):
-                cleaned_lines.append(buffer)
-                buffer = line
-            elif buffer.endswith('-'):
-                # Trata hifenização: "exem- plo" -> "exemplo"
-                buffer = buffer[:-1] + line
-            else:
-                # Junta com espaço
-                buffer += " " + line
-                
-        if buffer:
-            cleaned_lines.append(buffer)
-            
-        # Reconstrói o texto com espaçamento simples (resolve o "pula uma linha")
-        final_text = "\n".join(cleaned_lines)
-
-        return jsonify({
-            'text': final_text,
-            'char_count': len(final_text),
-            'word_count': len(final_text.split())
-        })
+        result = {
+            'text': text,
+            'char_count': len(text),
+            'word_count': len(text.split()),
+            **pdf_info
+        }
+        store_extract_cache(cache_key, result)
+        return jsonify({**result, 'content_hash': content_hash, 'cached': False})
 
     except Exception as e:
         print(f"Erro fatal em extract_text: {e}", flush=True)
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 
+@app.route('/api/extract/<content_hash>', methods=['GET'])
+def get_extracted_text(content_hash):
+    """Texto já extraído de um arquivo, pelo content_hash devolvido em /api/extract (sem reenviar o arquivo)"""
+    if not re.fullmatch(r'[0-9a-f]{64}', content_hash):
+        return jsonify({'error': 'content_hash inválido'}), 400
+    cached = load_extract_cache(extract_cache_key(content_hash))
+    if not cached:
+        # PDF sem intervalo de páginas e arquivos TXT/DOCX usam a mesma chave
+        return jsonify({'error': 'Texto não está em cache (envie o arquivo novamente)'}), 404
+    return jsonify({**cached, 'content_hash': content_hash, 'cached': True})
+
+
 # =============================================
 # ROTAS DE AUTENTICAÇÃO E ADMIN
 # =============================================
@@ -922,13 +2023,8 @@ def verify_user():
 def list_categories():
     """Lista todas as categorias"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM categories ORDER BY name ASC')
-        rows = cursor.fetchall()
+        rows = DB.connection().execute('SELECT * FROM categories ORDER BY name ASC').fetchall()
         categories = [dict(row) for row in rows]
-        conn.close()
         return jsonify({'categories': categories})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -943,12 +2039,8 @@ def create_category():
         if not name:
             return jsonify({'error': 'Nome da categoria é obrigatório'}), 400
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO categories (name) VALUES (?)', (name,))
-        conn.commit()
-        last_id = cursor.lastrowid
-        conn.close()
+        with DB.transaction() as conn:
+            last_id = conn.execute('INSERT INTO categories (name) VALUES (?)', (name,)).lastrowid
         return jsonify({'success': True, 'id': last_id}), 201
     except sqlite3.IntegrityError:
         return jsonify({'error': 'Esta categoria já existe'}), 400
@@ -960,51 +2052,146 @@ def create_category():
 def delete_category(category_id):
     """Remove uma categoria e desvincula os audiobooks dela"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        # Desvincula os audiobooks primeiro
-        conn.execute('UPDATE audiobooks SET category_id = NULL WHERE category_id = ?', (category_id,))
-        # Deleta a categoria
-        conn.execute('DELETE FROM categories WHERE id = ?', (category_id,))
-        conn.commit()
-        conn.close()
+        with DB.transaction() as conn:
+            # Desvincula os audiobooks primeiro
+            conn.execute('UPDATE audiobooks SET category_id = NULL WHERE category_id = ?', (category_id,))
+            # Deleta a categoria
+            conn.execute('DELETE FROM categories WHERE id = ?', (category_id,))
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ==================== CATÁLOGO ====================
+# Paginação por cursor (keyset): o cursor carrega a chave de ordenação do último item da página,
+# então a próxima página é um WHERE na própria ordem, sem OFFSET e sem pular/repetir itens
+# quando algo é publicado no meio da navegação.
+AUDIOBOOKS_PAGE_MAX = int(os.environ.get('AUDIOBOOKS_PAGE_MAX', 100))
+# Limite de parâmetros por IN (...) (SQLite antigo aceita no máximo 999 variáveis)
+SQL_IN_BATCH = 500
+
+
+def encode_catalog_cursor(project: dict) -> str:
+    key = [project['display_order'], project['created_at'], project['id']]
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_catalog_cursor(cursor_value: str):
+    """Retorna (display_order, created_at, id) ou levanta ValueError se o cursor for inválido"""
+    try:
+        padded = cursor_value + '=' * (-len(cursor_value) % 4)
+        display_order, created_at, project_id = json.loads(base64.urlsafe_b64decode(padded))
+        return int(display_order or 0), str(created_at), int(project_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def fetch_tracks_by_project(cursor, project_ids: list) -> dict:
+    """Todas as faixas dos projetos numa consulta (em lotes de IN), agrupadas por audiobook_id"""
+    tracks = {project_id: [] for project_id in project_ids}
+    for i in range(0, len(project_ids), SQL_IN_BATCH):
+        batch = project_ids[i:i + SQL_IN_BATCH]
+        cursor.execute(f'''
+            SELECT * FROM audiobook_tracks
+            WHERE audiobook_id IN ({', '.join('?' * len(batch))})
+            ORDER BY audiobook_id, position IS NULL, position ASC, created_at ASC
+        ''', batch)
+        for row in cursor.fetchall():
+            tracks[row['audiobook_id']].append(dict(row))
+    return tracks
+
+
 @app.route('/api/audiobooks', methods=['GET'])
 def list_audiobooks():
-    """Lista todos os projetos de audiobooks com suas faixas"""
+    """
+    Lista os projetos de audiobooks com suas faixas.
+    Query opcional: category_id, limit (ativa a paginação) e cursor (o next_cursor da página anterior).
+    Sem limit, retorna o catálogo inteiro (compatível com o painel admin).
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # 1. Busca os Projetos
-        cursor.execute('''
+        category_id = request.args.get('category_id', type=int)
+        limit = request.args.get('limit', type=int)
+        cursor_value = request.args.get('cursor')
+        if limit is not None:
+            limit = max(1, min(limit, AUDIOBOOKS_PAGE_MAX))
+
+        where, params = [], []
+        if category_id is not None:
+            where.append('a.category_id = ?')
+            params.append(category_id)
+        if cursor_value:
+            try:
+                after_order, after_created, after_id = decode_catalog_cursor(cursor_value)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            # Depois do último item na ordem (display_order ASC, created_at DESC, id DESC)
+            where.append('''(
+                a.display_order > ?
+                OR (a.display_order = ? AND a.created_at < ?)
+                OR (a.display_order = ? AND a.created_at = ? AND a.id < ?)
+            )''')
+            params += [after_order, after_order, after_created, after_order, after_created, after_id]
+
+        sql = '''
             SELECT a.*, c.name as category_name 
             FROM audiobooks a 
             LEFT JOIN categories c ON a.category_id = c.id
-            ORDER BY a.display_order ASC, a.created_at DESC
-        ''')
-        rows = cursor.fetchall()
-        projects = [dict(row) for row in rows]
-        
-        # 2. Busca as Faixas para cada projeto
+        '''
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY a.display_order ASC, a.created_at DESC, a.id DESC'
+        if limit is not None:
+            # Um a mais para saber se existe próxima página
+            sql += ' LIMIT ?'
+            params.append(limit + 1)
+
+        cursor = DB.connection().cursor()
+
+        # 1. Busca os Projetos
+        cursor.execute(sql, params)
+        projects = [dict(row) for row in cursor.fetchall()]
+        has_more = limit is not None and len(projects) > limit
+        if has_more:
+            projects = projects[:limit]
+
+        # 2. Busca as Faixas de todos os projetos da página de uma vez
+        tracks = fetch_tracks_by_project(cursor, [p['id'] for p in projects])
         for p in projects:
-            cursor.execute('''
-                SELECT * FROM audiobook_tracks 
-                WHERE audiobook_id = ? 
-                ORDER BY created_at ASC
-            ''', (p['id'],))
-            tracks = cursor.fetchall()
-            p['tracks'] = [dict(t) for t in tracks]
-            
-        conn.close()
-        return jsonify({'audiobooks': projects})
+            p['tracks'] = tracks[p['id']]
+        add_cover_urls(projects)
+
+        result = {'audiobooks': projects}
+        if limit is not None:
+            result['next_cursor'] = encode_catalog_cursor(projects[-1]) if has_more else None
+        return jsonify(result)
     except Exception as e:
         print(f"Erro ao listar: {e}")
         return jsonify({'error': 'Erro ao carregar'}), 500
 
+@app.route('/api/audiobooks/search', methods=['GET'])
+def search_audiobooks_route():
+    """
+    Busca no catálogo por título, descrição e categoria, do mais relevante para o menos.
+    Query: q (obrigatório), limit (padrão 20, máx. AUDIOBOOKS_PAGE_MAX) e offset.
+    """
+    try:
+        text = request.args.get('q', '').strip()
+        if not text:
+            return jsonify({'error': 'Parâmetro q é obrigatório'}), 400
+        limit = max(1, min(request.args.get('limit', 20, type=int), AUDIOBOOKS_PAGE_MAX))
+        offset = max(0, request.args.get('offset', 0, type=int))
+
+        conn = DB.connection()
+        projects = search_audiobooks(conn, text, limit, offset, fts_enabled=FTS_ENABLED)
+        tracks = fetch_tracks_by_project(conn.cursor(), [p['id'] for p in projects])
+        for p in projects:
+            p['tracks'] = tracks[p['id']]
+        add_cover_urls(projects)
+
+        return jsonify({'audiobooks': projects, 'q': text, 'limit': limit, 'offset': offset})
+    except Exception as e:
+        print(f"Erro na busca: {e}")
+        return jsonify({'error': 'Erro na busca'}), 500
+
 @app.route('/api/audiobooks/reorder', methods=['POST'])
 @require_admin
 def reorder_audiobooks():
@@ -1016,15 +2203,12 @@ def reorder_audiobooks():
         if not ordered_ids:
             return jsonify({'error': 'Lista de IDs não fornecida'}), 400
             
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Atualiza a ordem de cada item
-        for index, book_id in enumerate(ordered_ids):
-            cursor.execute('UPDATE audiobooks SET display_order = ? WHERE id = ?', (index, book_id))
-            
-        conn.commit()
-        conn.close()
+        # Atualiza a ordem de cada item (numa transação só)
+        with DB.transaction() as conn:
+            conn.executemany(
+                'UPDATE audiobooks SET display_order = ? WHERE id = ?',
+                [(index, book_id) for index, book_id in enumerate(ordered_ids)]
+            )
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1047,65 +2231,217 @@ def create_audiobook():
         if not audio_url:
             return jsonify({'error': 'Áudio obrigatório'}), 400
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        # Áudio hospedado aqui: duração/bitrate calculados no servidor (o valor do cliente é só fallback)
+        audio_info = probe_uploaded_audio(audio_url)
+        bitrate = frame_count = None
+        if audio_info:
+            duration_seconds = audio_info['duration_seconds']
+            bitrate = audio_info['bitrate']
+            frame_count = audio_info['frames']
         
         if project_id:
             # Adicionar track a projeto existente
-            cursor.execute('''
-                INSERT INTO audiobook_tracks (audiobook_id, label, audio_url, duration_seconds)
-                VALUES (?, ?, ?, ?)
-            ''', (project_id, track_label, audio_url, duration_seconds))
-            conn.commit()
-            conn.close()
+            with DB.transaction() as conn:
+                conn.execute('''
+                    INSERT INTO audiobook_tracks (audiobook_id, label, audio_url, duration_seconds, bitrate, frame_count)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (project_id, track_label, audio_url, duration_seconds, bitrate, frame_count))
             return jsonify({'success': True, 'project_id': project_id}), 201
         else:
             # Criar novo projeto + primeira track
             if not title:
                 return jsonify({'error': 'Título obrigatório para novos projetos'}), 400
                 
-            try:
+            with DB.transaction() as conn:
+                cursor = conn.cursor()
+                new_project_id = insert_audiobook_project(cursor, title, description, cover_url, category_id)
+
                 cursor.execute('''
-                    INSERT INTO audiobooks (title, description, cover_url, category_id)
-                    VALUES (?, ?, ?, ?)
-                ''', (title, description, cover_url, category_id))
-            except sqlite3.IntegrityError as e:
-                # Fallback para bancos antigos onde audio_url/duration_seconds ainda são NOT NULL
-                if "audio_url" in str(e):
-                    cursor.execute('''
-                        INSERT INTO audiobooks (title, description, cover_url, category_id, audio_url, duration_seconds)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (title, description, cover_url, category_id, "", 0))
-                else:
-                    raise e
-            new_project_id = cursor.lastrowid
+                    INSERT INTO audiobook_tracks (audiobook_id, label, audio_url, duration_seconds, bitrate, frame_count)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (new_project_id, track_label, audio_url, duration_seconds, bitrate, frame_count))
             
-            cursor.execute('''
-                INSERT INTO audiobook_tracks (audiobook_id, label, audio_url, duration_seconds)
-                VALUES (?, ?, ?, ?)
-            ''', (new_project_id, track_label, audio_url, duration_seconds))
-            
-            conn.commit()
-            conn.close()
             return jsonify({'success': True, 'id': new_project_id}), 201
             
     except Exception as e:
         print(f"Erro ao publicar: {e}")
         return jsonify({'error': str(e)}), 500
 
+def insert_audiobook_project(cursor, title, description, cover_url, category_id) -> int:
+    """Cria o projeto (audiobook) e retorna o id"""
+    try:
+        cursor.execute('''
+            INSERT INTO audiobooks (title, description, cover_url, category_id)
+            VALUES (?, ?, ?, ?)
+        ''', (title, description, cover_url, category_id))
+    except sqlite3.IntegrityError as e:
+        # Fallback para bancos antigos onde audio_url/duration_seconds ainda são NOT NULL
+        if "audio_url" in str(e):
+            cursor.execute('''
+                INSERT INTO audiobooks (title, description, cover_url, category_id, audio_url, duration_seconds)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (title, description, cover_url, category_id, "", 0))
+        else:
+            raise e
+    return cursor.lastrowid
+
+
+# ==================== GERAÇÃO POR CAPÍTULOS ====================
+# O texto extraído é dividido nos títulos de capítulo; cada capítulo vira um job próprio
+# (sintetizados em paralelo pelo pool) e, ao terminar, uma faixa do projeto em audiobook_tracks.
+# O ouvinte já pode começar o capítulo 1 enquanto os outros renderizam, e uma falha
+# custa só o capítulo que falhou (que pode ser retomado com /api/generate/retry).
+
+# Seções menores que isso (ex: títulos de um sumário) são juntadas à seção seguinte
+CHAPTER_MIN_CHARS = int(os.environ.get('CHAPTER_MIN_CHARS', 200))
+# URL pública da API usada nas faixas publicadas em background (padrão: host da requisição)
+PUBLIC_BASE_URL = os.environ.get('PUBLIC_BASE_URL', '')
+
+
+def detect_chapters(text: str) -> list:
+    """
+    Divide o texto nos títulos de capítulo. Retorna [{'title', 'text'}] na ordem do livro;
+    sem títulos reconhecidos, o livro inteiro vira um único capítulo.
+    O texto de cada capítulo começa pelo próprio título (que também é narrado).
+    """
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    starts = [m.start() for m in CHAPTER_HEADING_RE.finditer(text)]
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+
+    chapters = []
+    carry = ''
+    for i, start in enumerate(starts):
+        section = text[start:starts[i + 1] if i + 1 < len(starts) else len(text)].strip()
+        if not section:
+            continue
+        heading = section.split('\n', 1)[0].strip()
+        body = section[len(heading):].strip()
+        section = f'{carry}\n\n{section}'.strip() if carry else section
+        if len(body) < CHAPTER_MIN_CHARS:
+            carry = section
+            continue
+        carry = ''
+        title = heading if CHAPTER_HEADING_RE.fullmatch(heading) else 'Abertura'
+        chapters.append({'title': ' '.join(title.split())[:120], 'text': section})
+
+    if carry:
+        if chapters:
+            chapters[-1]['text'] += '\n\n' + carry
+        else:
+            chapters.append({'title': 'Texto completo', 'text': carry})
+    return chapters
+
+
+def publish_job_track(output_path: str, publish: dict, audio_info: dict = None) -> dict:
+    """Copia o áudio do job para uploads e o registra como faixa do projeto"""
+    filename = f"{uuid.uuid4()}_capitulo_{publish['position']}.mp3"
+    shutil.copyfile(output_path, os.path.join(AUDIO_UPLOADS_DIR, filename))
+    audio_url = f"{publish.get('base_url', '').rstrip('/')}{AUDIO_UPLOADS_URL_PREFIX}{filename}"
+    audio_info = audio_info or {}
+
+    with DB.transaction() as conn:
+        track_id = conn.execute('''
+            INSERT INTO audiobook_tracks (audiobook_id, label, audio_url, duration_seconds, bitrate, frame_count, position)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (publish['audiobook_id'], publish['label'], audio_url, audio_info.get('duration_seconds', 0),
+              audio_info.get('bitrate'), audio_info.get('frames'), publish['position'])).lastrowid
+    print(f"📚 Faixa {track_id} publicada: {publish['label']}")
+    return {'id': track_id, 'audio_url': audio_url}
+
+
+def delete_track(track_id: int):
+    """Remove a faixa e, se o áudio for local, o arquivo"""
+    with DB.transaction() as conn:
+        row = conn.execute('SELECT audio_url FROM audiobook_tracks WHERE id = ?', (track_id,)).fetchone()
+        conn.execute('DELETE FROM audiobook_tracks WHERE id = ?', (track_id,))
+    path = uploaded_audio_path(row[0]) if row else None
+    if path:
+        os.remove(path)
+
+
+@app.route('/api/generate/chapters', methods=['POST'])
+@require_admin
+def generate_chapters():
+    """
+    Gera um audiobook com uma faixa por capítulo.
+    Body: text, voice e project_id (projeto existente) ou title/description/cover_url/category_id.
+    Com detect_only=true, só retorna os capítulos detectados (nada é criado).
+    """
+    try:
+        data = request.get_json() or {}
+        text = data.get('text', '').strip()
+        voice = data.get('voice', 'pt-BR-AntonioNeural')
+        project_id = data.get('project_id')
+        title = data.get('title', '').strip()
+
+        if not text:
+            return jsonify({'error': 'Texto não pode estar vazio'}), 400
+        if voice not in AVAILABLE_VOICES:
+            return jsonify({'error': f'Voz {voice} não suportada'}), 400
+
+        chapters = detect_chapters(text)
+        if data.get('detect_only'):
+            return jsonify({'chapters': [
+                {'position': i, 'title': c['title'], 'char_count': len(c['text'])}
+                for i, c in enumerate(chapters, start=1)
+            ]})
+
+        if not project_id and not title:
+            return jsonify({'error': 'Título obrigatório para novos projetos'}), 400
+
+        cursor = DB.connection().cursor()
+        if project_id:
+            if not cursor.execute('SELECT 1 FROM audiobooks WHERE id = ?', (project_id,)).fetchone():
+                return jsonify({'error': 'Projeto não encontrado'}), 404
+            # Capítulos entram depois das faixas que já existem no projeto
+            first_position = cursor.execute(
+                'SELECT COALESCE(MAX(position), 0) + 1 FROM audiobook_tracks WHERE audiobook_id = ?', (project_id,)
+            ).fetchone()[0]
+        else:
+            with DB.transaction():
+                project_id = insert_audiobook_project(
+                    cursor, title, data.get('description', '').strip(), data.get('cover_url', ''),
+                    data.get('category_id')
+                )
+            first_position = 1
+
+        user = get_request_user_key()
+        base_url = PUBLIC_BASE_URL or request.host_url
+        jobs = []
+        for i, chapter in enumerate(chapters):
+            job_id = str(uuid.uuid4())
+            publish = {
+                'audiobook_id': project_id,
+                'label': chapter['title'],
+                'position': first_position + i,
+                'base_url': base_url
+            }
+            save_job_input(job_id, text=chapter['text'], voice=voice, document_id=None, user=user, publish=publish)
+            JOB_STORE.create(job_id, worker=current_worker_id(), owner=user, voice=voice,
+                             char_count=len(chapter['text']))
+            # Mesmo usuário: a fila justa mantém a ordem dos capítulos
+            JOB_SCHEDULER.submit(job_id, user, len(chapter['text']), chapter['text'], voice, None, publish)
+            jobs.append({'job_id': job_id, 'position': publish['position'], 'title': chapter['title']})
+
+        print(f"📚 Projeto {project_id}: {len(jobs)} capítulos enfileirados")
+        return jsonify({'success': True, 'project_id': project_id, 'jobs': jobs}), 202
+
+    except Exception as e:
+        print(f'❌ Erro ao gerar capítulos: {e}')
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+
 @app.route('/api/audiobooks/<int:audiobook_id>', methods=['DELETE'])
 @require_admin
 def delete_audiobook(audiobook_id):
     """Remove do SQLite"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        # Deleta as tracks primeiro
-        cursor.execute('DELETE FROM audiobook_tracks WHERE audiobook_id = ?', (audiobook_id,))
-        # Deleta o projeto
-        cursor.execute('DELETE FROM audiobooks WHERE id = ?', (audiobook_id,))
-        conn.commit()
-        conn.close()
+        with DB.transaction() as conn:
+            # Deleta as tracks primeiro
+            conn.execute('DELETE FROM audiobook_tracks WHERE audiobook_id = ?', (audiobook_id,))
+            # Deleta o projeto
+            conn.execute('DELETE FROM audiobooks WHERE id = ?', (audiobook_id,))
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1115,10 +2451,8 @@ def delete_audiobook(audiobook_id):
 def delete_audiobook_track(track_id):
     """Remove uma track específica"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.execute('DELETE FROM audiobook_tracks WHERE id = ?', (track_id,))
-        conn.commit()
-        conn.close()
+        with DB.transaction() as conn:
+            conn.execute('DELETE FROM audiobook_tracks WHERE id = ?', (track_id,))
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1142,53 +2476,243 @@ def update_audiobook(audiobook_id):
         values.append(audiobook_id)
         sql = f"UPDATE audiobooks SET {', '.join(fields)} WHERE id = ?"
         
-        conn = sqlite3.connect(DB_PATH)
-        conn.execute(sql, values)
-        conn.commit()
-        conn.close()
+        with DB.transaction() as conn:
+            conn.execute(sql, values)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# ==================== METADADOS DE ÁUDIO ====================
+
+def probe_audio_file(path: str):
+    """Duração, bitrate e nº de frames de um MP3 local (None se não for possível ler)"""
+    try:
+        info = probe_mp3(path)
+    except OSError as e:
+        print(f"⚠️ Não foi possível analisar {path}: {e}")
+        return None
+    return info if info['frames'] else None
+
+
+def probe_uploaded_audio(audio_url: str):
+    path = uploaded_audio_path(audio_url)
+    return probe_audio_file(path) if path else None
+
+
+# ==================== CAPAS ====================
+# O upload guarda o original; as versões WebP (thumb, card, full) são geradas em background
+# e servidas em /api/uploads/covers/<arquivo>?size=<tamanho>&v=<versão> com cache imutável.
+# Enquanto a versão não fica pronta (ou sem Pillow), a mesma URL entrega o original.
+COVERS_URL_PREFIX = '/api/uploads/covers/'
+COVER_CACHE_MAX_AGE = 365 * 24 * 3600
+# Uma thread basta: capas chegam uma de cada vez, pelo painel admin
+COVER_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+COVERS_PROCESSING = set()
+# Arquivos que não são imagem válida: não tenta de novo a cada acesso
+COVERS_FAILED = set()
+COVERS_PROCESSING_LOCK = threading.Lock()
+
+
+def process_cover_in_background(file_path: str):
+    """Agenda a geração das versões (uma vez por arquivo, mesmo com pedidos repetidos)"""
+    if not PIL_SUPPORT:
+        return
+    with COVERS_PROCESSING_LOCK:
+        if file_path in COVERS_PROCESSING or file_path in COVERS_FAILED:
+            return
+        COVERS_PROCESSING.add(file_path)
+
+    def run():
+        try:
+            process_cover(file_path)
+            print(f"🖼️ Capa processada: {os.path.basename(file_path)}")
+        except Exception as e:
+            print(f"⚠️ Não foi possível processar a capa {os.path.basename(file_path)}: {e}")
+            with COVERS_PROCESSING_LOCK:
+                COVERS_FAILED.add(file_path)
+        finally:
+            with COVERS_PROCESSING_LOCK:
+                COVERS_PROCESSING.discard(file_path)
+
+    COVER_EXECUTOR.submit(run)
+
+
+def cover_rendition_urls(cover_url: str):
+    """URLs das versões de uma capa hospedada aqui (None para capas externas ou sem Pillow)"""
+    if not PIL_SUPPORT or COVERS_URL_PREFIX not in (cover_url or ''):
+        return None
+    base_url = cover_url.split('?', 1)[0]
+    return {size: f"{base_url}?size={size}&v={COVER_RENDITIONS_VERSION}" for size in COVER_RENDITIONS}
+
+
+def add_cover_urls(projects: list):
+    for p in projects:
+        p['cover_urls'] = cover_rendition_urls(p.get('cover_url'))
+
+
+def send_cover(file_path: str, filename: str, size: str):
+    """Versão WebP pedida; cai no original enquanto ela não existir"""
+    path = rendition_path(filename, size)
+    if not os.path.isfile(path):
+        process_cover_in_background(file_path)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        return send_ranged_file(file_path, mimetype=mimetype, download_name=filename, public=True,
+                                offload_root=UPLOADS_DIR)
+    # Imutável só na URL com a versão atual (o arquivo dessa versão nunca é reescrito com outro conteúdo)
+    current = request.args.get('v') == str(COVER_RENDITIONS_VERSION)
+    return send_ranged_file(
+        path, mimetype='image/webp', download_name=f"{os.path.splitext(filename)[0]}.{size}.webp",
+        max_age=COVER_CACHE_MAX_AGE if current else None, public=True, immutable=current,
+        offload_root=UPLOADS_DIR
+    )
+
+
 @app.route('/api/upload/cover', methods=['POST'])
 @require_admin
 def upload_cover():
-    """Upload de capa para disco local"""
+    """Upload de capa para disco local (as versões redimensionadas são geradas em background)"""
     if 'file' not in request.files:
         return jsonify({'error': 'Sem arquivo'}), 400
     file = request.files['file']
     filename = f"{uuid.uuid4()}_{file.filename}"
     file_path = os.path.join(COVERS_DIR, filename)
     file.save(file_path)
+    process_cover_in_background(file_path)
     
     # URL aponta para o nosso próprio domínio
-    public_url = f"/api/uploads/covers/{filename}"
-    return jsonify({'success': True, 'url': public_url})
+    public_url = f"{COVERS_URL_PREFIX}{filename}"
+    return jsonify({'success': True, 'url': public_url, 'renditions': cover_rendition_urls(public_url)})
+
+def uploaded_audio_response(file_path: str):
+    """Resposta comum dos uploads de áudio: URL pública + metadados lidos do MP3"""
+    public_url = f"{AUDIO_UPLOADS_URL_PREFIX}{os.path.basename(file_path)}"
+    audio_info = probe_audio_file(file_path) or {}
+    return jsonify({
+        'success': True,
+        'url': public_url,
+        'duration_seconds': audio_info.get('duration_seconds'),
+        'bitrate': audio_info.get('bitrate'),
+        'frames': audio_info.get('frames')
+    })
+
 
 @app.route('/api/upload/audio', methods=['POST'])
 @require_admin
 def upload_audio_file():
-    """Upload de áudio para disco local"""
+    """Upload de áudio para disco local (arquivos grandes: use as sessões de upload resumível)"""
     if 'file' not in request.files:
         return jsonify({'error': 'Sem arquivo'}), 400
     file = request.files['file']
     filename = f"{uuid.uuid4()}_{file.filename}"
     file_path = os.path.join(AUDIO_UPLOADS_DIR, filename)
     file.save(file_path)
-    
-    public_url = f"/api/uploads/audiobooks/{filename}"
-    return jsonify({'success': True, 'url': public_url})
+    return uploaded_audio_response(file_path)
+
+
+# ==================== UPLOAD RESUMÍVEL ====================
+# Áudios grandes sobem em partes numeradas com SHA-256; se a conexão cair, o cliente consulta
+# o offset recebido e continua dali (protocolo em resumable_uploads.py)
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE_MB', 8)) * 1024 * 1024
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_MB', 2048)) * 1024 * 1024
+# Sessão sem nenhuma parte nova por este tempo é descartada
+UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', 24 * 3600))
+# Dentro de uploads/ para o os.replace final ser no mesmo sistema de arquivos (atômico)
+UPLOAD_SESSIONS = UploadSessionStore(
+    os.path.join(UPLOADS_DIR, '.partial'), UPLOAD_CHUNK_SIZE, UPLOAD_MAX_BYTES, UPLOAD_SESSION_TTL
+)
+
+
+def upload_error_response(e: UploadError):
+    body = {'error': str(e)}
+    if e.session:
+        # Diz ao cliente de onde continuar
+        body.update(UPLOAD_SESSIONS.describe(e.session))
+    return jsonify(body), e.status
+
+
+def purge_expired_uploads():
+    try:
+        for upload_id in UPLOAD_SESSIONS.purge_expired():
+            print(f"🧹 Upload {upload_id} abandonado removido")
+    except Exception as e:
+        print(f"Erro ao limpar uploads: {e}")
+
+
+@app.route('/api/upload/audio/sessions', methods=['POST'])
+@require_admin
+def create_upload_session():
+    """Abre uma sessão de upload. Body: filename, size (bytes) e sha256 opcional do arquivo inteiro."""
+    data = request.get_json() or {}
+    try:
+        session = UPLOAD_SESSIONS.create(data.get('filename'), data.get('size'), data.get('sha256'))
+    except UploadError as e:
+        return upload_error_response(e)
+    print(f"📤 Upload {session['upload_id']}: {session['filename']} ({session['size'] / 1024 / 1024:.1f} MB)")
+    return jsonify(UPLOAD_SESSIONS.describe(session)), 201
+
+
+@app.route('/api/upload/audio/sessions/<upload_id>', methods=['GET'])
+@require_admin
+def get_upload_session(upload_id):
+    """Offset já recebido: o cliente retoma a partir da parte next_chunk"""
+    try:
+        return jsonify(UPLOAD_SESSIONS.describe(UPLOAD_SESSIONS.get(upload_id)))
+    except UploadError as e:
+        return upload_error_response(e)
+
+
+@app.route('/api/upload/audio/sessions/<upload_id>/chunks/<int:index>', methods=['PUT'])
+@require_admin
+def put_upload_chunk(upload_id, index):
+    """Recebe a parte `index` (corpo cru, não multipart) lendo direto do socket"""
+    try:
+        session = UPLOAD_SESSIONS.write_chunk(
+            upload_id, index, request.stream, request.content_length, request.headers.get('X-Chunk-SHA256')
+        )
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify(UPLOAD_SESSIONS.describe(session))
+
+
+@app.route('/api/upload/audio/sessions/<upload_id>/complete', methods=['POST'])
+@require_admin
+def complete_upload_session(upload_id):
+    """Confere o arquivo inteiro e o publica em uploads/audiobooks (mesma resposta do upload simples)"""
+    try:
+        file_path = UPLOAD_SESSIONS.complete(upload_id, AUDIO_UPLOADS_DIR)
+    except UploadError as e:
+        return upload_error_response(e)
+    print(f"✅ Upload {upload_id} concluído: {os.path.basename(file_path)}")
+    return uploaded_audio_response(file_path)
+
+
+@app.route('/api/upload/audio/sessions/<upload_id>', methods=['DELETE'])
+@require_admin
+def abort_upload_session(upload_id):
+    try:
+        UPLOAD_SESSIONS.abort(upload_id)
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify({'success': True})
 
 @app.route('/api/uploads/<folder>/<filename>')
 def serve_uploads(folder, filename):
-    """Serve arquivos da pasta uploads"""
-    folder_path = os.path.join(UPLOADS_DIR, folder)
+    """Serve arquivos da pasta uploads (com Range: o player pula direto para o trecho pedido)"""
+    file_path = safe_join(UPLOADS_DIR, folder, filename)
+    if not file_path or not os.path.isfile(file_path):
+        return jsonify({'error': 'Arquivo não encontrado'}), 404
+    # Capas: ?size=thumb|card|full entrega a versão WebP redimensionada
+    size = request.args.get('size')
+    if folder == 'covers' and size:
+        if size not in COVER_RENDITIONS:
+            return jsonify({'error': f"Tamanho inválido (use {', '.join(COVER_RENDITIONS)})"}), 400
+        return send_cover(file_path, filename, size)
     # Se passar ?download=true, força o download no navegador
     download = request.args.get('download', '').lower() == 'true'
-    return send_from_directory(folder_path, filename, as_attachment=download, download_name=filename)
-
-from flask import send_from_directory
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    return send_ranged_file(file_path, mimetype=mimetype, as_attachment=download, download_name=filename,
+                            offload_root=UPLOADS_DIR)
 
 
 @app.route('/', methods=['GET'])
@@ -1211,6 +2735,15 @@ def root():
 
 
 
+# Rodando com "python app.py", os processos do pool de PDF importam este arquivo como __mp_main__:
+# lá as threads de fundo não podem subir (um processo do pool não é um worker de jobs)
+if __name__ != '__mp_main__':
+    if PREVIEW_WARMUP:
+        threading.Thread(target=warm_preview_cache, daemon=True).start()
+
+    threading.Thread(target=job_maintenance_loop, daemon=True).start()
+
+
 if __name__ == '__main__':
     import os
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,55 @@
+"""
+Preenche duração, bitrate e nº de frames das faixas já publicadas (audiobook_tracks)
+lendo os cabeçalhos dos MP3 em uploads/audiobooks.
+
+Uso:
+    python backfill_track_metadata.py            # só faixas sem metadados
+    python backfill_track_metadata.py --all      # recalcula todas
+    python backfill_track_metadata.py --dry-run  # mostra o que mudaria
+"""
+
+import sqlite3
+import argparse
+
+from mp3_frames import probe_mp3
+from storage import DB_PATH, migrate_track_columns, uploaded_audio_path
+
+
+def backfill(recompute_all: bool = False, dry_run: bool = False):
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    migrate_track_columns(conn.cursor())
+
+    sql = 'SELECT id, audio_url, duration_seconds FROM audiobook_tracks'
+    if not recompute_all:
+        sql += ' WHERE frame_count IS NULL'
+    rows = conn.execute(sql).fetchall()
+
+    updated = skipped = 0
+    for row in rows:
+        path = uploaded_audio_path(row['audio_url'])
+        info = probe_mp3(path) if path else None
+        if not info or not info['frames']:
+            print(f"⏭️  Faixa {row['id']}: arquivo local não encontrado ou não é MP3 ({row['audio_url']})")
+            skipped += 1
+            continue
+        print(f"🔄 Faixa {row['id']}: {row['duration_seconds'] or 0:.1f}s -> {info['duration_seconds']:.1f}s "
+              f"({info['bitrate'] // 1000} kbps, {info['frames']} frames)")
+        if not dry_run:
+            conn.execute(
+                'UPDATE audiobook_tracks SET duration_seconds = ?, bitrate = ?, frame_count = ? WHERE id = ?',
+                (info['duration_seconds'], info['bitrate'], info['frames'], row['id'])
+            )
+        updated += 1
+
+    conn.commit()
+    conn.close()
+    print(f"✅ {updated} faixas atualizadas, {skipped} ignoradas{' (dry-run)' if dry_run else ''}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Preenche os metadados MP3 das faixas publicadas')
+    parser.add_argument('--all', action='store_true', help='recalcula também as faixas que já têm metadados')
+    parser.add_argument('--dry-run', action='store_true', help='não grava nada no banco')
+    args = parser.parse_args()
+    backfill(recompute_all=args.all, dry_run=args.dry_run)
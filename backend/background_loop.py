@@ -0,0 +1,64 @@
+"""
+Event loop asyncio de longa duração rodando numa thread dedicada
+Handlers Flask e workers de jobs submetem corrotinas para ele em vez de criar
+(e destruir) um loop novo a cada chamada.
+"""
+
+import os
+import asyncio
+import threading
+
+
+async def _anext(agen):
+    return await agen.__anext__()
+
+
+async def _aclose(agen):
+    await agen.aclose()
+
+
+class BackgroundLoop:
+    """Loop único por processo (recriado se o processo sofrer fork, ex: gunicorn)"""
+
+    def __init__(self, name: str = 'asyncio-loop'):
+        self.name = name
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._start()
+            return self._loop
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        threading.Thread(target=run, name=self.name, daemon=True).start()
+        ready.wait()
+        self._loop = loop
+        self._pid = os.getpid()
+
+    def run(self, coro):
+        """Executa a corrotina no loop e bloqueia até o resultado"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def iterate(self, agen):
+        """Consome um gerador assíncrono a partir de código síncrono (ex: corpo de resposta Flask)"""
+        loop = self.loop
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(_anext(agen), loop).result()
+                except StopAsyncIteration:
+                    break
+        finally:
+            asyncio.run_coroutine_threadsafe(_aclose(agen), loop).result()
@@ -0,0 +1,158 @@
+"""
+Benchmark de carga do catálogo (GET /api/audiobooks) no SQLite:
+conexão nova por requisição, journal padrão e sem índices (como era)
+contra a conexão por thread do db.py (WAL + pragmas) com os índices do init_db.
+Leitores em várias threads, com um "admin" gravando a ordem dos livros ao mesmo tempo.
+
+Uso:
+    python bench_catalog.py                       # 5000 livros, 8 threads, 5 s por cenário
+    python bench_catalog.py --books 20000 --seconds 10
+"""
+
+import os
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+import db as db_module
+from db import Database
+
+PAGE_SIZE = 24
+
+SCHEMA = '''
+    CREATE TABLE categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE);
+    CREATE TABLE audiobooks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, description TEXT, cover_url TEXT,
+        category_id INTEGER, display_order INTEGER DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE audiobook_tracks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, audiobook_id INTEGER NOT NULL, label TEXT NOT NULL,
+        audio_url TEXT NOT NULL, duration_seconds REAL DEFAULT 0, bitrate INTEGER, frame_count INTEGER,
+        position INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+# Os mesmos do init_db
+INDEXES = '''
+    CREATE INDEX idx_audiobooks_display_order ON audiobooks (display_order, created_at DESC, id DESC);
+    CREATE INDEX idx_audiobooks_category ON audiobooks (category_id, display_order, created_at DESC, id DESC);
+    CREATE INDEX idx_audiobook_tracks_audiobook ON audiobook_tracks (audiobook_id, position);
+'''
+
+
+def build_db(path: str, books: int, indexed: bool):
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany('INSERT INTO categories (name) VALUES (?)', [(f'Categoria {i}',) for i in range(12)])
+    conn.executemany(
+        'INSERT INTO audiobooks (title, description, category_id, display_order, created_at) VALUES (?, ?, ?, ?, ?)',
+        [(f'Livro {i}', 'Descrição ' * 20, rng.randint(1, 12), rng.randint(0, 50),
+          f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00') for i in range(books)]
+    )
+    conn.executemany(
+        'INSERT INTO audiobook_tracks (audiobook_id, label, audio_url, duration_seconds, position) '
+        'VALUES (?, ?, ?, ?, ?)',
+        [(book_id, f'Capítulo {p}', f'/api/uploads/audiobooks/{book_id}_{p}.mp3', 600.0, p)
+         for book_id in range(1, books + 1) for p in range(1, rng.randint(2, 8))]
+    )
+    if indexed:
+        conn.executescript(INDEXES)
+    conn.commit()
+    conn.close()
+
+
+def catalog_page(conn, category_id=None):
+    """Primeira página do catálogo (mesmas consultas do list_audiobooks)"""
+    sql = 'SELECT a.*, c.name as category_name FROM audiobooks a LEFT JOIN categories c ON a.category_id = c.id'
+    params = []
+    if category_id is not None:
+        sql += ' WHERE a.category_id = ?'
+        params.append(category_id)
+    sql += ' ORDER BY a.display_order ASC, a.created_at DESC, a.id DESC LIMIT ?'
+    params.append(PAGE_SIZE + 1)
+    projects = [dict(row) for row in conn.execute(sql, params).fetchall()][:PAGE_SIZE]
+    ids = [p['id'] for p in projects]
+    tracks = {i: [] for i in ids}
+    rows = conn.execute(
+        f"SELECT * FROM audiobook_tracks WHERE audiobook_id IN ({', '.join('?' * len(ids))}) "
+        "ORDER BY audiobook_id, position IS NULL, position ASC, created_at ASC", ids
+    ).fetchall()
+    for row in rows:
+        tracks[row['audiobook_id']].append(dict(row))
+    return projects
+
+
+def run(get_conn, done_with, write_conn, books: int, threads: int, seconds: float):
+    stop = time.perf_counter() + seconds
+    counts, errors, writes = [0] * threads, [0], [0]
+
+    def reader(n):
+        rng = random.Random(n)
+        while time.perf_counter() < stop:
+            conn = get_conn()
+            try:
+                catalog_page(conn, rng.choice([None, None, rng.randint(1, 12)]))
+                counts[n] += 1
+            except sqlite3.OperationalError:
+                errors[0] += 1
+            finally:
+                done_with(conn)
+
+    def writer():
+        # Admin reordenando o catálogo (uma transação com todos os UPDATEs), duas vezes por segundo
+        rng = random.Random(99)
+        conn = write_conn()
+        while time.perf_counter() < stop:
+            with conn:
+                conn.executemany('UPDATE audiobooks SET display_order = ? WHERE id = ?',
+                                 [(rng.randint(0, 50), rng.randint(1, books)) for _ in range(2000)])
+            writes[0] += 1
+            time.sleep(0.5)
+        conn.close()
+
+    workers = [threading.Thread(target=reader, args=(n,)) for n in range(threads)]
+    workers.append(threading.Thread(target=writer))
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(counts) / seconds, errors[0], writes[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga do catálogo no SQLite')
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        pooled_path = os.path.join(tmp, 'pooled.db')
+        build_db(legacy_path, args.books, indexed=False)
+        build_db(pooled_path, args.books, indexed=True)
+        print(f"📚 {args.books} livros, {args.threads} threads lendo, 1 escrevendo, {args.seconds:.0f}s por cenário")
+
+        def legacy_conn():
+            conn = sqlite3.connect(legacy_path, timeout=db_module.DB_BUSY_TIMEOUT)
+            conn.row_factory = sqlite3.Row
+            return conn
+
+        rate, errors, writes = run(legacy_conn, lambda conn: conn.close(), lambda: sqlite3.connect(legacy_path),
+                                   args.books, args.threads, args.seconds)
+        print(f"conexão por requisição, sem WAL/índices: {rate:8.0f} páginas/s ({errors} erros, {writes} escritas)")
+
+        database = Database(pooled_path)
+        pooled_rate, errors, writes = run(database.connection, lambda conn: None,
+                                          lambda: sqlite3.connect(pooled_path), args.books, args.threads,
+                                          args.seconds)
+        print(f"db.py (WAL + pragmas) com índices:       {pooled_rate:8.0f} páginas/s ({errors} erros, {writes} escritas)"
+              f" -> {pooled_rate / rate:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
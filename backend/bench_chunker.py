@@ -0,0 +1,133 @@
+"""
+Benchmark do chunker (chunker.iter_chunks) contra o split_text_for_google original
+
+Uso:
+    python bench_chunker.py               # ~4 MB de texto
+    python bench_chunker.py --mb 16       # corpus maior
+"""
+
+import time
+import random
+import argparse
+
+from chunker import iter_chunks
+
+
+# Versão original (antes do chunker), mantida aqui só como referência de saída e de tempo
+def legacy_split_text_for_google(text, limit=4500):
+    """Divide o texto em chunks respeitando o limite de bytes do Google"""
+    chunks = []
+    current_chunk = ""
+    
+    # Normaliza quebras de linha
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    
+    # Divide primeiro por parágrafos para preservar estrutura
+    paragraphs = text.split('\n')
+    
+    for para in paragraphs:
+        if not para.strip():
+            continue
+            
+        # Se adicionar o parágrafo estourar o limite
+        if len((current_chunk + "\n" + para).encode('utf-8')) > limit:
+            # Se tem algo no buffer, salva
+            if current_chunk.strip():
+                chunks.append(current_chunk.strip())
+                current_chunk = ""
+            
+            # Se o parágrafo sozinho é maior que o limite, divide por frases
+            if len(para.encode('utf-8')) > limit:
+                import re
+                # Split por pontuação final (. ? !)
+                sentences = re.split(r'(?<=[.!?])\s+', para)
+                for sent in sentences:
+                    if len((current_chunk + " " + sent).encode('utf-8')) > limit:
+                        if current_chunk:
+                            chunks.append(current_chunk)
+                            current_chunk = ""
+                        # Se a frase sozinha é gigante (muito raro), corta na força bruta
+                        if len(sent.encode('utf-8')) > limit:
+                             # Corta a cada limit caracteres (aproximado)
+                             while sent:
+                                 part = sent[:limit]
+                                 # Tenta não cortar palavra no meio
+                                 last_space_idx = part.rfind(' ')
+                                 if last_space_idx > limit - 100:
+                                     part = sent[:last_space_idx]
+                                     sent = sent[last_space_idx:].strip()
+                                 else:
+                                     # Se não achar espaço, corta bruto
+                                     sent = sent[len(part):].strip()
+                                 chunks.append(part)
+                        else:
+                            current_chunk = sent
+                    else:
+                        current_chunk += (" " if current_chunk else "") + sent
+            else:
+                current_chunk = para
+        else:
+            current_chunk += ("\n" if current_chunk else "") + para
+            
+    if current_chunk:
+        chunks.append(current_chunk)
+        
+    return chunks
+
+
+WORDS = (
+    'o a de que e do da em um para com não uma os no se na por mais as dos como mas ao ele das '
+    'à seu sua ou quando muito nos já eu também só pelo pela até isso ela entre depois sem mesmo '
+    'aos seus quem nas me esse eles você essa num nem suas meu às minha numa pelos elas qual '
+    'nós lhe deles essas esses pelas este dele tu te vocês vos lhes meus minhas teu tua teus '
+    'coração ação informação capítulo então também água lição opinião razão'
+).split()
+
+
+def make_corpus(megabytes: float, seed: int = 42) -> str:
+    """Texto em português com parágrafos curtos, médios e gigantes (força o split por frases)"""
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    paragraphs, size = [], 0
+    while size < target:
+        kind = rng.random()
+        sentences = 2 if kind < 0.6 else 12 if kind < 0.95 else 120
+        para = ' '.join(
+            ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 30))).capitalize() + rng.choice('.!?')
+            for _ in range(sentences)
+        )
+        paragraphs.append(para)
+        size += len(para.encode('utf-8')) + 1
+    return '\n'.join(paragraphs)
+
+
+def bench(fn, text, limit, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text, limit)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do chunker de texto')
+    parser.add_argument('--mb', type=float, default=4, help='tamanho do corpus em MB')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    text = make_corpus(args.mb)
+    print(f"📚 Corpus: {len(text.encode('utf-8')) / 1024 / 1024:.1f} MB, {text.count(chr(10)) + 1} parágrafos")
+
+    for limit in (3000, 4500, 5000):
+        legacy_time, legacy = bench(legacy_split_text_for_google, text, limit, args.repeat)
+        new_time, new = bench(lambda t, l: list(iter_chunks(t, l)), text, limit, args.repeat)
+        same = legacy == new
+        oversized = sum(1 for c in new if len(c.encode('utf-8')) > limit)
+        print(f"limit={limit}: original {legacy_time * 1000:.0f} ms | chunker {new_time * 1000:.0f} ms "
+              f"({legacy_time / new_time:.1f}x) | {len(new)} chunks | saída idêntica: {'sim' if same else 'NÃO'} "
+              f"| acima do limite: {oversized}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark da limpeza de texto extraído (text_cleanup) contra a versão original do /api/extract
+
+Uso:
+    python bench_text_cleanup.py            # ~8 MB de texto
+    python bench_text_cleanup.py --mb 32    # corpus maior
+"""
+
+import re
+import time
+import random
+import argparse
+
+from text_cleanup import LineJoiner, clean_extracted_text
+
+
+def legacy_clean(text: str) -> str:
+    """Limpeza original (antes do text_cleanup), mantida aqui como referência de saída e de tempo"""
+    # 1. Normalização básica de caracteres
+    text = text.replace('\r', '')
+
+    # 2. Divide em linhas para processamento
+    lines = text.split('\n')
+    cleaned_lines = []
+    buffer = ""
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        line = re.sub(r'\s+', ' ', line)
+
+        if not buffer:
+            buffer = line
+            continue
+
+        if buffer.endswith(('.', '!', '?', ':', ';')):
+            cleaned_lines.append(buffer)
+            buffer = line
+        elif buffer.endswith('-'):
+            buffer = buffer[:-1] + line
+        else:
+            buffer += " " + line
+
+    if buffer:
+        cleaned_lines.append(buffer)
+
+    return "\n".join(cleaned_lines)
+
+
+WORDS = (
+    'o a de que e do da em um para com não uma os no se na por mais as dos como mas ao ele das '
+    'coração ação informação capítulo então também água lição opinião razão extraordinariamente '
+    'desenvolvimento responsabilidade aproximadamente'
+).split()
+SPACES = [' ', ' ', ' ', '  ', '   ', '\t', ' ']
+
+
+def make_corpus(megabytes: float, seed: int = 7) -> str:
+    """Texto com cara de PDF: linhas de ~80 colunas, espaços duplos, hifenização, \\r\\n e linhas vazias"""
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    lines, size = [], 0
+    while size < target:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 14))]
+        line = ''.join(w + rng.choice(SPACES) for w in words).rstrip()
+        roll = rng.random()
+        if roll < 0.15:
+            line += '.'
+        elif roll < 0.2:
+            line += rng.choice('!?:;')
+        elif roll < 0.3:
+            line += '-'
+        if rng.random() < 0.05:
+            lines.append('')
+        lines.append(rng.choice(['', ' ', '  ']) + line)
+        size += len(line) + 2
+    return '\r\n'.join(lines)
+
+
+def bench(fn, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def compiled_regex_clean(text: str) -> str:
+    """Mesma passada única do LineJoiner, mas normalizando espaços com um regex pré-compilado"""
+    paragraphs, parts = [], []
+    for line in text.replace('\r', '').split('\n'):
+        line = WHITESPACE_RE.sub(' ', line).strip()
+        if not line:
+            continue
+        if not parts:
+            parts.append(line)
+        elif parts[-1].endswith(('.', '!', '?', ':', ';')):
+            paragraphs.append(''.join(parts))
+            parts = [line]
+        elif parts[-1].endswith('-'):
+            parts[-1] = parts[-1][:-1]
+            parts.append(line)
+        else:
+            parts += (' ', line)
+    if parts:
+        paragraphs.append(''.join(parts))
+    return '\n'.join(paragraphs)
+
+
+def paged(text: str) -> str:
+    """Mesma limpeza alimentando o texto em pedaços de ~3 KB (como as páginas de um PDF)"""
+    joiner = LineJoiner()
+    lines = text.split('\n')
+    paragraphs = []
+    for i in range(0, len(lines), 40):
+        paragraphs.extend(joiner.feed('\n'.join(lines[i:i + 40])))
+    paragraphs.extend(joiner.close())
+    return '\n'.join(paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da limpeza de texto extraído')
+    parser.add_argument('--mb', type=float, default=8, help='tamanho do corpus em MB')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    text = make_corpus(args.mb)
+    print(f"📚 Corpus: {len(text) / 1024 / 1024:.1f} MB, {text.count(chr(10)) + 1} linhas")
+
+    legacy_time, legacy = bench(legacy_clean, text, args.repeat)
+    new_time, new = bench(clean_extracted_text, text, args.repeat)
+    paged_time, by_page = bench(paged, text, args.repeat)
+    regex_time, by_regex = bench(compiled_regex_clean, text, args.repeat)
+    print(f"original:           {legacy_time * 1000:.0f} ms")
+    print(f"text_cleanup:       {new_time * 1000:.0f} ms ({legacy_time / new_time:.1f}x) | "
+          f"saída idêntica: {'sim' if new == legacy else 'NÃO'}")
+    print(f"text_cleanup/pág.:  {paged_time * 1000:.0f} ms ({legacy_time / paged_time:.1f}x) | "
+          f"saída idêntica: {'sim' if by_page == legacy else 'NÃO'}")
+    print(f"regex compilada:    {regex_time * 1000:.0f} ms ({legacy_time / regex_time:.1f}x) | "
+          f"saída idêntica: {'sim' if by_regex == legacy else 'NÃO'}")
+
+
+if __name__ == "__main__":
+    main()
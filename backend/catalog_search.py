@@ -0,0 +1,124 @@
+"""
+Busca no catálogo de audiobooks com SQLite FTS5
+Índice audiobooks_fts (título, descrição e nome da categoria), com rowid = id do audiobook,
+mantido por triggers: qualquer INSERT/UPDATE/DELETE em audiobooks ou categories já atualiza a busca.
+Sem FTS5 no SQLite do sistema, a busca cai num LIKE simples (sem ranking por relevância).
+"""
+
+import re
+import sqlite3
+
+# Peso de cada coluna no bm25 (título vale mais que categoria, que vale mais que descrição)
+BM25_WEIGHTS = (10.0, 1.0, 3.0)
+
+# Palavras da busca do usuário (aspas e pontuação são descartadas; OR/NOT viram palavras comuns)
+QUERY_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Linhas do índice a partir das tabelas (reconstrução completa)
+INDEXED_ROW_SQL = '''
+    SELECT a.id, a.title, COALESCE(a.description, ''), COALESCE(c.name, '')
+    FROM audiobooks a LEFT JOIN categories c ON a.category_id = c.id
+'''
+
+SEARCH_SCHEMA = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS audiobooks_fts USING fts5(
+        title, description, category_name,
+        tokenize = 'unicode61 remove_diacritics 2'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS audiobooks_fts_insert AFTER INSERT ON audiobooks BEGIN
+        INSERT INTO audiobooks_fts (rowid, title, description, category_name)
+        SELECT new.id, new.title, COALESCE(new.description, ''),
+               COALESCE((SELECT name FROM categories WHERE id = new.category_id), '');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS audiobooks_fts_update
+    AFTER UPDATE OF title, description, category_id ON audiobooks BEGIN
+        DELETE FROM audiobooks_fts WHERE rowid = old.id;
+        INSERT INTO audiobooks_fts (rowid, title, description, category_name)
+        SELECT new.id, new.title, COALESCE(new.description, ''),
+               COALESCE((SELECT name FROM categories WHERE id = new.category_id), '');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS audiobooks_fts_delete AFTER DELETE ON audiobooks BEGIN
+        DELETE FROM audiobooks_fts WHERE rowid = old.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS categories_fts_update AFTER UPDATE OF name ON categories BEGIN
+        UPDATE audiobooks_fts SET category_name = new.name
+        WHERE rowid IN (SELECT id FROM audiobooks WHERE category_id = new.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS categories_fts_delete AFTER DELETE ON categories BEGIN
+        UPDATE audiobooks_fts SET category_name = ''
+        WHERE rowid IN (SELECT id FROM audiobooks WHERE category_id = old.id);
+    END;
+'''
+
+
+def create_search_index(conn: sqlite3.Connection) -> bool:
+    """
+    Cria a tabela FTS e os triggers (idempotente). Na primeira vez, indexa o catálogo existente.
+    Retorna False se o SQLite não tiver FTS5.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'audiobooks_fts'"
+    ).fetchone()
+    try:
+        conn.executescript(SEARCH_SCHEMA)
+    except sqlite3.OperationalError as e:
+        if 'fts5' not in str(e).lower():
+            raise
+        return False
+    if not exists:
+        rebuild_search_index(conn)
+    return True
+
+
+def rebuild_search_index(conn: sqlite3.Connection):
+    with conn:
+        conn.execute('DELETE FROM audiobooks_fts')
+        conn.execute(f'INSERT INTO audiobooks_fts (rowid, title, description, category_name) {INDEXED_ROW_SQL}')
+
+
+def fts_query(text: str) -> str:
+    """
+    Converte o texto digitado numa consulta FTS5 segura: cada palavra vira um prefixo entre aspas
+    ("dom casm" -> "dom"* "casm"*), todas obrigatórias. Vazio se não houver palavra.
+    """
+    return ' '.join(f'"{token}"*' for token in QUERY_TOKEN_RE.findall(text))
+
+
+def search_audiobooks(conn: sqlite3.Connection, text: str, limit: int, offset: int, fts_enabled: bool = True) -> list:
+    """Projetos (com category_name e rank) que casam com a busca, do mais relevante para o menos"""
+    if fts_enabled:
+        query = fts_query(text)
+        if not query:
+            return []
+        rows = conn.execute(f'''
+            SELECT a.*, c.name as category_name, bm25(audiobooks_fts, {', '.join(map(str, BM25_WEIGHTS))}) AS rank
+            FROM audiobooks_fts
+            JOIN audiobooks a ON a.id = audiobooks_fts.rowid
+            LEFT JOIN categories c ON a.category_id = c.id
+            WHERE audiobooks_fts MATCH ?
+            ORDER BY rank, a.display_order ASC, a.id DESC
+            LIMIT ? OFFSET ?
+        ''', (query, limit, offset)).fetchall()
+        return [dict(row) for row in rows]
+
+    # Sem FTS5: todas as palavras precisam aparecer em algum dos campos
+    tokens = QUERY_TOKEN_RE.findall(text)
+    if not tokens:
+        return []
+    where, params = [], []
+    for token in tokens:
+        where.append("(a.title LIKE ? OR a.description LIKE ? OR c.name LIKE ?)")
+        params += [f'%{token}%'] * 3
+    rows = conn.execute(f'''
+        SELECT a.*, c.name as category_name, NULL AS rank
+        FROM audiobooks a LEFT JOIN categories c ON a.category_id = c.id
+        WHERE {' AND '.join(where)}
+        ORDER BY a.display_order ASC, a.created_at DESC, a.id DESC
+        LIMIT ? OFFSET ?
+    ''', params + [limit, offset]).fetchall()
+    return [dict(row) for row in rows]
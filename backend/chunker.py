@@ -0,0 +1,106 @@
+"""
+Divisão de texto em chunks para os provedores de TTS, respeitando um limite em bytes (UTF-8)
+Mesmas regras do split_text_for_google original (parágrafos -> frases -> corte bruto),
+mas em tempo linear: o tamanho em bytes do chunk é acumulado, não recalculado a cada passo.
+"""
+
+import re
+
+# Limite rígido da API do Google (bytes por requisição de síntese)
+GOOGLE_MAX_BYTES = 5000
+# Tamanho máximo de cada chunk por provedor (None = sem teto imposto pela API)
+PROVIDER_MAX_BYTES = {
+    'google': GOOGLE_MAX_BYTES,
+    'edge': None,
+}
+
+# Fim de frase: espaço depois de . ! ?
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+
+def provider_limit(provider: str, configured: int) -> int:
+    """Limite efetivo: o configurado, mas nunca acima do teto da API do provedor"""
+    cap = PROVIDER_MAX_BYTES.get(provider)
+    return min(configured, cap) if cap else configured
+
+
+def utf8_len(text: str) -> int:
+    # Atalho: texto ASCII tem 1 byte por caractere
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+def cut_at_bytes(text: str, limit: int) -> str:
+    """Maior prefixo de text com no máximo limit bytes, sem partir um caractere multibyte"""
+    if text.isascii():
+        return text[:limit]
+    return text.encode('utf-8')[:limit].decode('utf-8', 'ignore')
+
+
+def split_oversized(sent: str, limit: int):
+    """Corta na força bruta uma frase maior que o limite, tentando não partir palavras"""
+    while sent:
+        part = cut_at_bytes(sent, limit)
+        # Tenta não cortar palavra no meio (procura um espaço nos últimos ~100 bytes do limite)
+        last_space_idx = part.rfind(' ')
+        if last_space_idx > 0 and utf8_len(part[:last_space_idx]) > limit - 100:
+            part = sent[:last_space_idx]
+            sent = sent[last_space_idx:].strip()
+        else:
+            # Se não achar espaço, corta bruto
+            sent = sent[len(part):].strip()
+        yield part
+
+
+def iter_chunks(text: str, limit: int = 4500):
+    """
+    Gera os chunks do texto, cada um com no máximo `limit` bytes em UTF-8.
+    Parágrafos são empacotados juntos (separados por "\\n"); um parágrafo maior que o
+    limite é dividido por frases, e uma frase maior que o limite é cortada na força bruta.
+    """
+    parts = []        # pedaços do chunk atual (juntados só na hora de emitir)
+    size = 0          # tamanho em bytes do chunk atual (0 = chunk vazio)
+
+    # Normaliza quebras de linha
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+    # Divide primeiro por parágrafos para preservar estrutura
+    for para in text.split('\n'):
+        if not para.strip():
+            continue
+        para_size = utf8_len(para)
+
+        # Se adicionar o parágrafo (com o separador) estourar o limite
+        if size + 1 + para_size > limit:
+            if size:
+                chunk = ''.join(parts).strip()
+                if chunk:
+                    yield chunk
+                parts, size = [], 0
+
+            if para_size > limit:
+                # Parágrafo sozinho é maior que o limite: divide por frases
+                for sent in SENTENCE_SPLIT_RE.split(para):
+                    sent_size = utf8_len(sent)
+                    if size + 1 + sent_size > limit:
+                        if size:
+                            yield ''.join(parts)
+                            parts, size = [], 0
+                        if sent_size > limit:
+                            yield from split_oversized(sent, limit)
+                        else:
+                            parts, size = [sent], sent_size
+                    elif size:
+                        parts += (' ', sent)
+                        size += 1 + sent_size
+                    else:
+                        parts, size = [sent], sent_size
+            else:
+                parts, size = [para], para_size
+        elif size:
+            parts += ('\n', para)
+            size += 1 + para_size
+        else:
+            parts, size = [para], para_size
+
+    if size:
+        yield ''.join(parts)
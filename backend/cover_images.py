@@ -0,0 +1,110 @@
+"""
+Versões redimensionadas das capas (WebP) para o catálogo
+O original enviado pelo admin fica intacto em uploads/covers; as versões ficam em
+uploads/covers/renditions/<arquivo original>.<tamanho>.v<versão>.webp e podem ser
+refeitas a qualquer momento a partir dele.
+
+Uso (reprocessar capas já enviadas):
+    python cover_images.py          # só as que ainda não têm as versões atuais
+    python cover_images.py --all    # refaz todas
+"""
+
+import os
+import argparse
+
+try:
+    from PIL import Image, ImageOps
+    PIL_SUPPORT = True
+except ImportError:
+    PIL_SUPPORT = False
+
+from storage import COVERS_DIR
+
+RENDITIONS_DIR = os.path.join(COVERS_DIR, 'renditions')
+
+# Largura máxima de cada versão (a altura segue a proporção; nunca amplia)
+COVER_RENDITIONS = {
+    'thumb': 200,
+    'card': 480,
+    'full': 1200,
+}
+COVER_WEBP_QUALITY = int(os.environ.get('COVER_WEBP_QUALITY', 80))
+# Mudou tamanho/qualidade: muda a versão. Ela entra no nome do arquivo e na URL (?v=), então
+# o cache imutável dos navegadores nunca segura uma versão velha
+COVER_RENDITIONS_VERSION = 1
+# Imagens maiores que isso (em pixels) são recusadas (proteção contra "decompression bomb")
+COVER_MAX_PIXELS = int(os.environ.get('COVER_MAX_PIXELS', 64 * 1024 * 1024))
+
+
+def rendition_path(filename: str, size: str) -> str:
+    return os.path.join(RENDITIONS_DIR, f"{filename}.{size}.v{COVER_RENDITIONS_VERSION}.webp")
+
+
+def has_renditions(filename: str) -> bool:
+    return all(os.path.isfile(rendition_path(filename, size)) for size in COVER_RENDITIONS)
+
+
+def process_cover(original_path: str) -> dict:
+    """
+    Gera todas as versões de uma capa. Retorna {tamanho: caminho}.
+    Levanta exceção se o arquivo não for uma imagem válida.
+    """
+    if not PIL_SUPPORT:
+        raise RuntimeError('Pillow não instalado')
+    os.makedirs(RENDITIONS_DIR, exist_ok=True)
+    filename = os.path.basename(original_path)
+
+    Image.MAX_IMAGE_PIXELS = COVER_MAX_PIXELS
+    with Image.open(original_path) as source:
+        # Fotos de celular: aplica a rotação do EXIF antes de redimensionar
+        image = ImageOps.exif_transpose(source)
+        # WebP aceita RGB/RGBA; paleta, CMYK, 16 bits etc. são convertidos
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info else 'RGB')
+
+        paths = {}
+        for size, max_width in COVER_RENDITIONS.items():
+            if image.width > max_width:
+                height = max(1, round(image.height * max_width / image.width))
+                resized = image.resize((max_width, height), Image.LANCZOS)
+            else:
+                resized = image
+            path = rendition_path(filename, size)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                resized.save(tmp_path, 'WEBP', quality=COVER_WEBP_QUALITY)
+                # Troca atômica: quem está servindo nunca vê um arquivo pela metade
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            paths[size] = path
+    return paths
+
+
+def reprocess_covers(process_all: bool = False):
+    processed = skipped = failed = 0
+    for filename in sorted(os.listdir(COVERS_DIR)):
+        original_path = os.path.join(COVERS_DIR, filename)
+        if not os.path.isfile(original_path):
+            continue
+        if not process_all and has_renditions(filename):
+            skipped += 1
+            continue
+        try:
+            process_cover(original_path)
+            print(f"🖼️ {filename}")
+            processed += 1
+        except Exception as e:
+            print(f"⚠️ {filename}: {e}")
+            failed += 1
+    print(f"✅ {processed} capas processadas, {skipped} já prontas, {failed} com erro")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Gera as versões WebP das capas enviadas')
+    parser.add_argument('--all', action='store_true', help='refaz também as capas que já têm as versões atuais')
+    args = parser.parse_args()
+    if not PIL_SUPPORT:
+        raise SystemExit('❌ Pillow não instalado (pip install Pillow)')
+    reprocess_covers(process_all=args.all)
@@ -0,0 +1,81 @@
+"""
+Acesso ao SQLite: uma conexão reaproveitada por thread, em modo WAL
+- WAL: leitores não esperam o admin terminar de gravar (e vice-versa)
+- pragmas ajustados uma vez por conexão, não a cada requisição
+- cache de statements do sqlite3 maior, já que a conexão vive bastante
+A conexão é por thread (o sqlite3 não deixa compartilhar) e por processo
+(o gunicorn pode fazer fork depois do import).
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Espera por lock de escrita antes de dar "database is locked" (segundos)
+DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', 30))
+# Statements preparados guardados por conexão (padrão do sqlite3 é 128)
+DB_STATEMENT_CACHE = int(os.environ.get('DB_STATEMENT_CACHE', 256))
+DB_CACHE_MB = int(os.environ.get('DB_CACHE_MB', 16))
+DB_MMAP_MB = int(os.environ.get('DB_MMAP_MB', 64))
+
+# Aplicados em toda conexão nova (o journal_mode=WAL fica gravado no arquivo: basta uma vez)
+CONNECTION_PRAGMAS = (
+    # Em WAL, NORMAL só perde as últimas transações numa queda de energia, nunca corrompe
+    'PRAGMA synchronous = NORMAL',
+    f'PRAGMA cache_size = -{DB_CACHE_MB * 1024}',
+    f'PRAGMA mmap_size = {DB_MMAP_MB * 1024 * 1024}',
+    'PRAGMA temp_store = MEMORY',
+)
+
+
+class Database:
+    """
+    db.connection(): conexão da thread atual (leituras e escritas avulsas)
+    with db.transaction() as conn: commit no fim, rollback se der exceção
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self.enable_wal()
+
+    def enable_wal(self):
+        conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT)
+        mode = conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+        conn.close()
+        if mode.lower() != 'wal':
+            print(f"⚠️ SQLite sem WAL (journal_mode={mode}): leituras vão esperar as escritas")
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT, cached_statements=DB_STATEMENT_CACHE)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, 'conn', None) is None or local.pid != os.getpid():
+            # Conexão herdada de um fork não pode ser usada no filho: abre outra
+            local.conn = self._open()
+            local.pid = os.getpid()
+        return local.conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection()
+        with conn:
+            yield conn
+
+    def release(self):
+        """Fim da requisição: desfaz uma transação deixada aberta (ex: exceção antes do commit)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid() and conn.in_transaction:
+            conn.rollback()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
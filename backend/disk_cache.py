@@ -0,0 +1,192 @@
+"""
+Cache em disco endereçado por conteúdo, com orçamento de tamanho e despejo LRU
+Usado para reaproveitar resultados caros (ex: áudios sintetizados)
+"""
+
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+
+
+def content_key(*parts) -> str:
+    """Gera uma chave estável (sha256) a partir das partes informadas"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(part)
+        # Separador evita colisões do tipo ('ab', 'c') vs ('a', 'bc')
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class DiskLRUCache:
+    """
+    Cache de arquivos em disco.
+    - Cada entrada é um arquivo nomeado pela chave (compartilhado entre processos)
+    - Escritas são atômicas (arquivo temporário + os.replace)
+    - O mtime marca o último acesso; ao passar do orçamento, os mais antigos saem
+      (até evict_to * max_bytes, para a próxima escrita não precisar despejar de novo)
+    - Tamanho e nº de entradas são totais mantidos a cada escrita/despejo: nem o stats()
+      nem o put() varrem o diretório. Como outros processos também escrevem no diretório,
+      os totais são relidos do disco a cada rescan_seconds.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = '', evict_to: float = 0.9,
+                 rescan_seconds: float = 60):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.evict_to = evict_to
+        self.rescan_seconds = rescan_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        # (bytes, entradas) e quando foram lidos do disco pela última vez
+        self._size_bytes = 0
+        self._entry_count = 0
+        self._scanned_at = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}{self.suffix}')
+
+    def get(self, key: str):
+        """Retorna o caminho da entrada (ou None) e marca o acesso para o LRU"""
+        path = self.path_for(key)
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def get_bytes(self, key: str):
+        path = self.get(key)
+        if not path:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            # Despejada por outro processo entre o get() e a leitura
+            return None
+
+    def put_file(self, key: str, src_path: str) -> str:
+        """Copia um arquivo para o cache de forma atômica"""
+        tmp_path = self._tmp_path()
+        try:
+            shutil.copyfile(src_path, tmp_path)
+            return self._commit(tmp_path, key)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put_bytes(self, key: str, data: bytes) -> str:
+        """Grava bytes no cache de forma atômica"""
+        tmp_path = self._tmp_path()
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            return self._commit(tmp_path, key)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def stats(self) -> dict:
+        self._refresh_totals()
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': self._entry_count,
+                'size_bytes': self._size_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def _tmp_path(self) -> str:
+        return os.path.join(self.directory, f'.tmp-{uuid.uuid4().hex}')
+
+    def _commit(self, tmp_path: str, key: str) -> str:
+        path = self.path_for(key)
+        # Antes do replace: uma releitura do disco aqui não pode contar o arquivo novo duas vezes
+        self._refresh_totals()
+        size = os.path.getsize(tmp_path)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = None
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size_bytes += size - (replaced or 0)
+            self._entry_count += 0 if replaced is not None else 1
+            over_budget = self._size_bytes > self.max_bytes
+        if over_budget:
+            self._evict(keep=path)
+        return path
+
+    def _refresh_totals(self):
+        """Relê os totais do disco na primeira vez e depois a cada rescan_seconds"""
+        with self._lock:
+            fresh = self._scanned_at is not None and time.monotonic() - self._scanned_at < self.rescan_seconds
+        if fresh:
+            return
+        entries = self._entries()
+        self._set_totals(sum(e[2] for e in entries), len(entries))
+
+    def _set_totals(self, size_bytes: int, entry_count: int):
+        with self._lock:
+            self._size_bytes = size_bytes
+            self._entry_count = entry_count
+            self._scanned_at = time.monotonic()
+
+    def _entries(self):
+        """Lista (mtime, caminho, tamanho) das entradas, ignorando temporários"""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.startswith('.tmp-') or not entry.is_file():
+                        continue
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, entry.path, st.st_size))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _evict(self, keep: str = None):
+        """Remove as entradas menos usadas até caber em evict_to do orçamento (a varredura é só aqui)"""
+        # Outra thread já está despejando: a escrita atual não precisa esperar
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            entries = self._entries()
+            total = sum(e[2] for e in entries)
+            count = len(entries)
+            if total > self.max_bytes:
+                target = self.max_bytes * self.evict_to
+                for mtime, path, size in sorted(entries):
+                    if total <= target:
+                        break
+                    if path == keep:
+                        continue
+                    try:
+                        os.remove(path)
+                        total -= size
+                        count -= 1
+                    except FileNotFoundError:
+                        pass
+            self._set_totals(total, count)
+        finally:
+            self._evict_lock.release()
@@ -0,0 +1,267 @@
+"""
+Entrega de arquivos com suporte a HTTP Range (RFC 7233) e requisições condicionais
+- ETag forte por arquivo, If-None-Match (304) e If-Range
+- um intervalo (206), vários intervalos (206 multipart/byteranges) e 416
+Usado para os áudios em uploads/ e para o resultado dos jobs: o player só baixa
+os bytes do trecho para onde o ouvinte pulou.
+
+Com UPLOADS_OFFLOAD, o envio dos bytes fica com o proxy (o worker do Flask só monta os headers):
+- 'x-accel' (Nginx): responde X-Accel-Redirect para uma location interna, ex:
+      location /_uploads/ {
+          internal;
+          alias /app/backend/uploads/;
+          etag off;                          # o ETag que vale é o do Flask
+          add_header ETag $upstream_http_etag;
+      }
+  Content-Type, Content-Disposition, Cache-Control e Accept-Ranges vêm da resposta do Flask;
+  o Range é atendido pelo próprio Nginx.
+- 'x-sendfile' (Apache mod_xsendfile, lighttpd): responde X-Sendfile com o caminho absoluto.
+Sem proxy, o arquivo inteiro (e um intervalo único, no gunicorn) vai pelo wsgi.file_wrapper,
+que o gunicorn entrega com os.sendfile (cópia zero, sem passar pelo Python).
+"""
+
+import os
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from flask import Response, request, send_file
+
+from disk_cache import content_key
+
+# Entrega delegada ao proxy: 'off' (padrão), 'x-accel' (Nginx) ou 'x-sendfile'
+UPLOADS_OFFLOAD = os.environ.get('UPLOADS_OFFLOAD', 'off').lower()
+# Prefixo da location interna do Nginx que aponta para a pasta servida
+UPLOADS_ACCEL_PREFIX = os.environ.get('UPLOADS_ACCEL_PREFIX', '/_uploads/')
+# Servidores cujo wsgi.file_wrapper respeita o Content-Length (seguro para enviar só um trecho)
+RANGE_FILE_WRAPPER_SERVERS = ('gunicorn',)
+
+# Mais intervalos que isso (depois de juntar os sobrepostos) = responde o arquivo inteiro
+MAX_RANGES = 16
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def file_etag(path: str, stat: os.stat_result = None) -> str:
+    """ETag forte: muda sempre que o arquivo é regravado (caminho + tamanho + mtime em ns)"""
+    stat = stat or os.stat(path)
+    return content_key(os.path.realpath(path), str(stat.st_size), str(stat.st_mtime_ns))[:32]
+
+
+def content_disposition(download_name: str, as_attachment: bool) -> str:
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        download_name.encode('ascii')
+        return f'{disposition}; filename="{download_name}"'
+    except UnicodeEncodeError:
+        ascii_name = download_name.encode('ascii', 'ignore').decode('ascii') or 'download'
+        return f"{disposition}; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(download_name)}"
+
+
+def parse_byte_ranges(header: str):
+    """
+    Interpreta "bytes=0-99,200-,-500" em [(início, fim inclusivo ou None)]; sufixos têm início negativo.
+    Retorna None se o header for inválido (o Range é então ignorado).
+    O parser do Werkzeug recusa intervalos fora de ordem ou sobrepostos, que a RFC permite.
+    """
+    if not header or '=' not in header:
+        return None
+    units, _, spec = header.partition('=')
+    if units.strip().lower() != 'bytes':
+        return None
+    ranges = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        first, dash, last = item.partition('-')
+        first, last = first.strip(), last.strip()
+        if not dash or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+            return None
+        if not first:
+            if int(last) == 0:
+                continue
+            ranges.append((-int(last), None))
+        else:
+            if last and int(last) < int(first):
+                return None
+            ranges.append((int(first), int(last) if last else None))
+    return ranges or None
+
+
+def satisfiable_ranges(byte_ranges: list, length: int) -> list:
+    """Converte os intervalos pedidos em [(início, fim exclusivo)] válidos, ordenados e sem sobreposição"""
+    spans = []
+    for begin, end in byte_ranges:
+        if begin < 0:
+            # Sufixo: "bytes=-500" = últimos 500 bytes
+            start, stop = max(0, length + begin), length
+        else:
+            start, stop = begin, min(end + 1 if end is not None else length, length)
+        if start < stop:
+            spans.append((start, stop))
+
+    merged = []
+    for start, stop in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def if_range_matches(etag: str, last_modified: datetime) -> bool:
+    """If-Range ausente ou ainda válido (ETag forte igual, ou data não anterior à modificação)"""
+    if 'If-Range' not in request.headers:
+        return True
+    if_range = request.if_range
+    if if_range.etag:
+        return if_range.etag == etag
+    if if_range.date:
+        return if_range.date >= last_modified.replace(microsecond=0)
+    return False
+
+
+def read_span(path: str, start: int, stop: int):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            block = f.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def offload_path(path: str, offload_root: str):
+    """Valor do X-Accel-Redirect/X-Sendfile para o arquivo (None = entrega pelo próprio Flask)"""
+    if UPLOADS_OFFLOAD not in ('x-accel', 'x-sendfile') or not offload_root:
+        return None
+    root = os.path.realpath(offload_root)
+    real_path = os.path.realpath(path)
+    if os.path.commonpath([root, real_path]) != root:
+        return None
+    if UPLOADS_OFFLOAD == 'x-sendfile':
+        # O caminho vai cru no header (latin-1); nomes fora disso são entregues pelo Flask
+        try:
+            real_path.encode('latin-1')
+        except UnicodeEncodeError:
+            return None
+        return real_path
+    relative = os.path.relpath(real_path, root).replace(os.sep, '/')
+    return f"{UPLOADS_ACCEL_PREFIX.rstrip('/')}/{quote(relative)}"
+
+
+def range_body(path: str, start: int, stop: int):
+    """
+    Corpo de um intervalo único. No gunicorn, o arquivo posicionado no início vai pelo
+    wsgi.file_wrapper (os.sendfile a partir da posição atual, limitado pelo Content-Length);
+    em outros servidores, leitura em blocos.
+    """
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    server = request.environ.get('SERVER_SOFTWARE', '').lower()
+    if file_wrapper is None or not server.startswith(RANGE_FILE_WRAPPER_SERVERS):
+        return read_span(path, start, stop)
+    f = open(path, 'rb')
+    f.seek(start)
+    return file_wrapper(f, READ_BLOCK_SIZE)
+
+
+def send_ranged_file(path: str, mimetype: str, download_name: str = None, as_attachment: bool = False,
+                     max_age: int = None, public: bool = False, immutable: bool = False,
+                     offload_root: str = None) -> Response:
+    """
+    Responde com o arquivo aplicando Range/If-Range/If-None-Match.
+    Sem Range (ou com If-Range desatualizado) cai no send_file condicional do Flask.
+    immutable: a URL nunca muda de conteúdo (o navegador nem revalida dentro do max_age).
+    offload_root: pasta mapeada no proxy; com UPLOADS_OFFLOAD ativo, os bytes são enviados por ele.
+    """
+    stat = os.stat(path)
+    length = stat.st_size
+    etag = file_etag(path, stat)
+    last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+    download_name = download_name or os.path.basename(path)
+
+    offload = offload_path(path, offload_root)
+    if offload:
+        # Revalidação (304) resolvida aqui mesmo; o resto (inclusive Range) fica com o proxy
+        not_modified = request.if_none_match.contains_weak(etag)
+        response = Response(status=304 if not_modified else 200, mimetype=mimetype)
+        if not not_modified:
+            response.headers['X-Accel-Redirect' if UPLOADS_OFFLOAD == 'x-accel' else 'X-Sendfile'] = offload
+            response.headers['Content-Disposition'] = content_disposition(download_name, as_attachment)
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return _apply_cache_headers(response, max_age, public, immutable)
+
+    byte_ranges = parse_byte_ranges(request.headers.get('Range'))
+    use_ranges = (
+        byte_ranges is not None
+        and not request.if_none_match.contains_weak(etag)
+        and if_range_matches(etag, last_modified)
+    )
+    spans = satisfiable_ranges(byte_ranges, length) if use_ranges else None
+
+    if not use_ranges or len(spans) > MAX_RANGES:
+        # Range ignorado (If-Range desatualizado, inválido ou intervalos demais): arquivo inteiro.
+        # Tirado do environ para o send_file não responder 416 por conta própria.
+        request.environ.pop('HTTP_RANGE', None)
+        response = send_file(
+            path, mimetype=mimetype, as_attachment=as_attachment, download_name=download_name,
+            conditional=True, etag=etag, last_modified=stat.st_mtime, max_age=max_age
+        )
+        response.headers['Accept-Ranges'] = 'bytes'
+        return _apply_cache_headers(response, max_age, public, immutable)
+
+    if not spans:
+        response = Response(status=416)
+        response.headers['Content-Range'] = f'bytes */{length}'
+    elif len(spans) == 1:
+        start, stop = spans[0]
+        response = Response(range_body(path, start, stop), status=206, mimetype=mimetype, direct_passthrough=True)
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{length}'
+        response.content_length = stop - start
+    else:
+        response = _multipart_response(path, mimetype, spans, length)
+
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Content-Disposition'] = content_disposition(download_name, as_attachment)
+    return _apply_cache_headers(response, max_age, public, immutable)
+
+
+def _multipart_response(path: str, mimetype: str, spans: list, length: int) -> Response:
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (f'\r\n--{boundary}\r\nContent-Type: {mimetype}\r\n'
+         f'Content-Range: bytes {start}-{stop - 1}/{length}\r\n\r\n').encode('ascii')
+        for start, stop in spans
+    ]
+    closing = f'\r\n--{boundary}--\r\n'.encode('ascii')
+
+    def body():
+        for header, (start, stop) in zip(part_headers, spans):
+            yield header
+            yield from read_span(path, start, stop)
+        yield closing
+
+    response = Response(body(), status=206, direct_passthrough=True,
+                        content_type=f'multipart/byteranges; boundary={boundary}')
+    response.content_length = (
+        sum(len(h) for h in part_headers) + sum(stop - start for start, stop in spans) + len(closing)
+    )
+    return response
+
+
+def _apply_cache_headers(response: Response, max_age, public: bool, immutable: bool = False) -> Response:
+    if max_age is None:
+        # Sem prazo: o cliente sempre revalida (barato, com 304 pelo ETag)
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.max_age = max_age
+        response.cache_control.immutable = immutable
+    response.cache_control.public = public
+    response.cache_control.private = not public
+    return response
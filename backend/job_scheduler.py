@@ -0,0 +1,134 @@
+"""
+Agendador de jobs de geração: pool fixo de workers + fila justa por usuário
+Textos curtos passam na frente de livros enormes, e um usuário com muitos jobs
+não monopoliza os workers.
+"""
+
+import time
+import heapq
+import itertools
+import threading
+
+
+class FairScheduler:
+    """
+    Fila com enfileiramento justo (start-time fair queueing) ponderado pelo custo
+    (nº de caracteres) de cada job:
+    - cada usuário tem uma "tag" virtual que cresce com o custo dos jobs que ele já enviou
+    - o job sai na ordem da tag de término (início + custo), então jobs curtos e usuários
+      com pouco uso têm prioridade
+    - envelhecimento: a cada segundo na fila o job "ganha" aging_rate caracteres de
+      prioridade, o que impede que livros grandes esperem para sempre
+    Observação: cada processo do gunicorn tem o seu agendador; as posições na fila são
+    relativas aos jobs do próprio processo.
+    """
+
+    def __init__(self, workers: int, handler, estimate_seconds, on_queue_change=None, aging_rate: float = 1000.0):
+        self.workers = workers
+        self.handler = handler
+        self.estimate_seconds = estimate_seconds
+        self.on_queue_change = on_queue_change
+        self.aging_rate = aging_rate
+        self._heap = []
+        self._queued = {}      # job_id -> entrada da heap
+        self._running = {}     # job_id -> (início, estimativa em segundos)
+        self._user_tags = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def submit(self, job_id: str, user: str, cost: int, *args):
+        """Enfileira um job; handler(job_id, *args) roda quando um worker ficar livre"""
+        with self._cond:
+            self._ensure_workers()
+            start_tag = max(self._virtual_time, self._user_tags.get(user, 0.0))
+            finish_tag = start_tag + max(cost, 1)
+            self._user_tags[user] = finish_tag
+            now = time.time()
+            # O envelhecimento vale igual para todos, então entra direto na chave da heap
+            priority = finish_tag + self.aging_rate * now
+            entry = [priority, next(self._seq), job_id, start_tag, cost, now, args]
+            heapq.heappush(self._heap, entry)
+            self._queued[job_id] = entry
+            self._cond.notify()
+        self._publish_queue()
+
+    def remove(self, job_id: str) -> bool:
+        """Tira um job da fila (ex: cancelado). Retorna False se ele não estava na fila."""
+        with self._cond:
+            entry = self._queued.pop(job_id, None)
+            if entry is None:
+                return False
+            # Remoção preguiçosa: a entrada é descartada quando chegar ao topo da heap
+            entry[2] = None
+        self._publish_queue()
+        return True
+
+    def snapshot(self) -> list:
+        """Lista [(job_id, posição, início estimado em epoch)] dos jobs na fila"""
+        with self._cond:
+            now = time.time()
+            free_at = sorted(
+                max(now, started + estimate) for started, estimate in self._running.values()
+            )
+            free_at += [now] * (self.workers - len(free_at))
+            heapq.heapify(free_at)
+
+            result = []
+            queued = sorted(e for e in self._heap if e[2] is not None)
+            for position, entry in enumerate(queued, start=1):
+                start_at = heapq.heappop(free_at)
+                result.append((entry[2], position, start_at))
+                heapq.heappush(free_at, start_at + self.estimate_seconds(entry[4]))
+            return result
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'running': len(self._running),
+                'queued': len(self._queued)
+            }
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker_loop, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][2] is None:
+                    heapq.heappop(self._heap)
+                if self._heap:
+                    break
+                self._cond.wait()
+            entry = heapq.heappop(self._heap)
+            job_id = entry[2]
+            del self._queued[job_id]
+            self._virtual_time = max(self._virtual_time, entry[3])
+            self._running[job_id] = (time.time(), self.estimate_seconds(entry[4]))
+            return job_id, entry[6]
+
+    def _worker_loop(self):
+        while True:
+            job_id, args = self._next_job()
+            self._publish_queue()
+            try:
+                self.handler(job_id, *args)
+            except Exception as e:
+                print(f"❌ Erro no worker do job {job_id}: {e}")
+            finally:
+                with self._cond:
+                    self._running.pop(job_id, None)
+                self._publish_queue()
+
+    def _publish_queue(self):
+        if not self.on_queue_change:
+            return
+        try:
+            self.on_queue_change(self.snapshot())
+        except Exception as e:
+            print(f"⚠️ Erro ao publicar a fila: {e}")
@@ -0,0 +1,271 @@
+"""
+Armazenamento persistente dos jobs de geração de áudio (SQLite)
+Compartilhado entre todos os processos do gunicorn e resistente a reinícios
+"""
+
+import os
+import time
+import uuid
+import socket
+import sqlite3
+
+from db import Database
+
+# Status em que o job ainda está vivo (na fila ou rodando)
+ACTIVE_STATUSES = ('pending', 'processing')
+# Só jobs encerrados expiram: um job na fila ou em execução nunca é removido pela limpeza
+FINISHED_STATUSES = ('done', 'error', 'cancelled')
+
+
+_worker_id = None
+
+
+def _new_worker_id():
+    """
+    hostname:pid só para leitura humana; o sufixo aleatório é o que identifica o processo.
+    Depois de um restart do container, o novo processo costuma ter o mesmo hostname e o mesmo pid:
+    sem o sufixo, ele mandaria batimentos no lugar do morto e os jobs do morto nunca virariam órfãos.
+    """
+    global _worker_id
+    _worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+
+_new_worker_id()
+if hasattr(os, 'register_at_fork'):
+    # Cada worker do gunicorn (fork do master) ganha um id próprio
+    os.register_at_fork(after_in_child=_new_worker_id)
+
+
+def current_worker_id() -> str:
+    """Identifica o processo atual (único por processo, inclusive entre restarts)"""
+    return _worker_id
+
+JOB_COLUMNS = (
+    'id', 'status', 'progress', 'file_path', 'error', 'cached', 'voice',
+    'char_count', 'document_id', 'worker', 'created_at', 'started_at',
+    'finished_at', 'updated_at', 'expires_at', 'queue_position',
+    'estimated_start_at', 'chunks_done', 'chunks_total', 'duration_seconds', 'track_id', 'owner'
+)
+
+# Colunas adicionadas depois da criação da tabela (migração automática)
+MIGRATED_COLUMNS = {
+    'queue_position': 'INTEGER',
+    'estimated_start_at': 'REAL',
+    'chunks_done': 'INTEGER',
+    'chunks_total': 'INTEGER',
+    'duration_seconds': 'REAL',
+    'track_id': 'INTEGER',
+    'owner': 'TEXT',
+}
+
+
+class JobStore:
+    """
+    Tabela generation_jobs:
+    status: 'pending' | 'processing' | 'done' | 'error' | 'cancelled'
+    worker: processo dono do job (quem o enfileirou/executa)
+    owner: quem criou o job (chave de get_request_user_key: email ou IP)
+    progress: 0-100, file_path: áudio gerado, timings em epoch (segundos)
+    """
+
+    def __init__(self, db: Database, on_change=None, retention_seconds: float = None):
+        self.db = db
+        # Chamado com o job_id após cada escrita (ex: acordar streams de eventos)
+        self.on_change = on_change
+        # Prazo (a partir de finished_at) até a limpeza remover o job; None = nunca expira sozinho
+        self.retention_seconds = retention_seconds
+        self.init_schema()
+
+    def _set_expiration(self, fields: dict):
+        """O prazo de retenção conta a partir do fim do job, não da criação"""
+        if self.retention_seconds and fields.get('finished_at') and 'expires_at' not in fields:
+            fields['expires_at'] = fields['finished_at'] + self.retention_seconds
+
+    def _notify(self, job_ids):
+        if self.on_change:
+            for job_id in job_ids:
+                self.on_change(job_id)
+
+    def connect(self) -> sqlite3.Connection:
+        # Conexão da thread atual, reaproveitada entre chamadas (não fechar)
+        return self.db.connection()
+
+    def init_schema(self):
+        conn = self.connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS generation_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL DEFAULT 'pending',
+                progress INTEGER NOT NULL DEFAULT 0,
+                file_path TEXT,
+                error TEXT,
+                cached INTEGER NOT NULL DEFAULT 0,
+                voice TEXT,
+                char_count INTEGER DEFAULT 0,
+                document_id TEXT,
+                worker TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                updated_at REAL NOT NULL,
+                expires_at REAL,
+                queue_position INTEGER,
+                estimated_start_at REAL,
+                chunks_done INTEGER,
+                chunks_total INTEGER,
+                duration_seconds REAL,
+                track_id INTEGER,
+                owner TEXT
+            )
+        ''')
+        existing = [c[1] for c in conn.execute('PRAGMA table_info(generation_jobs)').fetchall()]
+        for column, column_type in MIGRATED_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f'ALTER TABLE generation_jobs ADD COLUMN {column} {column_type}')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_generation_jobs_status ON generation_jobs (status)')
+        # Batimentos dos processos: jobs de processos que pararam de bater são recuperados
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS job_workers (
+                id TEXT PRIMARY KEY,
+                heartbeat_at REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+
+    def create(self, job_id: str, **fields) -> dict:
+        now = time.time()
+        job = {'id': job_id, 'status': 'pending', 'progress': 0, 'created_at': now, 'updated_at': now}
+        job.update(fields)
+        self._set_expiration(job)
+        names = [k for k in job if k in JOB_COLUMNS]
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                f"INSERT INTO generation_jobs ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+                [job[k] for k in names]
+            )
+        self._notify([job_id])
+        return self.get(job_id)
+
+    def get(self, job_id: str):
+        conn = self.connect()
+        row = conn.execute('SELECT * FROM generation_jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def update(self, job_id: str, only_if_status=None, **fields) -> bool:
+        """
+        Atualiza campos do job. Com only_if_status, a escrita só acontece se o status
+        atual for o esperado (compare-and-set atômico). Retorna se alguma linha mudou.
+        """
+        fields['updated_at'] = time.time()
+        self._set_expiration(fields)
+        names = [k for k in fields if k in JOB_COLUMNS]
+        sql = f"UPDATE generation_jobs SET {', '.join(f'{k} = ?' for k in names)} WHERE id = ?"
+        params = [fields[k] for k in names] + [job_id]
+        if only_if_status:
+            statuses = (only_if_status,) if isinstance(only_if_status, str) else tuple(only_if_status)
+            sql += f" AND status IN ({', '.join('?' for _ in statuses)})"
+            params += list(statuses)
+        conn = self.connect()
+        with conn:
+            changed = conn.execute(sql, params).rowcount
+        if changed:
+            self._notify([job_id])
+        return changed > 0
+
+    def claim(self, job_id: str) -> bool:
+        """Marca um job pendente como em processamento por este worker (atômico)"""
+        return self.update(
+            job_id,
+            only_if_status='pending',
+            status='processing',
+            worker=current_worker_id(),
+            started_at=time.time(),
+            queue_position=None,
+            estimated_start_at=None
+        )
+
+    def set_queue_positions(self, positions: list):
+        """Grava [(job_id, posição, início estimado)] dos jobs pendentes numa transação"""
+        if not positions:
+            return
+        now = time.time()
+        conn = self.connect()
+        with conn:
+            conn.executemany(
+                "UPDATE generation_jobs SET queue_position = ?, estimated_start_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'pending'",
+                [(position, start_at, now, job_id) for job_id, position, start_at in positions]
+            )
+        self._notify([job_id for job_id, _, _ in positions])
+
+    def heartbeat(self, stale_after: float):
+        """Registra que este processo está vivo e esquece processos mortos há muito tempo"""
+        now = time.time()
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO job_workers (id, heartbeat_at) VALUES (?, ?)',
+                (current_worker_id(), now)
+            )
+            conn.execute('DELETE FROM job_workers WHERE heartbeat_at < ?', (now - 100 * stale_after,))
+
+    def orphaned_jobs(self, stale_after: float) -> list:
+        """Jobs ativos cujo processo dono parou de enviar batimentos (ex: crash ou restart)"""
+        conn = self.connect()
+        rows = conn.execute(f'''
+            SELECT * FROM generation_jobs
+            WHERE status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})
+            AND (worker IS NULL OR worker NOT IN (
+                SELECT id FROM job_workers WHERE heartbeat_at >= ?
+            ))
+            ORDER BY created_at ASC
+        ''', (*ACTIVE_STATUSES, time.time() - stale_after)).fetchall()
+        return [dict(row) for row in rows]
+
+    def adopt(self, job_id: str, previous_worker, from_statuses=ACTIVE_STATUSES) -> bool:
+        """
+        Assume um job (órfão ou para nova tentativa) e o devolve para 'pending'.
+        Compare-and-set pelo dono anterior: só um processo consegue adotar.
+        """
+        statuses = tuple(from_statuses)
+        conn = self.connect()
+        with conn:
+            changed = conn.execute(f'''
+                UPDATE generation_jobs
+                SET status = 'pending', worker = ?, error = NULL, finished_at = NULL, updated_at = ?
+                WHERE id = ? AND worker IS ? AND status IN ({', '.join('?' for _ in statuses)})
+            ''', (current_worker_id(), time.time(), job_id, previous_worker, *statuses)).rowcount
+        if changed:
+            self._notify([job_id])
+        return changed > 0
+
+    def delete(self, job_id: str):
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM generation_jobs WHERE id = ?', (job_id,))
+
+    def count(self) -> int:
+        conn = self.connect()
+        total = conn.execute('SELECT COUNT(*) FROM generation_jobs').fetchone()[0]
+        return total
+
+    def pop_expired(self, now: float = None) -> list:
+        """Remove e retorna os jobs encerrados cujo prazo (expires_at) já passou"""
+        now = now or time.time()
+        conn = self.connect()
+        with conn:
+            rows = conn.execute(f'''
+                SELECT * FROM generation_jobs
+                WHERE expires_at IS NOT NULL AND expires_at <= ?
+                  AND status IN ({', '.join('?' for _ in FINISHED_STATUSES)})
+            ''', (now, *FINISHED_STATUSES)).fetchall()
+            # O status é conferido de novo no DELETE: um job retomado entre a consulta e a remoção fica
+            removed = [
+                row for row in rows
+                if conn.execute(f'''
+                    DELETE FROM generation_jobs
+                    WHERE id = ? AND status IN ({', '.join('?' for _ in FINISHED_STATUSES)})
+                ''', (row['id'], *FINISHED_STATUSES)).rowcount
+            ]
+        return [dict(row) for row in removed]
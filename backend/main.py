@@ -2,7 +2,7 @@ import os
 import uuid
 import asyncio
 from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import edge_tts
 
@@ -24,6 +24,13 @@ async def generate_audio_file(text, voice, output_path):
     communicate = edge_tts.Communicate(text, voice)
     await communicate.save(output_path)
 
+async def stream_audio(text, voice):
+    # Repassa os frames MP3 assim que o edge-tts os entrega
+    communicate = edge_tts.Communicate(text, voice)
+    async for message in communicate.stream():
+        if message["type"] == "audio":
+            yield message["data"]
+
 def cleanup_file(path: str):
     try:
         if os.path.exists(path):
@@ -37,12 +44,21 @@ from pydantic import BaseModel
 class AudioRequest(BaseModel):
     text: str
     voice: str
+    stream: bool = False
 
 @app.post("/generate")
 async def generate_audio(request: AudioRequest, background_tasks: BackgroundTasks):
     if not request.text:
         raise HTTPException(status_code=400, detail="Text is required")
     
+    if request.stream:
+        # Streaming: sem arquivo temporário, o cliente recebe o áudio enquanto é gerado
+        return StreamingResponse(
+            stream_audio(request.text, request.voice),
+            media_type="audio/mpeg",
+            headers={"Content-Disposition": 'attachment; filename="audiobook.mp3"'}
+        )
+    
     # Secure filename
     filename = f"{uuid.uuid4()}.mp3"
     file_path = os.path.join(TEMP_DIR, filename)
@@ -0,0 +1,360 @@
+"""
+Leitura de cabeçalhos de frames MP3 e concatenação de vários MP3 num só arquivo
+Sem decodificar áudio: só os cabeçalhos de 4 bytes de cada frame são interpretados.
+"""
+
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_right
+
+# Índices: versão MPEG (bits 19-20) -> nome
+MPEG1, MPEG2, MPEG25 = 3, 2, 0
+
+# Bitrates (kbps) por [versão][camada]; índice 0 = "free", 15 = inválido
+_BITRATES = {
+    (MPEG1, 3): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (MPEG1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (MPEG1, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (MPEG2, 3): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (MPEG2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (MPEG2, 1): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {
+    MPEG1: (44100, 48000, 32000),
+    MPEG2: (22050, 24000, 16000),
+    MPEG25: (11025, 12000, 8000),
+}
+# Camada (bits 17-18): 3 = Layer I, 2 = Layer II, 1 = Layer III
+LAYER1, LAYER2, LAYER3 = 3, 2, 1
+
+XING_FLAGS_FRAMES = 0x1
+XING_FLAGS_BYTES = 0x2
+XING_FLAGS_TOC = 0x4
+
+
+class FrameHeader:
+    """Cabeçalho de um frame MPEG Audio"""
+
+    __slots__ = ('version', 'layer', 'bitrate_index', 'bitrate', 'sample_rate_index',
+                 'sample_rate', 'padding', 'mode', 'raw', 'length', 'samples')
+
+    def __init__(self, raw: int):
+        self.raw = raw
+        self.version = (raw >> 19) & 0x3
+        self.layer = (raw >> 17) & 0x3
+        self.bitrate_index = (raw >> 12) & 0xF
+        self.sample_rate_index = (raw >> 10) & 0x3
+        self.padding = (raw >> 9) & 0x1
+        self.mode = (raw >> 6) & 0x3
+        table_version = MPEG1 if self.version == MPEG1 else MPEG2
+        self.bitrate = _BITRATES[(table_version, self.layer)][self.bitrate_index] * 1000
+        self.sample_rate = _SAMPLE_RATES[self.version][self.sample_rate_index]
+
+        if self.layer == LAYER1:
+            self.samples = 384
+            self.length = (12 * self.bitrate // self.sample_rate + self.padding) * 4
+        elif self.layer == LAYER3 and self.version != MPEG1:
+            self.samples = 576
+            self.length = 72 * self.bitrate // self.sample_rate + self.padding
+        else:
+            self.samples = 1152
+            self.length = 144 * self.bitrate // self.sample_rate + self.padding
+
+    @property
+    def mono(self) -> bool:
+        return self.mode == 3
+
+    @property
+    def side_info_size(self) -> int:
+        """Tamanho do side info da Layer III (onde começa o cabeçalho Xing/Info)"""
+        if self.version == MPEG1:
+            return 17 if self.mono else 32
+        return 9 if self.mono else 17
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.sample_rate
+
+
+def parse_header(data, offset: int = 0):
+    """Interpreta o cabeçalho em data[offset:offset+4]; None se não for um frame válido"""
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+    raw = struct.unpack_from('>I', data, offset)[0]
+    version = (raw >> 19) & 0x3
+    layer = (raw >> 17) & 0x3
+    bitrate_index = (raw >> 12) & 0xF
+    sample_rate_index = (raw >> 10) & 0x3
+    # Versão/camada reservadas, bitrate "free"/inválido e sample rate reservado
+    if version == 1 or layer == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    return FrameHeader(raw)
+
+
+def id3v2_size(data, offset: int = 0) -> int:
+    """Tamanho total de uma tag ID3v2 em data[offset:] (0 se não houver)"""
+    if data[offset:offset + 3] != b'ID3' or len(data) < offset + 10:
+        return 0
+    size = 0
+    for byte in data[offset + 6:offset + 10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[offset + 5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def is_info_frame(data, offset: int, header: FrameHeader) -> bool:
+    """Frame de metadados Xing/Info/VBRI (não contém áudio)"""
+    xing_at = offset + 4 + header.side_info_size
+    if data[xing_at:xing_at + 4] in (b'Xing', b'Info'):
+        return True
+    return data[offset + 36:offset + 40] == b'VBRI'
+
+
+def iter_frames(data, offset: int = 0, end: int = None):
+    """
+    Percorre os frames de áudio em data[offset:end], gerando (offset, header).
+    Bytes que não formam um frame válido (lixo, tags) são pulados com ressincronização:
+    fora de sincronia, um candidato só é aceito se o próximo frame também começar com sync válido.
+    """
+    end = len(data) if end is None else end
+    synced = False
+    while offset + 4 <= end:
+        header = parse_header(data, offset)
+        if header is None or header.length < 4:
+            synced = False
+            offset += 1
+            continue
+        next_offset = offset + header.length
+        if next_offset > end:
+            # Frame truncado no fim do buffer
+            break
+        if not synced and next_offset + 4 <= end and parse_header(data, next_offset) is None:
+            offset += 1
+            continue
+        synced = True
+        yield offset, header
+        offset = next_offset
+
+
+def build_info_frame(template: FrameHeader, frames: int, total_bytes: int, toc: bytes, vbr: bool) -> bytes:
+    """Monta um frame Xing (VBR) ou Info (CBR) no mesmo formato do áudio"""
+    length = info_frame_length(template)
+    bitrate_index = _info_bitrate_index(template)
+    raw = (template.raw & ~(0xF << 12) & ~(1 << 9) & ~(1 << 16)) | (bitrate_index << 12) | (1 << 16)
+    # Modo estéreo sem "mode extension" para o frame de metadados
+    raw &= ~(0x3 << 4)
+    frame = bytearray(length)
+    struct.pack_into('>I', frame, 0, raw)
+    xing_at = 4 + template.side_info_size
+    frame[xing_at:xing_at + 4] = b'Xing' if vbr else b'Info'
+    struct.pack_into('>III', frame, xing_at + 4,
+                     XING_FLAGS_FRAMES | XING_FLAGS_BYTES | XING_FLAGS_TOC, frames, total_bytes)
+    frame[xing_at + 16:xing_at + 116] = toc
+    return bytes(frame)
+
+
+def info_frame_length(template: FrameHeader) -> int:
+    return _frame_length(template, _info_bitrate_index(template))
+
+
+def _frame_length(template: FrameHeader, bitrate_index: int) -> int:
+    raw = (template.raw & ~(0xF << 12) & ~(1 << 9)) | (bitrate_index << 12)
+    return FrameHeader(raw).length
+
+
+def _info_bitrate_index(template: FrameHeader) -> int:
+    """Menor bitrate cujo frame comporta cabeçalho + side info + dados Xing com TOC"""
+    needed = 4 + template.side_info_size + 4 + 12 + 100
+    for index in range(1, 15):
+        if _frame_length(template, index) >= needed:
+            return index
+    return 14
+
+
+# TOC do Xing: o writer guarda a posição de um frame a cada TOC_SAMPLE_SECONDS de áudio. Passando de
+# TOC_MAX_SAMPLES, o intervalo dobra e metade das amostras é descartada: memória constante para
+# qualquer duração, com erro abaixo de 2/TOC_MAX_SAMPLES da duração (a TOC tem passos de 1%)
+TOC_SAMPLE_SECONDS = 0.5
+TOC_MAX_SAMPLES = 1024
+
+# Maior frame possível (Layer I/II/III, 448 kbps, 8 kHz com padding): folga para a leitura em blocos
+MAX_FRAME_LENGTH = 2881
+PROBE_BLOCK_SIZE = 1024 * 1024
+
+
+def probe_mp3(path: str) -> dict:
+    """
+    Calcula duração, bitrate médio e nº de frames percorrendo os cabeçalhos dos frames
+    (sem decodificar). Lê o arquivo em blocos: memória constante para qualquer tamanho.
+    Retorna {'duration_seconds', 'bitrate', 'frames'}; frames == 0 se não for MP3.
+    """
+    frames = 0
+    duration = 0.0
+    audio_bytes = 0
+    with open(path, 'rb') as f:
+        head = f.read(10)
+        f.seek(id3v2_size(head) if len(head) == 10 else 0)
+
+        buffer = b''
+        first = True
+        while True:
+            block = f.read(PROBE_BLOCK_SIZE)
+            buffer += block
+            consumed = 0
+            for offset, header in iter_frames(buffer):
+                consumed = offset + header.length
+                if first:
+                    first = False
+                    if is_info_frame(buffer, offset, header):
+                        continue
+                frames += 1
+                duration += header.duration
+                audio_bytes += header.length
+            if not block:
+                break
+            # Guarda só o frame possivelmente incompleto do fim do bloco
+            buffer = buffer[max(consumed, len(buffer) - MAX_FRAME_LENGTH):]
+
+    return {
+        'duration_seconds': round(duration, 3),
+        'bitrate': round(audio_bytes * 8 / duration) if duration else 0,
+        'frames': frames
+    }
+
+
+class Mp3ConcatWriter:
+    """
+    Concatena MP3s (um por chunk) direto no arquivo de saída, um chunk por vez:
+    - remove tags ID3v2/ID3v1 e frames Xing/Info/VBRI dos chunks
+    - reserva espaço para um frame Xing/Info no início e o preenche no close()
+      com o total real de frames, bytes e a TOC, para os players mostrarem a duração certa
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.template = None
+        self.header_length = 0
+        self.frames = 0
+        self.audio_bytes = 0
+        self.duration = 0.0
+        self.bitrates = set()
+        # Amostras (instante, offset no arquivo) de frames em intervalos fixos de tempo, para montar a TOC
+        self.toc_interval = TOC_SAMPLE_SECONDS
+        self.toc_times = array('d')
+        self.toc_offsets = array('Q')
+
+    def append(self, data: bytes):
+        view = memoryview(data)
+        start = id3v2_size(data)
+        end = len(data) - 128 if len(data) >= 128 and data[-128:-125] == b'TAG' else len(data)
+
+        span_start = span_end = None
+        first = True
+        for offset, header in iter_frames(data, start, end):
+            if first:
+                first = False
+                if is_info_frame(data, offset, header):
+                    continue
+            if self.template is None:
+                self._reserve_header(header)
+
+            if span_end != offset:
+                self._write(view, span_start, span_end)
+                span_start = offset
+            span_end = offset + header.length
+
+            if not self.toc_times or self.duration >= self.toc_times[-1] + self.toc_interval:
+                self._add_toc_sample(self.header_length + self.audio_bytes + (offset - span_start))
+            self.frames += 1
+            self.duration += header.duration
+            self.bitrates.add(header.bitrate)
+        self._write(view, span_start, span_end)
+
+    def _add_toc_sample(self, frame_offset: int):
+        self.toc_times.append(self.duration)
+        self.toc_offsets.append(frame_offset)
+        if len(self.toc_times) > TOC_MAX_SAMPLES:
+            self.toc_interval *= 2
+            self.toc_times = self.toc_times[::2]
+            self.toc_offsets = self.toc_offsets[::2]
+
+    def _write(self, view, start, end):
+        if start is None or end <= start:
+            return
+        self.file.write(view[start:end])
+        self.audio_bytes += end - start
+
+    def _reserve_header(self, header: FrameHeader):
+        self.template = header
+        self.header_length = info_frame_length(header)
+        self.file.write(bytes(self.header_length))
+
+    def close(self) -> dict:
+        """Finaliza o arquivo gravando o frame Xing/Info e retorna as estatísticas"""
+        if self.file.closed:
+            return self.stats()
+        if self.template is not None:
+            total_bytes = self.header_length + self.audio_bytes
+            self.file.seek(0)
+            self.file.write(build_info_frame(
+                self.template, self.frames, total_bytes, self._toc(total_bytes), vbr=len(self.bitrates) > 1
+            ))
+        self.file.close()
+        return self.stats()
+
+    def abort(self):
+        """Descarta o arquivo incompleto (ex: falha no meio da geração)"""
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def stats(self) -> dict:
+        return {
+            'frames': self.frames,
+            'bytes': self.header_length + self.audio_bytes,
+            'duration_seconds': round(self.duration, 3)
+        }
+
+    def _toc(self, total_bytes: int) -> bytes:
+        """TOC do Xing: posição (0-255 do tamanho) de cada 1% da duração"""
+        if not self.frames:
+            return bytes(100)
+        toc = bytearray(100)
+        for i in range(100):
+            # Última amostra que começa até i% da duração
+            sample = max(0, bisect_right(self.toc_times, self.duration * i / 100) - 1)
+            toc[i] = min(255, self.toc_offsets[sample] * 256 // total_bytes)
+        return bytes(toc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class OrderedChunkWriter:
+    """
+    Recebe chunks fora de ordem (workers paralelos) e os repassa ao writer na ordem do texto.
+    Só os chunks que chegaram adiantados ficam em memória; os demais vão direto para o disco.
+    Quem sintetiza limita quantos podem se adiantar (janela de síntese em app.py).
+    """
+
+    def __init__(self, writer: Mp3ConcatWriter):
+        self.writer = writer
+        self.next_index = 0
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def add(self, i: int, data: bytes):
+        with self.lock:
+            self.pending[i] = data
+            while self.next_index in self.pending:
+                self.writer.append(self.pending.pop(self.next_index))
+                self.next_index += 1
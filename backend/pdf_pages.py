@@ -0,0 +1,58 @@
+"""
+Extração de texto de PDFs página a página, em paralelo num pool de processos
+O PyPDF2 é Python puro (preso ao GIL): threads não ajudam, processos sim.
+Cada tarefa abre o PDF pelo caminho e extrai um lote de páginas consecutivas.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import PyPDF2
+
+# Páginas por tarefa: lotes maiores diluem o custo de reabrir o PDF em cada processo
+PAGES_PER_TASK = int(os.environ.get('PDF_PAGES_PER_TASK', 16))
+
+
+def pdf_page_count(path: str) -> int:
+    return len(PyPDF2.PdfReader(path).pages)
+
+
+def extract_page_batch(path: str, first: int, last: int) -> list:
+    """Extrai as páginas first..last (base 0, inclusive). Roda dentro do processo do pool."""
+    pages = PyPDF2.PdfReader(path).pages
+    return [pages[i].extract_text() or '' for i in range(first, last + 1)]
+
+
+def iter_pdf_pages(path: str, first_page: int, last_page: int, executor: ProcessPoolExecutor = None,
+                   window: int = 8):
+    """
+    Gera (número da página, texto) na ordem, para first_page..last_page (base 1, inclusive).
+    Com executor, até `window` lotes ficam em processamento adiantado; sem ele, extrai em série.
+    """
+    batches = [
+        (start, min(start + PAGES_PER_TASK - 1, last_page - 1))
+        for start in range(first_page - 1, last_page, PAGES_PER_TASK)
+    ]
+
+    if executor is None:
+        for first, last in batches:
+            for offset, text in enumerate(extract_page_batch(path, first, last)):
+                yield first + offset + 1, text
+        return
+
+    pending = deque()
+    next_batch = 0
+    try:
+        while pending or next_batch < len(batches):
+            while next_batch < len(batches) and len(pending) < window:
+                first, last = batches[next_batch]
+                pending.append((first, executor.submit(extract_page_batch, path, first, last)))
+                next_batch += 1
+            first, future = pending.popleft()
+            for offset, text in enumerate(future.result()):
+                yield first + offset + 1, text
+    finally:
+        # Cliente desconectou ou erro: descarta os lotes que ainda não começaram
+        for _, future in pending:
+            future.cancel()
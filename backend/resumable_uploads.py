@@ -0,0 +1,242 @@
+"""
+Upload resumível de arquivos grandes (áudios dos audiobooks), em partes numeradas
+Protocolo (rotas em app.py):
+  POST   /api/upload/audio/sessions                  {filename, size, sha256?} -> upload_id, chunk_size
+  PUT    /api/upload/audio/sessions/<id>/chunks/<n>  corpo = bytes da parte n, header X-Chunk-SHA256
+  GET    /api/upload/audio/sessions/<id>             -> offset já recebido (de onde retomar)
+  POST   /api/upload/audio/sessions/<id>/complete    -> move o arquivo para o destino (os.replace)
+  DELETE /api/upload/audio/sessions/<id>             -> cancela
+O estado fica em disco (<raiz>/<id>/meta.json + data.part): qualquer processo do gunicorn
+atende qualquer parte e a sessão sobrevive a reinícios. O corpo é lido do socket em blocos
+e gravado direto na posição final, então a memória não depende do tamanho do arquivo.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows (desenvolvimento): sem lock entre processos
+    fcntl = None
+
+READ_BLOCK_SIZE = 64 * 1024
+UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(Exception):
+    """Erro do protocolo, com o status HTTP correspondente"""
+
+    def __init__(self, message: str, status: int = 400, session: dict = None):
+        super().__init__(message)
+        self.status = status
+        self.session = session
+
+
+class UploadSessionStore:
+    def __init__(self, root: str, chunk_size: int, max_bytes: int, ttl_seconds: int):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(root, exist_ok=True)
+
+    # ---------- estado em disco ----------
+
+    def _dir(self, upload_id: str) -> str:
+        if not UPLOAD_ID_RE.match(upload_id or ''):
+            raise UploadError('Sessão de upload não encontrada', 404)
+        return os.path.join(self.root, upload_id)
+
+    def _load(self, upload_id: str) -> dict:
+        try:
+            with open(os.path.join(self._dir(upload_id), 'meta.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            raise UploadError('Sessão de upload não encontrada', 404)
+
+    def _save(self, session: dict):
+        path = os.path.join(self._dir(session['upload_id']), 'meta.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(session, f)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _locked(self, upload_id: str):
+        """Uma escrita por sessão por vez, entre threads e processos (flock no arquivo de lock)"""
+        session_dir = self._dir(upload_id)
+        if not os.path.isdir(session_dir):
+            raise UploadError('Sessão de upload não encontrada', 404)
+        with open(os.path.join(session_dir, 'lock'), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield self._load(upload_id)
+
+    def describe(self, session: dict) -> dict:
+        return {
+            'upload_id': session['upload_id'],
+            'filename': session['filename'],
+            'size': session['size'],
+            'offset': session['offset'],
+            'chunk_size': session['chunk_size'],
+            # Offsets são múltiplos de chunk_size, exceto no fim (aí next_chunk == chunks_total)
+            'next_chunk': -(-session['offset'] // session['chunk_size']),
+            'chunks_total': -(-session['size'] // session['chunk_size']),
+            'expires_at': session['updated_at'] + self.ttl_seconds,
+        }
+
+    # ---------- protocolo ----------
+
+    def create(self, filename: str, size: int, sha256: str = None) -> dict:
+        filename = os.path.basename((filename or '').replace('\\', '/')).strip()
+        if not filename:
+            raise UploadError('Nome do arquivo é obrigatório')
+        if not isinstance(size, int) or size < 0:
+            raise UploadError('Tamanho inválido')
+        if size > self.max_bytes:
+            raise UploadError(f'Arquivo maior que o limite de {self.max_bytes // (1024 * 1024)} MB', 413)
+        if sha256 is not None and not re.match(r'^[0-9a-fA-F]{64}$', sha256):
+            raise UploadError('sha256 inválido')
+
+        now = time.time()
+        session = {
+            'upload_id': uuid.uuid4().hex,
+            'filename': filename,
+            'size': size,
+            'sha256': sha256.lower() if sha256 else None,
+            'chunk_size': self.chunk_size,
+            'offset': 0,
+            'created_at': now,
+            'updated_at': now,
+        }
+        session_dir = self._dir(session['upload_id'])
+        os.makedirs(session_dir)
+        open(os.path.join(session_dir, 'data.part'), 'wb').close()
+        self._save(session)
+        return session
+
+    def get(self, upload_id: str) -> dict:
+        return self._load(upload_id)
+
+    def write_chunk(self, upload_id: str, index: int, stream, length, checksum: str) -> dict:
+        """
+        Grava a parte `index` lendo `length` bytes de `stream`. As partes chegam em ordem;
+        reenviar uma parte já recebida (ex: a resposta se perdeu) é aceito se o checksum bater.
+        """
+        if not checksum or not re.match(r'^[0-9a-fA-F]{64}$', checksum):
+            raise UploadError('Header X-Chunk-SHA256 obrigatório (SHA-256 da parte em hexadecimal)')
+        checksum = checksum.lower()
+
+        with self._locked(upload_id) as session:
+            chunk_size, size = session['chunk_size'], session['size']
+            start = index * chunk_size
+            if index < 0 or start >= size:
+                raise UploadError('Parte fora do arquivo', 416, session)
+            expected = min(chunk_size, size - start)
+            if length != expected:
+                raise UploadError(f'A parte {index} deve ter {expected} bytes (Content-Length)', 400, session)
+
+            data_path = os.path.join(self._dir(upload_id), 'data.part')
+            if start + expected <= session['offset']:
+                # Parte repetida: confere com o que já está gravado
+                if self._hash_range(data_path, start, expected) != checksum:
+                    raise UploadError(f'A parte {index} já foi recebida com outro conteúdo', 409, session)
+                return session
+            if start != session['offset']:
+                raise UploadError(
+                    f"Parte fora de ordem: esperado a parte {session['offset'] // chunk_size}", 409, session
+                )
+
+            digest = hashlib.sha256()
+            received = 0
+            with open(data_path, 'r+b') as f:
+                # Descarta bytes de uma tentativa anterior que não chegou ao fim
+                f.truncate(start)
+                f.seek(start)
+                while received < expected:
+                    block = stream.read(min(READ_BLOCK_SIZE, expected - received))
+                    if not block:
+                        break
+                    digest.update(block)
+                    f.write(block)
+                    received += len(block)
+                if received != expected or digest.hexdigest() != checksum:
+                    f.truncate(start)
+                    if received != expected:
+                        raise UploadError(f'Parte {index} incompleta ({received} de {expected} bytes)', 400, session)
+                    raise UploadError(f'Checksum da parte {index} não confere', 400, session)
+                f.flush()
+                # O offset só avança depois que os bytes estão no disco
+                os.fsync(f.fileno())
+
+            session['offset'] = start + expected
+            session['updated_at'] = time.time()
+            self._save(session)
+            return session
+
+    def complete(self, upload_id: str, dest_dir: str) -> str:
+        """Confere o arquivo completo e o move (atômico) para dest_dir. Retorna o caminho final."""
+        with self._locked(upload_id) as session:
+            if session['offset'] != session['size']:
+                raise UploadError(
+                    f"Upload incompleto: {session['offset']} de {session['size']} bytes recebidos", 409, session
+                )
+            data_path = os.path.join(self._dir(upload_id), 'data.part')
+            if session['sha256'] and self._hash_range(data_path, 0, session['size']) != session['sha256']:
+                raise UploadError('SHA-256 do arquivo não confere', 400, session)
+
+            dest_path = os.path.join(dest_dir, f"{uuid.uuid4()}_{session['filename']}")
+            os.replace(data_path, dest_path)
+        self._remove(upload_id)
+        return dest_path
+
+    def abort(self, upload_id: str):
+        with self._locked(upload_id):
+            pass
+        self._remove(upload_id)
+
+    def purge_expired(self, now: float = None) -> list:
+        """Remove sessões abandonadas (sem nenhuma parte nova há mais de ttl_seconds)"""
+        now = now or time.time()
+        removed = []
+        for upload_id in os.listdir(self.root):
+            try:
+                session = self._load(upload_id)
+            except UploadError:
+                session = None
+            meta_path = os.path.join(self.root, upload_id, 'meta.json')
+            updated_at = session['updated_at'] if session else (
+                os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0
+            )
+            if now - updated_at > self.ttl_seconds:
+                self._remove(upload_id)
+                removed.append(upload_id)
+        return removed
+
+    def _remove(self, upload_id: str):
+        session_dir = os.path.join(self.root, upload_id)
+        if not os.path.isdir(session_dir):
+            return
+        for name in os.listdir(session_dir):
+            os.remove(os.path.join(session_dir, name))
+        os.rmdir(session_dir)
+
+    @staticmethod
+    def _hash_range(path: str, start: int, length: int) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                block = f.read(min(READ_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+        return digest.hexdigest()
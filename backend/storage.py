@@ -0,0 +1,43 @@
+"""
+Armazenamento local: caminhos, URLs públicas dos uploads e migrações do banco
+Compartilhado entre o app.py e os scripts avulsos (backfill_track_metadata.py, cover_images.py),
+para os dois lados nunca divergirem.
+"""
+
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Banco, uploads, caches e arquivos temporários (padrão: junto do código; ex: um volume no deploy)
+DATA_DIR = os.environ.get('DATA_DIR', BASE_DIR)
+UPLOADS_DIR = os.path.join(DATA_DIR, 'uploads')
+COVERS_DIR = os.path.join(UPLOADS_DIR, 'covers')
+AUDIO_UPLOADS_DIR = os.path.join(UPLOADS_DIR, 'audiobooks')
+DB_PATH = os.path.join(DATA_DIR, 'audiobooks.db')
+
+AUDIO_UPLOADS_URL_PREFIX = '/api/uploads/audiobooks/'
+
+# Colunas de audiobook_tracks adicionadas depois da criação da tabela:
+# metadados do MP3 calculados no servidor (bitrate médio e nº de frames) e posição da faixa (capítulos)
+TRACK_MIGRATED_COLUMNS = {
+    'bitrate': 'INTEGER',
+    'frame_count': 'INTEGER',
+    'position': 'INTEGER',
+}
+
+
+def migrate_track_columns(cursor):
+    """Adiciona em audiobook_tracks as colunas que faltarem (bancos criados por versões antigas)"""
+    cursor.execute("PRAGMA table_info(audiobook_tracks)")
+    track_cols = [c[1] for c in cursor.fetchall()]
+    for column, column_type in TRACK_MIGRATED_COLUMNS.items():
+        if column not in track_cols:
+            cursor.execute(f"ALTER TABLE audiobook_tracks ADD COLUMN {column} {column_type}")
+
+
+def uploaded_audio_path(audio_url: str):
+    """Caminho local de um áudio enviado para /api/upload/audio (aceita URL absoluta ou relativa)"""
+    if AUDIO_UPLOADS_URL_PREFIX not in (audio_url or ''):
+        return None
+    filename = os.path.basename(audio_url.split(AUDIO_UPLOADS_URL_PREFIX, 1)[1].split('?', 1)[0])
+    path = os.path.join(AUDIO_UPLOADS_DIR, filename)
+    return path if filename and os.path.isfile(path) else None
@@ -0,0 +1,53 @@
+"""
+Configuração comum dos testes (rodar de dentro de backend/: python -m pytest -q)
+O app.py lê a configuração no import: antes dele, os dados (banco, uploads, caches) vão para um
+diretório temporário e o aquecimento de previews (que chamaria o Edge-TTS) é desligado.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DATA_DIR = tempfile.mkdtemp(prefix='audioloop-tests-')
+os.environ['DATA_DIR'] = TEST_DATA_DIR
+os.environ['PREVIEW_WARMUP'] = 'false'
+os.environ['GOOGLE_TTS_API_KEY'] = 'test-key'
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TEST_DATA_DIR, ignore_errors=True)
+
+
+# Frame MPEG-2 Layer III, 48 kbps, 24 kHz: 144 bytes, 24 ms de áudio
+FRAME_HEADER = bytes([0xFF, 0xF3, 0x64, 0xC0])
+FRAME_LENGTH = 144
+FRAME_SECONDS = 576 / 24000
+
+
+def mp3_frames(count: int, marker: int = 0) -> bytes:
+    """MP3 sintético com `count` frames; o primeiro byte de dados de cada frame é `marker`"""
+    return (FRAME_HEADER + bytes([marker % 256]) + bytes(FRAME_LENGTH - 5)) * count
+
+
+@pytest.fixture
+def tmp_db(tmp_path):
+    from db import Database
+    db = Database(str(tmp_path / 'test.db'))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def catalog():
+    """Módulo app com o catálogo (categorias, projetos e faixas) vazio no banco de teste"""
+    import app
+    with app.DB.transaction() as conn:
+        for table in ('audiobook_tracks', 'audiobooks', 'categories'):
+            conn.execute(f'DELETE FROM {table}')
+    return app
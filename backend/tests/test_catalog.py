@@ -0,0 +1,110 @@
+"""
+GET /api/audiobooks: faixas carregadas em lote (sem N+1) e paginação por cursor
+"""
+
+import pytest
+
+
+@pytest.fixture
+def seeded(catalog):
+    """25 projetos em 2 categorias, com empates de display_order e created_at, 2 faixas cada"""
+    with catalog.DB.transaction() as conn:
+        fiction = conn.execute("INSERT INTO categories (name) VALUES ('Ficção')").lastrowid
+        poetry = conn.execute("INSERT INTO categories (name) VALUES ('Poesia')").lastrowid
+        for i in range(25):
+            project_id = conn.execute(
+                'INSERT INTO audiobooks (title, category_id, display_order, created_at) VALUES (?, ?, ?, ?)',
+                (f'Livro {i}', fiction if i % 2 else poetry, i % 3, f'2026-01-0{1 + i % 4} 10:00:00')
+            ).lastrowid
+            # Inseridas fora de ordem: a resposta segue a posição
+            for position in (2, 1):
+                conn.execute(
+                    'INSERT INTO audiobook_tracks (audiobook_id, label, audio_url, position) VALUES (?, ?, ?, ?)',
+                    (project_id, f'Faixa {position}', f'/api/uploads/audiobooks/{i}-{position}.mp3', position)
+                )
+    return catalog, fiction, poetry
+
+
+def all_pages(client, limit, **params):
+    items, cursor, pages = [], None, 0
+    while True:
+        query = dict(params, limit=limit, **({'cursor': cursor} if cursor else {}))
+        body = client.get('/api/audiobooks', query_string=query).get_json()
+        items += body['audiobooks']
+        pages += 1
+        cursor = body['next_cursor']
+        if not cursor:
+            return items, pages
+
+
+def test_without_limit_returns_the_whole_catalog_in_order(seeded):
+    app, _, _ = seeded
+    body = app.app.test_client().get('/api/audiobooks').get_json()
+    projects = body['audiobooks']
+    assert len(projects) == 25
+    assert 'next_cursor' not in body
+    # display_order ASC, created_at DESC, id DESC (ordenações estáveis, da chave menos importante à mais)
+    expected = sorted(projects, key=lambda p: p['id'], reverse=True)
+    expected.sort(key=lambda p: p['created_at'], reverse=True)
+    expected.sort(key=lambda p: p['display_order'])
+    assert [p['id'] for p in projects] == [p['id'] for p in expected]
+
+
+def test_tracks_belong_to_their_project_and_follow_position(seeded):
+    app, _, _ = seeded
+    for project in app.app.test_client().get('/api/audiobooks').get_json()['audiobooks']:
+        assert [t['position'] for t in project['tracks']] == [1, 2]
+        assert all(t['audiobook_id'] == project['id'] for t in project['tracks'])
+
+
+@pytest.mark.parametrize('limit', [1, 7, 25, 30])
+def test_pages_add_up_to_the_full_list(seeded, limit):
+    app, _, _ = seeded
+    client = app.app.test_client()
+    full = client.get('/api/audiobooks').get_json()['audiobooks']
+    paged, pages = all_pages(client, limit)
+    assert [p['id'] for p in paged] == [p['id'] for p in full]
+    assert pages == max(1, -(-25 // limit))
+
+
+def test_pagination_with_category_filter(seeded):
+    app, fiction, _ = seeded
+    client = app.app.test_client()
+    paged, _ = all_pages(client, 4, category_id=fiction)
+    full = client.get('/api/audiobooks', query_string={'category_id': fiction}).get_json()['audiobooks']
+    assert len(paged) == 12
+    assert [p['id'] for p in paged] == [p['id'] for p in full]
+    assert {p['category_name'] for p in paged} == {'Ficção'}
+
+
+def test_limit_is_capped(seeded, monkeypatch):
+    app, _, _ = seeded
+    monkeypatch.setattr(app, 'AUDIOBOOKS_PAGE_MAX', 10)
+    body = app.app.test_client().get('/api/audiobooks?limit=1000').get_json()
+    assert len(body['audiobooks']) == 10
+    assert body['next_cursor']
+
+
+def test_invalid_cursor_is_a_400(seeded):
+    app, _, _ = seeded
+    response = app.app.test_client().get('/api/audiobooks?limit=5&cursor=nao-e-um-cursor')
+    assert response.status_code == 400
+
+
+def test_query_count_does_not_grow_with_the_page(seeded):
+    app, _, _ = seeded
+    client = app.app.test_client()
+    statements = []
+    conn = app.DB.connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        client.get('/api/audiobooks?limit=3')
+        small = len(statements)
+        statements.clear()
+        client.get('/api/audiobooks?limit=25')
+        large = len(statements)
+    finally:
+        conn.set_trace_callback(None)
+    # Projetos + faixas (uma consulta em lote), não uma consulta de faixas por projeto
+    assert small == large
+    assert large <= 3
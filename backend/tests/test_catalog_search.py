@@ -0,0 +1,126 @@
+"""
+Busca do catálogo: triggers do índice FTS5, prefixos sem acento, ranking bm25 e fallback com LIKE
+"""
+
+import sqlite3
+
+import pytest
+
+from catalog_search import create_search_index, fts_query, search_audiobooks
+
+
+@pytest.fixture
+def fts(catalog):
+    if not catalog.FTS_ENABLED:
+        pytest.skip('SQLite sem FTS5')
+    return catalog
+
+
+def insert_project(conn, title, description='', category_id=None):
+    return conn.execute(
+        'INSERT INTO audiobooks (title, description, category_id) VALUES (?, ?, ?)',
+        (title, description, category_id)
+    ).lastrowid
+
+
+def found(app, text, fts_enabled=True):
+    return [p['id'] for p in search_audiobooks(app.DB.connection(), text, 50, 0, fts_enabled=fts_enabled)]
+
+
+def test_fts_query_quotes_each_word_as_a_prefix():
+    assert fts_query('dom casm') == '"dom"* "casm"*'
+    # Aspas, operadores e parênteses do usuário não viram sintaxe FTS5
+    assert fts_query('"dom" OR (casmurro) -x*') == '"dom"* "OR"* "casmurro"* "x"*'
+    assert fts_query(' ?! ') == ''
+
+
+def test_triggers_follow_inserts_updates_and_deletes(fts):
+    with fts.DB.transaction() as conn:
+        project_id = insert_project(conn, 'Dom Casmurro', 'Romance de Machado')
+    assert found(fts, 'casmurro') == [project_id]
+
+    with fts.DB.transaction() as conn:
+        conn.execute("UPDATE audiobooks SET title = 'Memórias Póstumas' WHERE id = ?", (project_id,))
+    assert found(fts, 'casmurro') == []
+    assert found(fts, 'postumas') == [project_id]
+
+    with fts.DB.transaction() as conn:
+        conn.execute('DELETE FROM audiobooks WHERE id = ?', (project_id,))
+    assert found(fts, 'postumas') == []
+
+
+def test_category_rename_and_delete_update_the_index(fts):
+    with fts.DB.transaction() as conn:
+        category_id = conn.execute("INSERT INTO categories (name) VALUES ('Poesia')").lastrowid
+        project_id = insert_project(conn, 'Livro', category_id=category_id)
+    assert found(fts, 'poesia') == [project_id]
+
+    with fts.DB.transaction() as conn:
+        conn.execute("UPDATE categories SET name = 'Crônicas' WHERE id = ?", (category_id,))
+    assert found(fts, 'poesia') == []
+    assert found(fts, 'cronicas') == [project_id]
+
+    with fts.DB.transaction() as conn:
+        conn.execute('DELETE FROM categories WHERE id = ?', (category_id,))
+    assert found(fts, 'cronicas') == []
+    assert found(fts, 'livro') == [project_id]
+
+
+def test_prefix_search_ignores_accents_and_case(fts):
+    with fts.DB.transaction() as conn:
+        project_id = insert_project(conn, 'Coração de Pedra', 'Ação e emoção')
+        insert_project(conn, 'Outro título')
+    assert found(fts, 'CORAC') == [project_id]
+    assert found(fts, 'acao emoç') == [project_id]
+    # Todas as palavras são obrigatórias
+    assert found(fts, 'coracao inexistente') == []
+
+
+def test_title_matches_rank_above_description_matches(fts):
+    with fts.DB.transaction() as conn:
+        in_description = insert_project(conn, 'Contos', 'Uma história sobre o mar')
+        in_title = insert_project(conn, 'O Mar', 'Contos de pescadores')
+    assert found(fts, 'mar') == [in_title, in_description]
+
+
+def test_like_fallback_without_fts(catalog):
+    with catalog.DB.transaction() as conn:
+        category_id = conn.execute("INSERT INTO categories (name) VALUES ('Poesia')").lastrowid
+        project_id = insert_project(conn, 'Dom Casmurro', 'Romance', category_id)
+        insert_project(conn, 'Outro')
+    assert found(catalog, 'casm', fts_enabled=False) == [project_id]
+    assert found(catalog, 'poesia romance', fts_enabled=False) == [project_id]
+    assert found(catalog, '"%"', fts_enabled=False) == []
+
+
+def test_existing_catalog_is_indexed_on_creation():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript('''
+        CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE audiobooks (id INTEGER PRIMARY KEY, title TEXT, description TEXT, category_id INTEGER);
+        INSERT INTO categories VALUES (1, 'Poesia');
+        INSERT INTO audiobooks VALUES (7, 'Livro antigo', NULL, 1);
+    ''')
+    if not create_search_index(conn):
+        pytest.skip('SQLite sem FTS5')
+    assert conn.execute("SELECT rowid FROM audiobooks_fts WHERE audiobooks_fts MATCH 'poesia'").fetchall() == [(7,)]
+    # Idempotente: chamar de novo não duplica linhas
+    assert create_search_index(conn)
+    assert conn.execute('SELECT COUNT(*) FROM audiobooks_fts').fetchone() == (1,)
+
+
+def test_search_route(catalog):
+    with catalog.DB.transaction() as conn:
+        project_id = insert_project(conn, 'Dom Casmurro')
+        conn.execute(
+            'INSERT INTO audiobook_tracks (audiobook_id, label, audio_url, position) VALUES (?, ?, ?, ?)',
+            (project_id, 'Faixa 1', '/api/uploads/audiobooks/1.mp3', 1)
+        )
+    client = catalog.app.test_client()
+
+    assert client.get('/api/audiobooks/search').status_code == 400
+    body = client.get('/api/audiobooks/search', query_string={'q': 'casmurro', 'limit': 500}).get_json()
+    assert [p['id'] for p in body['audiobooks']] == [project_id]
+    assert [t['label'] for t in body['audiobooks'][0]['tracks']] == ['Faixa 1']
+    assert body['limit'] == catalog.AUDIOBOOKS_PAGE_MAX
+    assert client.get('/api/audiobooks/search', query_string={'q': 'casmurro', 'offset': 1}).get_json()['audiobooks'] == []
@@ -0,0 +1,127 @@
+"""
+Geração por capítulos: títulos preservados pela limpeza do texto extraído, detect_chapters e a rota
+"""
+
+import time
+
+import jwt
+import pytest
+
+from text_cleanup import LineJoiner, clean_extracted_text
+
+
+def paragraph_lines(sentences: int, word: str) -> str:
+    """Texto com quebras de linha de PDF (frases cortadas no meio da linha)"""
+    text = ' '.join(f'Esta é a frase {i} sobre {word} no meio do capítulo.' for i in range(sentences))
+    words = text.split()
+    return '\n'.join(' '.join(words[i:i + 9]) for i in range(0, len(words), 9))
+
+
+RAW_BOOK = '\n'.join([
+    'Dedicatória a quem lê',
+    paragraph_lines(3, 'a dedicatória'),
+    '',
+    'Capítulo 1',
+    paragraph_lines(12, 'o começo'),
+    '',
+    '  Capítulo   2 - A Viagem ',
+    paragraph_lines(12, 'a viagem'),
+    'CAPÍTULO III',
+    paragraph_lines(12, 'o fim'),
+])
+
+
+def test_heading_lines_are_not_joined_to_the_next_sentence():
+    cleaned = clean_extracted_text('Fim da parte\nCapítulo 1\nEra uma vez\num reino.')
+    assert cleaned.split('\n') == ['Fim da parte', 'Capítulo 1', 'Era uma vez um reino.']
+
+
+def test_heading_split_across_pages_is_the_same():
+    joiner = LineJoiner()
+    paragraphs = joiner.feed('Texto sem ponto final\n') + joiner.feed('Prólogo\nEra uma vez') + joiner.close()
+    assert paragraphs == ['Texto sem ponto final', 'Prólogo', 'Era uma vez']
+
+
+def test_long_lines_that_start_like_a_heading_are_prose():
+    line = 'Capítulo 1 - ' + 'muito longo ' * 20
+    assert clean_extracted_text(f'{line}\ncontinua aqui.') == f'{line.strip()} continua aqui.'
+
+
+def test_chapters_survive_the_extraction_cleanup(catalog):
+    chapters = catalog.detect_chapters(clean_extracted_text(RAW_BOOK))
+    assert [c['title'] for c in chapters] == ['Capítulo 1', 'Capítulo 2 - A Viagem', 'CAPÍTULO III']
+    # A dedicatória (curta demais) entra no primeiro capítulo
+    assert chapters[0]['text'].startswith('Dedicatória a quem lê')
+    assert chapters[2]['text'].startswith('CAPÍTULO III\nEsta é a frase 0 sobre o fim')
+
+
+def test_text_without_headings_is_a_single_chapter(catalog):
+    chapters = catalog.detect_chapters(clean_extracted_text(paragraph_lines(20, 'nada')))
+    assert [c['title'] for c in chapters] == ['Abertura']
+
+
+@pytest.fixture
+def admin_headers(catalog):
+    token = jwt.encode(
+        {'email': '2closett@gmail.com', 'aud': 'authenticated', 'exp': int(time.time()) + 600},
+        catalog.SUPABASE_JWT_SECRET, algorithm='HS256'
+    )
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def submitted(catalog, monkeypatch):
+    """Jobs enviados ao agendador (sem sintetizar de verdade)"""
+    jobs = []
+    monkeypatch.setattr(catalog.JOB_SCHEDULER, 'submit', lambda job_id, user, cost, *args: jobs.append((job_id, args)))
+    return jobs
+
+
+def test_route_requires_admin(catalog):
+    response = catalog.app.test_client().post('/api/generate/chapters', json={'text': RAW_BOOK, 'detect_only': True})
+    assert response.status_code == 401
+
+
+def test_route_detect_only(catalog, admin_headers, submitted):
+    client = catalog.app.test_client()
+    response = client.post('/api/generate/chapters', headers=admin_headers,
+                           json={'text': clean_extracted_text(RAW_BOOK), 'detect_only': True})
+    assert response.status_code == 200
+    assert [c['title'] for c in response.get_json()['chapters']] == ['Capítulo 1', 'Capítulo 2 - A Viagem', 'CAPÍTULO III']
+    assert submitted == []
+
+
+def test_route_queues_one_job_per_chapter(catalog, admin_headers, submitted):
+    client = catalog.app.test_client()
+    response = client.post('/api/generate/chapters', headers=admin_headers,
+                           json={'text': clean_extracted_text(RAW_BOOK), 'title': 'Meu Livro'})
+    assert response.status_code == 202
+    body = response.get_json()
+    assert [(j['position'], j['title']) for j in body['jobs']] == [
+        (1, 'Capítulo 1'), (2, 'Capítulo 2 - A Viagem'), (3, 'CAPÍTULO III')
+    ]
+    assert [job_id for job_id, _ in submitted] == [j['job_id'] for j in body['jobs']]
+    # Cada job publica a faixa no projeto criado, na posição do capítulo
+    publish = [args[-1] for _, args in submitted]
+    assert {p['audiobook_id'] for p in publish} == {body['project_id']}
+    assert [p['label'] for p in publish] == ['Capítulo 1', 'Capítulo 2 - A Viagem', 'CAPÍTULO III']
+    for job in body['jobs']:
+        assert catalog.JOB_STORE.get(job['job_id'])['status'] == 'pending'
+
+    title = catalog.DB.connection().execute('SELECT title FROM audiobooks WHERE id = ?', (body['project_id'],)).fetchone()[0]
+    assert title == 'Meu Livro'
+
+
+def test_route_appends_after_existing_tracks(catalog, admin_headers, submitted):
+    with catalog.DB.transaction() as conn:
+        project_id = conn.execute("INSERT INTO audiobooks (title) VALUES ('Existente')").lastrowid
+        conn.execute(
+            'INSERT INTO audiobook_tracks (audiobook_id, label, audio_url, position) VALUES (?, ?, ?, ?)',
+            (project_id, 'Faixa antiga', '/api/uploads/audiobooks/x.mp3', 4)
+        )
+    client = catalog.app.test_client()
+    response = client.post('/api/generate/chapters', headers=admin_headers,
+                           json={'text': clean_extracted_text(RAW_BOOK), 'project_id': project_id})
+    assert [j['position'] for j in response.get_json()['jobs']] == [5, 6, 7]
+    assert client.post('/api/generate/chapters', headers=admin_headers,
+                       json={'text': RAW_BOOK, 'project_id': 99999}).status_code == 404
@@ -0,0 +1,88 @@
+"""
+chunker: limite em bytes UTF-8, preservação do texto, empacotamento de parágrafos e
+equivalência com o split_text_for_google original (mantido em bench_chunker.py)
+"""
+
+import time
+
+import pytest
+
+from chunker import iter_chunks, provider_limit, cut_at_bytes, utf8_len, GOOGLE_MAX_BYTES
+from bench_chunker import legacy_split_text_for_google, make_corpus
+
+
+def words(text):
+    return text.split()
+
+
+def test_short_paragraphs_are_packed_together():
+    assert list(iter_chunks('Um.\nDois.\n\nTrês.', limit=100)) == ['Um.\nDois.\nTrês.']
+
+
+def test_paragraph_boundaries_are_preferred():
+    para = 'palavra ' * 10
+    chunks = list(iter_chunks('\n'.join([para.strip()] * 3), limit=len(para) * 2))
+    assert chunks == ['\n'.join([para.strip()] * 2), para.strip()]
+
+
+def test_long_paragraph_is_split_by_sentences():
+    sentences = [f'Frase número {i} termina aqui.' for i in range(20)]
+    chunks = list(iter_chunks(' '.join(sentences), limit=100))
+    assert all(utf8_len(chunk) <= 100 for chunk in chunks)
+    # Nenhuma frase cortada no meio
+    assert all(chunk.endswith('.') for chunk in chunks)
+    assert words(' '.join(chunks)) == words(' '.join(sentences))
+
+
+def test_giant_sentence_is_cut_between_words():
+    sentence = ' '.join(f'palavra{i}' for i in range(500))
+    chunks = list(iter_chunks(sentence, limit=300))
+    assert all(utf8_len(chunk) <= 300 for chunk in chunks)
+    assert words(' '.join(chunks)) == words(sentence)
+
+
+def test_limit_is_in_bytes_and_never_splits_a_character():
+    # "ç" e "ã" ocupam 2 bytes; emoji, 4
+    text = ('Ação e coração 🎧 ' * 400).strip()
+    chunks = list(iter_chunks(text, limit=101))
+    assert all(utf8_len(chunk) <= 101 for chunk in chunks)
+    assert ''.join(chunks).replace(' ', '') == text.replace(' ', '')
+
+
+def test_cut_at_bytes():
+    assert cut_at_bytes('abc', 2) == 'ab'
+    assert cut_at_bytes('ãé', 3) == 'ã'
+    assert cut_at_bytes('🎧x', 3) == ''
+
+
+def test_blank_text_has_no_chunks():
+    assert list(iter_chunks('\n \r\n\t\n', limit=100)) == []
+
+
+def test_crlf_is_normalized():
+    assert list(iter_chunks('Um.\r\nDois.\rTrês.', limit=100)) == ['Um.\nDois.\nTrês.']
+
+
+def test_provider_limit():
+    assert provider_limit('google', 9000) == GOOGLE_MAX_BYTES
+    assert provider_limit('google', 3000) == 3000
+    assert provider_limit('edge', 9000) == 9000
+
+
+@pytest.mark.parametrize('limit', [200, 1000, 4500])
+def test_same_chunks_as_the_original_implementation(limit):
+    text = make_corpus(0.2, seed=limit)
+    assert list(iter_chunks(text, limit)) == legacy_split_text_for_google(text, limit)
+
+
+def test_runs_in_linear_time():
+    small = make_corpus(0.5)
+    large = small * 4
+    started = time.perf_counter()
+    list(iter_chunks(small, 4500))
+    small_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    list(iter_chunks(large, 4500))
+    large_seconds = time.perf_counter() - started
+    # 4x o texto: ~4x o tempo (folga para ruído), não 16x
+    assert large_seconds < small_seconds * 8 + 0.05
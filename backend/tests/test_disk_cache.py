@@ -0,0 +1,97 @@
+"""
+DiskLRUCache: escrita atômica, despejo LRU e totais mantidos sem varrer o diretório
+"""
+
+import os
+import time
+
+import pytest
+
+from disk_cache import DiskLRUCache, content_key
+
+
+def on_disk(cache):
+    names = [n for n in os.listdir(cache.directory) if not n.startswith('.tmp-')]
+    return len(names), sum(os.path.getsize(os.path.join(cache.directory, n)) for n in names)
+
+
+def age(cache, key, seconds):
+    path = cache.path_for(key)
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_content_key_separates_parts():
+    assert content_key('ab', 'c') != content_key('a', 'bc')
+    assert content_key('a', b'b') == content_key('a', 'b')
+
+
+def test_put_and_get(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1000, suffix='.mp3')
+    path = cache.put_bytes('k1', b'abc')
+    assert path.endswith('k1.mp3')
+    assert cache.get_bytes('k1') == b'abc'
+    assert cache.get('missing') is None
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+
+def test_totals_follow_puts_and_overwrites(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=10_000)
+    cache.put_bytes('a', b'x' * 100)
+    cache.put_bytes('b', b'x' * 200)
+    cache.put_bytes('a', b'x' * 50)
+    stats = cache.stats()
+    assert (stats['entries'], stats['size_bytes']) == on_disk(cache) == (2, 250)
+
+
+def test_eviction_removes_least_recently_used_down_to_the_target(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1000, evict_to=0.5)
+    for i in range(4):
+        cache.put_bytes(f'k{i}', b'x' * 200)
+        age(cache, f'k{i}', 100 - i)
+    # k0 é o mais antigo, mas acabou de ser lido
+    cache.get('k0')
+    cache.put_bytes('k4', b'x' * 300)
+
+    # 1100 bytes > 1000: sai o menos usado até ficar em 500
+    assert sorted(os.listdir(cache.directory)) == ['k0', 'k4']
+    stats = cache.stats()
+    assert (stats['entries'], stats['size_bytes']) == on_disk(cache) == (2, 500)
+
+
+def test_stats_and_puts_under_budget_do_not_scan(tmp_path, monkeypatch):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=10_000)
+    cache.put_bytes('a', b'x' * 10)
+
+    def no_scan():
+        raise AssertionError('varreu o diretório')
+
+    monkeypatch.setattr(cache, '_entries', no_scan)
+    for i in range(20):
+        cache.put_bytes(f'k{i}', b'x' * 10)
+        cache.stats()
+    assert cache.stats()['entries'] == 21
+
+
+def test_totals_are_rescanned_for_writes_of_other_processes(tmp_path):
+    mine = DiskLRUCache(str(tmp_path), max_bytes=10_000, rescan_seconds=0.05)
+    other = DiskLRUCache(str(tmp_path), max_bytes=10_000)
+    mine.put_bytes('a', b'x' * 10)
+    other.put_bytes('b', b'x' * 20)
+    assert mine.stats()['size_bytes'] == 10
+    time.sleep(0.06)
+    assert mine.stats()['size_bytes'] == 30
+
+
+def test_unbounded_cache_never_evicts(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=float('inf'))
+    for i in range(10):
+        cache.put_bytes(f'k{i}', b'x' * 1000)
+    assert on_disk(cache) == (10, 10_000)
+
+
+def test_failed_put_leaves_no_temporary_file(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1000)
+    with pytest.raises(FileNotFoundError):
+        cache.put_file('k', str(tmp_path / 'does-not-exist'))
+    assert os.listdir(cache.directory) == []
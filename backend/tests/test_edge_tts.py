@@ -0,0 +1,138 @@
+"""
+Síntese paralela do Edge-TTS com um Communicate falso no lugar do serviço da Microsoft:
+ordem dos chunks no MP3 final, limite de concorrência, novas tentativas e progresso do job.
+"""
+
+import asyncio
+
+import pytest
+
+import app
+from mp3_frames import Mp3ConcatWriter, iter_frames
+from conftest import mp3_frames
+
+VOICE = 'pt-BR-AntonioNeural'
+FRAMES_PER_CHUNK = 2
+
+
+class FakeCommunicate:
+    """
+    Edge-TTS falso: o texto de cada chunk é "chunk-<n>"; o áudio são frames marcados com n,
+    entregues em duas mensagens. Atrasos e falhas por chunk vêm das variáveis de classe.
+    """
+
+    delays = {}
+    failures = {}
+    calls = {}
+    in_flight = 0
+    max_in_flight = 0
+
+    def __init__(self, text, voice, **kwargs):
+        self.index = int(text.split('-')[1])
+
+    async def stream(self):
+        cls = FakeCommunicate
+        cls.calls[self.index] = cls.calls.get(self.index, 0) + 1
+        cls.in_flight += 1
+        cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            await asyncio.sleep(cls.delays.get(self.index, 0.01))
+            if cls.failures.get(self.index, 0):
+                cls.failures[self.index] -= 1
+                raise ConnectionError('WebSocket fechado')
+            yield {'type': 'WordBoundary'}
+            yield {'type': 'audio', 'data': mp3_frames(1, marker=self.index)}
+            yield {'type': 'audio', 'data': mp3_frames(FRAMES_PER_CHUNK - 1, marker=self.index)}
+        finally:
+            cls.in_flight -= 1
+
+
+@pytest.fixture
+def edge(monkeypatch):
+    FakeCommunicate.delays = {}
+    FakeCommunicate.failures = {}
+    FakeCommunicate.calls = {}
+    FakeCommunicate.in_flight = FakeCommunicate.max_in_flight = 0
+    monkeypatch.setattr(app.edge_tts, 'Communicate', FakeCommunicate)
+    # Sem espera entre tentativas
+    monkeypatch.setattr(app.asyncio, 'sleep', fast_sleep(asyncio.sleep))
+    return FakeCommunicate
+
+
+def fast_sleep(sleep):
+    async def patched(seconds, *args, **kwargs):
+        return await sleep(min(seconds, 0.05), *args, **kwargs)
+    return patched
+
+
+def markers(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return [data[offset + 4] for offset, _ in list(iter_frames(data))[1:]]
+
+
+def expected_markers(count):
+    return [i for i in range(count) for _ in range(FRAMES_PER_CHUNK)]
+
+
+def synthesize_to_file(path, count, job_id=None):
+    chunks = [f'chunk-{i}' for i in range(count)]
+    with Mp3ConcatWriter(str(path)) as writer:
+        app.run_async(app.synthesize_chunks_edge(chunks, VOICE, app.ordered_chunk_sink(writer, job_id, count)))
+    return writer
+
+
+def test_chunks_are_joined_in_text_order(edge, tmp_path):
+    edge.delays = {0: 0.2, 1: 0.1}
+    writer = synthesize_to_file(tmp_path / 'out.mp3', 12)
+
+    assert markers(tmp_path / 'out.mp3') == expected_markers(12)
+    assert writer.frames == 12 * FRAMES_PER_CHUNK
+
+
+def test_concurrency_is_bounded_by_the_semaphore(edge, tmp_path):
+    edge.delays = {i: 0.05 for i in range(20)}
+    synthesize_to_file(tmp_path / 'out.mp3', 20)
+
+    assert 1 < edge.max_in_flight <= app.EDGE_MAX_CONCURRENCY
+
+
+def test_failed_chunk_is_retried(edge, tmp_path):
+    edge.failures = {3: app.EDGE_CHUNK_RETRIES}
+    synthesize_to_file(tmp_path / 'out.mp3', 6)
+
+    assert edge.calls[3] == app.EDGE_CHUNK_RETRIES + 1
+    assert markers(tmp_path / 'out.mp3') == expected_markers(6)
+
+
+def test_chunk_failing_every_attempt_fails_the_book(edge, tmp_path):
+    edge.failures = {2: 99}
+    with pytest.raises(ConnectionError):
+        synthesize_to_file(tmp_path / 'out.mp3', 40)
+
+    assert edge.calls[2] == app.EDGE_CHUNK_RETRIES + 1
+    assert not (tmp_path / 'out.mp3').exists()
+    # Chunks além da janela de síntese nem chegam a ser disparados
+    assert max(edge.calls) < 2 + app.EDGE_MAX_CONCURRENCY * app.SYNTHESIS_WINDOW_FACTOR
+
+
+def test_progress_is_reported_per_chunk(edge, tmp_path):
+    job_id = 'edge-progress'
+    app.JOB_STORE.create(job_id, status='processing', worker=app.current_worker_id())
+    synthesize_to_file(tmp_path / 'out.mp3', 8, job_id=job_id)
+
+    job = app.JOB_STORE.get(job_id)
+    assert (job['chunks_done'], job['chunks_total'], job['progress']) == (8, 8, 95)
+
+
+def test_cancelled_job_stops_calling_the_provider(edge, tmp_path):
+    chunks = [f'chunk-{i}' for i in range(30)]
+    delivered = []
+
+    def on_chunk_done(i, audio):
+        delivered.append(i)
+
+    with pytest.raises(app.JobCancelled):
+        app.run_async(app.synthesize_chunks_edge(chunks, VOICE, on_chunk_done, lambda: len(delivered) >= 3))
+
+    assert len(edge.calls) < len(chunks)
@@ -0,0 +1,115 @@
+"""
+/api/extract com PDF: extração pelo pool de processos (forkserver), streaming NDJSON e cache
+"""
+
+import io
+import os
+import json
+
+import pytest
+
+import app
+import pdf_pages
+from text_cleanup import clean_extracted_text
+
+
+def make_pdf(pages: list) -> bytes:
+    """PDF mínimo (Helvetica, WinAnsi) com uma linha de texto por item de cada página"""
+    count = len(pages)
+    font_id = 3 + 2 * count
+    kids = ' '.join(f'{3 + 2 * i} 0 R' for i in range(count))
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', f'<< /Type /Pages /Kids [{kids}] /Count {count} >>'.encode()]
+    for i, lines in enumerate(pages):
+        ops = ['BT', '/F1 12 Tf', '14 TL', '72 720 Td']
+        ops += [f"({line.replace('(', '[').replace(')', ']')}) Tj T*" for line in lines]
+        stream = '\n'.join(ops + ['ET']).encode('latin-1')
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            f'/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>'.encode()
+        )
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+    objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def book_pages(tag: str, count: int = 12) -> list:
+    """Páginas com um título de capítulo a cada 4 e frases quebradas entre linhas e páginas"""
+    pages = []
+    for page in range(count):
+        lines = [f'Capítulo {page // 4 + 1}'] if page % 4 == 0 else []
+        lines += [f'{tag} página {page} linha {line} de uma frase' for line in range(6)]
+        lines.append('que continua na próxima' if page % 2 else 'e termina aqui.')
+        pages.append(lines)
+    return pages
+
+
+def expected_text(pages: list) -> str:
+    return clean_extracted_text('\n'.join('\n'.join(lines) for lines in pages))
+
+
+@pytest.fixture
+def pdf_pool(monkeypatch):
+    """Pool de 2 processos com lotes pequenos (várias tarefas por PDF)"""
+    monkeypatch.setattr(app, 'PDF_EXTRACT_WORKERS', 2)
+    monkeypatch.setattr(app, '_pdf_executor', None)
+    monkeypatch.setattr(pdf_pages, 'PAGES_PER_TASK', 3)
+    yield
+    if app._pdf_executor is not None:
+        app._pdf_executor.shutdown()
+
+
+def upload(pages: list, **params):
+    client = app.app.test_client()
+    return client.post('/api/extract', data={'file': (io.BytesIO(make_pdf(pages)), 'livro.pdf'), **params},
+                       content_type='multipart/form-data')
+
+
+def test_pool_does_not_fork_the_app_process(pdf_pool):
+    executor = app.get_pdf_executor()
+    assert executor._mp_context.get_start_method() == app.PDF_POOL_START_METHOD != 'fork'
+    if app.PDF_POOL_START_METHOD == 'forkserver':
+        # Os filhos saem do servidor do forkserver, não deste processo (que já tem threads rodando)
+        assert executor.submit(os.getppid).result() != os.getpid()
+
+
+def test_extract_pdf_through_the_pool(pdf_pool):
+    pages = book_pages('pool')
+    response = upload(pages)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['text'] == expected_text(pages)
+    assert (body['page_count'], body['first_page'], body['last_page'], body['cached']) == (12, 1, 12, False)
+    assert [c['title'] for c in app.detect_chapters(body['text'])] == ['Capítulo 1', 'Capítulo 2', 'Capítulo 3']
+
+    # Mesmo arquivo de novo: vem do cache
+    assert upload(pages).get_json()['cached'] is True
+
+
+def test_pool_and_serial_extraction_give_the_same_text(pdf_pool, monkeypatch):
+    pages = book_pages('serial')
+    pooled = upload(pages, first_page='2', last_page='11').get_json()
+    monkeypatch.setattr(app, 'PDF_EXTRACT_WORKERS', 0)
+    serial = upload(pages + [['página extra.']], first_page='2', last_page='11').get_json()
+    assert pooled['text'] == serial['text'] == expected_text(pages[1:11])
+
+
+def test_streamed_extraction(pdf_pool):
+    pages = book_pages('stream')
+    response = upload(pages, stream='true')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert lines[0]['type'] == 'meta' and lines[-1]['type'] == 'done'
+    assert [line['page'] for line in lines if line['type'] == 'page'] == list(range(1, 13))
+    paragraphs = [p for line in lines[1:] for p in line['paragraphs']]
+    assert '\n'.join(paragraphs) == expected_text(pages)
@@ -0,0 +1,138 @@
+"""
+file_serving: parser de Range, respostas 206/416/304, If-Range e entrega delegada ao proxy
+"""
+
+import os
+
+import pytest
+from flask import Flask
+
+import file_serving
+from file_serving import parse_byte_ranges, satisfiable_ranges, send_ranged_file
+
+CONTENT = bytes(range(256)) * 40     # 10240 bytes
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-99', [(0, 99)]),
+    ('bytes=100-', [(100, None)]),
+    ('bytes=-500', [(-500, None)]),
+    ('bytes=0-0, 200-299 ,-1', [(0, 0), (200, 299), (-1, None)]),
+    # A RFC permite intervalos fora de ordem e sobrepostos
+    ('bytes=500-600,0-10,550-700', [(500, 600), (0, 10), (550, 700)]),
+    ('BYTES=1-2', [(1, 2)]),
+    ('bytes=-0,5-6', [(5, 6)]),
+])
+def test_parse_byte_ranges(header, expected):
+    assert parse_byte_ranges(header) == expected
+
+
+@pytest.mark.parametrize('header', [None, '', 'bytes', 'items=0-1', 'bytes=5-1', 'bytes=a-b', 'bytes=-', 'bytes=1', 'bytes=-0'])
+def test_invalid_ranges_are_ignored(header):
+    assert parse_byte_ranges(header) is None
+
+
+def test_satisfiable_ranges_clamp_sort_and_merge():
+    ranges = [(500, 600), (0, 10), (550, 700), (-100, None), (20000, None), (9000, 99999)]
+    assert satisfiable_ranges(ranges, 10240) == [(0, 11), (500, 701), (9000, 10240)]
+    assert satisfiable_ranges([(20000, None)], 10240) == []
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / 'audio.mp3'
+    path.write_bytes(CONTENT)
+    app = Flask(__name__)
+
+    @app.route('/file')
+    def serve():
+        return send_ranged_file(str(path), mimetype='audio/mpeg', download_name='capítulo 1.mp3',
+                                max_age=60, offload_root=str(tmp_path))
+
+    return app.test_client()
+
+
+def test_full_file_advertises_ranges(client):
+    response = client.get('/file')
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['ETag']
+
+
+def test_single_range(client):
+    response = client.get('/file', headers={'Range': 'bytes=100-199'})
+    assert response.status_code == 206
+    assert response.data == CONTENT[100:200]
+    assert response.headers['Content-Range'] == 'bytes 100-199/10240'
+    assert response.headers['Content-Length'] == '100'
+    assert "filename*=UTF-8''cap%C3%ADtulo%201.mp3" in response.headers['Content-Disposition']
+
+
+def test_suffix_and_open_ranges(client):
+    assert client.get('/file', headers={'Range': 'bytes=-10'}).data == CONTENT[-10:]
+    assert client.get('/file', headers={'Range': 'bytes=10200-'}).data == CONTENT[10200:]
+
+
+def test_multiple_ranges_are_multipart(client):
+    response = client.get('/file', headers={'Range': 'bytes=0-9,5000-5009'})
+    assert response.status_code == 206
+    assert response.mimetype == 'multipart/byteranges'
+    body = response.data
+    assert b'Content-Range: bytes 0-9/10240' in body and CONTENT[0:10] in body
+    assert b'Content-Range: bytes 5000-5009/10240' in body and CONTENT[5000:5010] in body
+
+
+def test_unsatisfiable_range(client):
+    response = client.get('/file', headers={'Range': 'bytes=20000-'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == 'bytes */10240'
+
+
+def test_if_none_match_gives_304(client):
+    etag = client.get('/file').headers['ETag']
+    assert client.get('/file', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/file', headers={'If-None-Match': etag, 'Range': 'bytes=0-9'}).status_code == 304
+
+
+def test_stale_if_range_sends_the_whole_file(client):
+    etag = client.get('/file').headers['ETag']
+    fresh = client.get('/file', headers={'Range': 'bytes=0-9', 'If-Range': etag})
+    assert fresh.status_code == 206
+    stale = client.get('/file', headers={'Range': 'bytes=0-9', 'If-Range': '"outro"'})
+    assert stale.status_code == 200
+    assert stale.data == CONTENT
+
+
+def test_etag_changes_when_the_file_changes(client, tmp_path):
+    etag = client.get('/file').headers['ETag']
+    path = tmp_path / 'audio.mp3'
+    path.write_bytes(CONTENT[::-1])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert client.get('/file').headers['ETag'] != etag
+
+
+def test_x_accel_offload(client, monkeypatch):
+    monkeypatch.setattr(file_serving, 'UPLOADS_OFFLOAD', 'x-accel')
+    response = client.get('/file', headers={'Range': 'bytes=0-9'})
+    # O proxy atende o Range: o Flask só aponta para a location interna
+    assert response.status_code == 200
+    assert response.headers['X-Accel-Redirect'] == '/_uploads/audio.mp3'
+    assert response.data == b''
+
+    etag = response.headers['ETag']
+    not_modified = client.get('/file', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert 'X-Accel-Redirect' not in not_modified.headers
+
+
+def test_offload_only_inside_the_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_serving, 'UPLOADS_OFFLOAD', 'x-sendfile')
+    inside = tmp_path / 'root' / 'a.mp3'
+    inside.parent.mkdir()
+    inside.write_bytes(b'x')
+    outside = tmp_path / 'b.mp3'
+    outside.write_bytes(b'x')
+    assert file_serving.offload_path(str(inside), str(tmp_path / 'root')) == os.path.realpath(inside)
+    assert file_serving.offload_path(str(outside), str(tmp_path / 'root')) is None
@@ -0,0 +1,203 @@
+"""
+Caminho paralelo do Google TTS contra um servidor HTTP local no lugar da API:
+ordem de gravação, novas tentativas, propagação de erro, progresso e reuso de conexões.
+"""
+
+import json
+import time
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import app
+from mp3_frames import Mp3ConcatWriter, iter_frames
+from conftest import mp3_frames
+
+VOICE = 'pt-BR-Neural2-A'
+FRAMES_PER_CHUNK = 3
+
+
+class FakeGoogleTTS(ThreadingHTTPServer):
+    """
+    Responde como o text:synthesize. O texto de cada chunk é "chunk-<n>"; o áudio devolvido são
+    frames marcados com n. Por chunk dá para configurar atraso, falhas temporárias e falha fixa.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeGoogleHandler)
+        self.lock = threading.Lock()
+        self.delays = {}
+        self.transient_failures = {}
+        self.permanent_failures = {}
+        self.requests = {}
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/v1/text:synthesize'
+
+
+class FakeGoogleHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        index = int(payload['input']['text'].split('-')[1])
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.requests[index] = server.requests.get(index, 0) + 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            transient = server.transient_failures.get(index, 0)
+            if transient:
+                server.transient_failures[index] = transient - 1
+        try:
+            time.sleep(server.delays.get(index, 0))
+            if index in server.permanent_failures:
+                status, body = 400, {'error': {'message': server.permanent_failures[index]}}
+            elif transient:
+                status, body = 503, {'error': {'message': 'Service Unavailable'}}
+            else:
+                audio = mp3_frames(FRAMES_PER_CHUNK, marker=index)
+                status, body = 200, {'audioContent': base64.b64encode(audio).decode()}
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def google(monkeypatch):
+    server = FakeGoogleTTS()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(app, 'GOOGLE_TTS_API_URL', server.url)
+    monkeypatch.setattr(app, 'GOOGLE_RETRY_BACKOFF_SECONDS', 0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def chunk_texts(count):
+    return [f'chunk-{i}' for i in range(count)]
+
+
+def written_markers(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    # O primeiro frame é o Xing/Info (sem marcador), gravado pelo writer no close()
+    return [data[offset + 4] for offset, _ in list(iter_frames(data))[1:]]
+
+
+def synthesize_to_file(path, chunks, job_id=None):
+    with Mp3ConcatWriter(str(path)) as writer:
+        app.synthesize_chunks_google(chunks, VOICE, app.ordered_chunk_sink(writer, job_id, len(chunks)))
+    return writer
+
+
+def test_chunks_are_written_in_text_order_even_when_they_finish_out_of_order(google, tmp_path):
+    # Os primeiros chunks demoram mais: terminam depois dos seguintes
+    google.delays = {0: 0.3, 1: 0.2, 2: 0.1}
+    writer = synthesize_to_file(tmp_path / 'out.mp3', chunk_texts(20))
+
+    expected = [i for i in range(20) for _ in range(FRAMES_PER_CHUNK)]
+    assert written_markers(tmp_path / 'out.mp3') == expected
+    assert writer.frames == 20 * FRAMES_PER_CHUNK
+    assert google.max_in_flight > 1
+
+
+def test_requests_run_in_parallel_over_pooled_connections(google, tmp_path):
+    google.delays = {i: 0.1 for i in range(16)}
+    started = time.time()
+    synthesize_to_file(tmp_path / 'out.mp3', chunk_texts(16))
+    elapsed = time.time() - started
+
+    # Serial seriam 1,6 s; com 8 em paralelo, ~0,2 s
+    assert elapsed < 1.0
+    assert google.max_in_flight <= app.GOOGLE_MAX_CONCURRENCY
+    # Keep-alive: no máximo uma conexão por thread do pool, não uma por requisição
+    assert len(google.connections) <= app.GOOGLE_MAX_CONCURRENCY
+
+
+def test_transient_errors_are_retried(google, tmp_path):
+    google.transient_failures = {3: 2}
+    synthesize_to_file(tmp_path / 'out.mp3', chunk_texts(6))
+
+    assert google.requests[3] == 3
+    assert written_markers(tmp_path / 'out.mp3') == [i for i in range(6) for _ in range(FRAMES_PER_CHUNK)]
+
+
+def test_error_after_retries_propagates_with_chunk_number(google, tmp_path):
+    google.transient_failures = {4: 99}
+    with pytest.raises(Exception, match=r'Chunk 5\): Service Unavailable'):
+        synthesize_to_file(tmp_path / 'out.mp3', chunk_texts(6))
+
+    assert google.requests[4] == app.GOOGLE_CHUNK_RETRIES + 1
+    # O writer descarta o arquivo incompleto
+    assert not (tmp_path / 'out.mp3').exists()
+
+
+def test_request_errors_are_not_retried(google, tmp_path):
+    google.permanent_failures = {2: 'Invalid voice'}
+    with pytest.raises(Exception, match=r'Chunk 3\): Invalid voice'):
+        synthesize_to_file(tmp_path / 'out.mp3', chunk_texts(6))
+
+    assert google.requests[2] == 1
+
+
+def test_failure_stops_dispatching_the_remaining_chunks(google, tmp_path):
+    google.permanent_failures = {0: 'Invalid voice'}
+    google.delays = {0: 0.2}
+    with pytest.raises(Exception):
+        synthesize_to_file(tmp_path / 'out.mp3', chunk_texts(200))
+
+    # Só a janela de síntese chegou a ser enviada, não o livro inteiro
+    window = app.GOOGLE_MAX_CONCURRENCY * app.SYNTHESIS_WINDOW_FACTOR
+    assert len(google.requests) <= window
+
+
+def test_progress_counts_every_chunk(google, tmp_path):
+    job_id = 'google-progress'
+    app.JOB_STORE.create(job_id, status='processing', worker=app.current_worker_id())
+    google.delays = {0: 0.1}
+    synthesize_to_file(tmp_path / 'out.mp3', chunk_texts(10), job_id=job_id)
+
+    job = app.JOB_STORE.get(job_id)
+    assert (job['chunks_done'], job['chunks_total']) == (10, 10)
+    assert job['progress'] == 95
+
+
+def test_generate_audio_google_end_to_end(google, tmp_path, monkeypatch):
+    # Cada parágrafo vira um chunk quando o limite por chunk é pequeno
+    monkeypatch.setattr(app, 'provider_chunk_limit', lambda provider: 10)
+    text = '\n\n'.join(f'chunk-{i}' for i in range(5))
+    app.generate_audio_google(text, VOICE, str(tmp_path / 'book.mp3'))
+
+    assert written_markers(tmp_path / 'book.mp3') == [i for i in range(5) for _ in range(FRAMES_PER_CHUNK)]
+
+
+def test_cancelled_job_stops_retrying(google, tmp_path):
+    google.transient_failures = {0: 99}
+
+    def should_stop():
+        # Cancelado depois da primeira falha do chunk 0
+        return google.requests.get(0, 0) >= 1
+
+    with pytest.raises(app.JobCancelled):
+        app.synthesize_chunks_google(chunk_texts(1), VOICE, should_stop=should_stop)
+    assert google.requests[0] == 1
@@ -0,0 +1,152 @@
+"""
+FairScheduler: limite de workers, ordem justa entre usuários, envelhecimento e remoção da fila
+"""
+
+import time
+import threading
+
+import pytest
+
+from job_scheduler import FairScheduler
+
+
+class Recorder:
+    """Handler que registra a ordem de execução; o job 'gate' segura o worker até gate.set()"""
+
+    def __init__(self, duration=0.0):
+        self.duration = duration
+        self.order = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+        self.gate = threading.Event()
+        self.done = threading.Semaphore(0)
+
+    def __call__(self, job_id, *args):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            if job_id == 'gate':
+                self.gate.wait(5)
+            else:
+                time.sleep(self.duration)
+                with self.lock:
+                    self.order.append(job_id)
+            if job_id.startswith('fail'):
+                raise RuntimeError('falhou')
+        finally:
+            with self.lock:
+                self.running -= 1
+            self.done.release()
+
+    def wait(self, count):
+        for _ in range(count):
+            assert self.done.acquire(timeout=5)
+
+
+def blocked_scheduler(recorder, workers=1, aging_rate=0.0):
+    """Agendador com o(s) worker(s) ocupado(s) pelo 'gate': os próximos jobs ficam na fila"""
+    scheduler = FairScheduler(workers, recorder, estimate_seconds=lambda cost: cost / 100, aging_rate=aging_rate)
+    scheduler.submit('gate', 'admin', 1)
+    while scheduler.stats()['running'] < 1:
+        time.sleep(0.01)
+    return scheduler
+
+
+def test_never_runs_more_than_the_pool_size():
+    recorder = Recorder(duration=0.05)
+    scheduler = FairScheduler(2, recorder, estimate_seconds=lambda cost: 1)
+    for i in range(6):
+        scheduler.submit(f'job{i}', f'user{i}', 100)
+    recorder.wait(6)
+
+    assert sorted(recorder.order) == [f'job{i}' for i in range(6)]
+    assert recorder.max_running == 2
+
+
+def test_users_take_turns():
+    recorder = Recorder()
+    scheduler = blocked_scheduler(recorder)
+    for i in range(3):
+        scheduler.submit(f'ana{i}', 'ana', 100)
+    scheduler.submit('bia0', 'bia', 100)
+    recorder.gate.set()
+    recorder.wait(5)
+
+    # Bia chegou por último, mas não espera a fila inteira da Ana
+    assert recorder.order == ['ana0', 'bia0', 'ana1', 'ana2']
+
+
+def test_short_texts_go_before_huge_ones():
+    recorder = Recorder()
+    scheduler = blocked_scheduler(recorder)
+    scheduler.submit('book', 'ana', 1_000_000)
+    scheduler.submit('note', 'bia', 10)
+    recorder.gate.set()
+    recorder.wait(3)
+
+    assert recorder.order == ['note', 'book']
+
+
+def test_aging_lets_old_jobs_through():
+    recorder = Recorder()
+    scheduler = blocked_scheduler(recorder, aging_rate=1e9)
+    scheduler.submit('book', 'ana', 1_000_000)
+    time.sleep(0.05)
+    scheduler.submit('note', 'bia', 10)
+    recorder.gate.set()
+    recorder.wait(3)
+
+    # 50 ms na fila valem mais que a diferença de custo com esse aging_rate
+    assert recorder.order == ['book', 'note']
+
+
+def test_removed_jobs_never_run():
+    recorder = Recorder()
+    scheduler = blocked_scheduler(recorder)
+    scheduler.submit('keep', 'ana', 10)
+    scheduler.submit('drop', 'bia', 10)
+    assert scheduler.remove('drop')
+    assert not scheduler.remove('drop')
+    assert not scheduler.remove('unknown')
+    recorder.gate.set()
+    recorder.wait(2)
+    time.sleep(0.05)
+
+    assert recorder.order == ['keep']
+
+
+def test_snapshot_reports_positions_and_estimated_starts():
+    recorder = Recorder()
+    published = []
+    scheduler = FairScheduler(1, recorder, estimate_seconds=lambda cost: cost / 100,
+                              on_queue_change=published.append, aging_rate=0.0)
+    scheduler.submit('gate', 'admin', 1)
+    while scheduler.stats()['running'] < 1:
+        time.sleep(0.01)
+    scheduler.submit('first', 'ana', 100)
+    scheduler.submit('second', 'bia', 300)
+
+    snapshot = scheduler.snapshot()
+    assert [(job_id, position) for job_id, position, _ in snapshot] == [('first', 1), ('second', 2)]
+    # O segundo começa quando o primeiro terminar (estimativa de 1 s para 100 caracteres)
+    assert snapshot[1][2] - snapshot[0][2] == pytest.approx(1.0, abs=0.01)
+    # A cada mudança na fila, o snapshot é publicado (o app grava as posições no JobStore)
+    assert [(job_id, position) for job_id, position, _ in published[-1]] == [('first', 1), ('second', 2)]
+    recorder.gate.set()
+    recorder.wait(3)
+
+
+def test_a_failing_job_does_not_kill_the_worker():
+    recorder = Recorder()
+    scheduler = FairScheduler(1, recorder, estimate_seconds=lambda cost: 1)
+    scheduler.submit('fail0', 'ana', 10)
+    scheduler.submit('ok', 'ana', 10)
+    recorder.wait(2)
+
+    assert recorder.order == ['fail0', 'ok']
+    deadline = time.time() + 5
+    while scheduler.stats()['running'] and time.time() < deadline:
+        time.sleep(0.01)
+    assert scheduler.stats() == {'workers': 1, 'running': 0, 'queued': 0}
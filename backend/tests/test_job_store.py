@@ -0,0 +1,155 @@
+"""
+JobStore: compare-and-set de status, adoção de órfãos, migração de colunas e expiração
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+import pytest
+
+from db import Database
+from job_store import JobStore, current_worker_id, MIGRATED_COLUMNS
+
+
+@pytest.fixture
+def store(tmp_db):
+    return JobStore(tmp_db, retention_seconds=60)
+
+
+def test_create_and_get(store):
+    job = store.create('j1', voice='pt-BR-AntonioNeural', char_count=10, owner='ana@x')
+    assert job['status'] == 'pending'
+    assert job['progress'] == 0
+    assert store.get('j1')['owner'] == 'ana@x'
+    assert store.get('missing') is None
+
+
+def test_update_with_expected_status_is_compare_and_set(store):
+    store.create('j1')
+    assert store.update('j1', only_if_status='pending', status='processing')
+    # O status já mudou: a segunda escrita condicional não acontece
+    assert not store.update('j1', only_if_status='pending', status='cancelled')
+    assert store.get('j1')['status'] == 'processing'
+    assert store.update('j1', only_if_status=('pending', 'processing'), status='cancelled')
+    assert store.get('j1')['status'] == 'cancelled'
+
+
+def test_only_one_concurrent_claim_wins(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    JobStore(Database(path)).create('j1')
+    results = []
+    barrier = threading.Barrier(8)
+
+    def claim():
+        # Cada thread com a própria conexão, como workers diferentes
+        store = JobStore(Database(path))
+        barrier.wait()
+        results.append(store.claim('j1'))
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 1
+
+
+def test_on_change_is_called_after_writes(tmp_db):
+    changed = []
+    store = JobStore(tmp_db, on_change=changed.append)
+    store.create('j1')
+    store.update('j1', progress=50)
+    store.update('j1', only_if_status='done', progress=60)
+    assert changed == ['j1', 'j1']
+
+
+def test_adopt_only_from_the_previous_worker(store):
+    store.create('j1', status='processing', worker='dead-host:1')
+    assert not store.adopt('j1', 'other-host:2')
+    assert store.adopt('j1', 'dead-host:1')
+    job = store.get('j1')
+    assert (job['status'], job['worker']) == ('pending', current_worker_id())
+    # Já adotado: outra tentativa com o dono antigo falha
+    assert not store.adopt('j1', 'dead-host:1')
+
+
+def test_orphaned_jobs_are_those_without_a_live_worker(store):
+    store.heartbeat(stale_after=30)
+    store.create('mine', status='processing', worker=current_worker_id())
+    store.create('orphan', status='processing', worker='dead-host:1')
+    store.create('finished', status='done', worker='dead-host:1')
+    assert [job['id'] for job in store.orphaned_jobs(stale_after=30)] == ['orphan']
+
+
+def test_job_of_a_stale_worker_is_requeued(store):
+    # Processo anterior (mesmo hostname e pid depois de um restart) parou de mandar batimentos
+    dead_worker = current_worker_id().rsplit(':', 1)[0] + ':0123456789ab'
+    with store.connect() as conn:
+        conn.execute('INSERT INTO job_workers (id, heartbeat_at) VALUES (?, ?)', (dead_worker, time.time() - 120))
+    store.create('j1', status='processing', worker=dead_worker, started_at=time.time() - 60)
+    store.heartbeat(stale_after=30)
+
+    assert [job['id'] for job in store.orphaned_jobs(stale_after=30)] == ['j1']
+    assert store.adopt('j1', dead_worker)
+    assert store.get('j1')['status'] == 'pending'
+    assert store.orphaned_jobs(stale_after=30) == []
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='sem fork')
+def test_forked_process_gets_its_own_worker_id():
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_fd, current_worker_id().encode())
+        os._exit(0)
+    os.close(write_fd)
+    child_id = os.read(read_fd, 200).decode()
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+
+    assert child_id and child_id != current_worker_id()
+    assert child_id.split(':')[1] == str(pid)
+
+
+def test_expiration_counts_from_the_finish(store):
+    store.create('j1')
+    assert store.get('j1')['expires_at'] is None
+    finished_at = time.time()
+    store.update('j1', status='done', finished_at=finished_at)
+    assert store.get('j1')['expires_at'] == pytest.approx(finished_at + 60)
+
+
+def test_pop_expired_never_removes_active_jobs(store):
+    long_ago = time.time() - 3600
+    store.create('queued', expires_at=long_ago)
+    store.create('running', status='processing', expires_at=long_ago)
+    store.create('done', status='done', finished_at=long_ago)
+    store.create('failed', status='error', finished_at=long_ago)
+    store.create('fresh', status='done', finished_at=time.time())
+
+    assert sorted(job['id'] for job in store.pop_expired()) == ['done', 'failed']
+    assert sorted(row['id'] for row in store.connect().execute('SELECT id FROM generation_jobs')) == [
+        'fresh', 'queued', 'running'
+    ]
+
+
+def test_missing_columns_are_migrated(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE generation_jobs (
+            id TEXT PRIMARY KEY, status TEXT NOT NULL DEFAULT 'pending',
+            progress INTEGER NOT NULL DEFAULT 0, file_path TEXT, error TEXT,
+            cached INTEGER NOT NULL DEFAULT 0, voice TEXT, char_count INTEGER DEFAULT 0,
+            document_id TEXT, worker TEXT, created_at REAL NOT NULL, started_at REAL,
+            finished_at REAL, updated_at REAL NOT NULL, expires_at REAL
+        )
+    ''')
+    conn.close()
+
+    store = JobStore(Database(path))
+    columns = {row[1] for row in store.connect().execute('PRAGMA table_info(generation_jobs)')}
+    assert set(MIGRATED_COLUMNS) <= columns
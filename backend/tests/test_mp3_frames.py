@@ -0,0 +1,165 @@
+"""
+mp3_frames: leitura de cabeçalhos, concatenação com frame Xing/Info, TOC e reordenação de chunks
+"""
+
+import struct
+import random
+
+import pytest
+
+from mp3_frames import (
+    Mp3ConcatWriter, OrderedChunkWriter, parse_header, iter_frames, id3v2_size, probe_mp3,
+    TOC_MAX_SAMPLES
+)
+from conftest import mp3_frames, FRAME_HEADER, FRAME_LENGTH, FRAME_SECONDS
+
+# Frame MPEG-1 Layer III, 128 kbps, 44,1 kHz (sem padding): 417 bytes
+MPEG1_HEADER = bytes([0xFF, 0xFB, 0x90, 0x64])
+
+
+def id3v2_tag(payload_size: int) -> bytes:
+    size = bytes((payload_size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b'ID3\x04\x00\x00' + size + bytes(payload_size)
+
+
+def id3v1_tag() -> bytes:
+    return b'TAG' + bytes(125)
+
+
+def read_xing(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    header = parse_header(data)
+    xing_at = 4 + header.side_info_size
+    tag = data[xing_at:xing_at + 4]
+    flags, frames, total_bytes = struct.unpack_from('>III', data, xing_at + 4)
+    toc = data[xing_at + 16:xing_at + 116]
+    return data, tag, frames, total_bytes, toc
+
+
+def test_parse_header():
+    header = parse_header(FRAME_HEADER)
+    assert (header.bitrate, header.sample_rate, header.length) == (48000, 24000, FRAME_LENGTH)
+    assert header.duration == pytest.approx(FRAME_SECONDS)
+
+    header = parse_header(MPEG1_HEADER)
+    assert (header.bitrate, header.sample_rate, header.length, header.samples) == (128000, 44100, 417, 1152)
+
+    assert parse_header(b'\xff\xf0\x00\x00') is None          # versão reservada
+    assert parse_header(b'\xff\xf3\xf4\xc0') is None          # bitrate inválido
+    assert parse_header(b'ID3\x04') is None
+
+
+def test_iter_frames_resyncs_over_garbage():
+    data = b'lixo' + mp3_frames(3) + b'\xff\xf3 quebrado' + mp3_frames(2)
+    offsets = [offset for offset, _ in iter_frames(data)]
+    assert len(offsets) == 5
+    assert offsets[0] == 4
+
+
+def test_id3v2_size():
+    assert id3v2_size(id3v2_tag(100) + mp3_frames(1)) == 110
+    assert id3v2_size(mp3_frames(1)) == 0
+
+
+def test_concat_strips_tags_and_writes_info_frame(tmp_path):
+    path = tmp_path / 'book.mp3'
+    with Mp3ConcatWriter(str(path)) as writer:
+        writer.append(id3v2_tag(50) + mp3_frames(10) + id3v1_tag())
+        writer.append(mp3_frames(5))
+
+    data, tag, frames, total_bytes, _ = read_xing(path)
+    assert tag == b'Info'                       # bitrate constante
+    assert frames == 15
+    assert total_bytes == len(data) == writer.stats()['bytes']
+    assert b'TAG' not in data and b'ID3' not in data
+    assert writer.stats()['duration_seconds'] == pytest.approx(15 * FRAME_SECONDS, abs=0.001)
+
+
+def test_concat_drops_info_frames_from_chunks(tmp_path):
+    first, second = tmp_path / 'a.mp3', tmp_path / 'b.mp3'
+    with Mp3ConcatWriter(str(first)) as writer:
+        writer.append(mp3_frames(4))
+    # Um chunk que já vem com o próprio frame Info (como os MP3 do provedor)
+    with Mp3ConcatWriter(str(second)) as writer:
+        writer.append(first.read_bytes())
+        writer.append(first.read_bytes())
+
+    assert read_xing(second)[2] == 8
+
+
+def test_vbr_gets_a_xing_frame(tmp_path):
+    path = tmp_path / 'vbr.mp3'
+    with Mp3ConcatWriter(str(path)) as writer:
+        writer.append(mp3_frames(3))
+        writer.append(MPEG1_HEADER + bytes(413))
+    assert read_xing(path)[1] == b'Xing'
+
+
+def test_probe_matches_writer_and_mutagen(tmp_path):
+    mutagen_mp3 = pytest.importorskip('mutagen.mp3')
+    path = tmp_path / 'book.mp3'
+    with Mp3ConcatWriter(str(path)) as writer:
+        for _ in range(20):
+            writer.append(mp3_frames(50))
+
+    info = probe_mp3(str(path))
+    assert info['frames'] == 1000
+    assert info['duration_seconds'] == pytest.approx(1000 * FRAME_SECONDS, abs=0.001)
+    assert info['bitrate'] == 48000
+    assert mutagen_mp3.MP3(str(path)).info.length == pytest.approx(info['duration_seconds'], abs=0.05)
+
+
+def test_probe_of_a_non_mp3(tmp_path):
+    path = tmp_path / 'text.mp3'
+    path.write_bytes(b'isto nao e audio' * 100)
+    assert probe_mp3(str(path))['frames'] == 0
+
+
+def vbr_frames(count: int) -> bytes:
+    """Frames MPEG-2 Layer III com bitrates sorteados (32, 48 ou 64 kbps)"""
+    frames = []
+    for _ in range(count):
+        header = bytes([0xFF, 0xF3, random.choice([0x44, 0x64, 0x84]), 0xC0])
+        frames.append(header + bytes(parse_header(header).length - 4))
+    return b''.join(frames)
+
+
+def test_toc_is_monotonic_and_memory_bounded(tmp_path):
+    random.seed(7)
+    path = tmp_path / 'long.mp3'
+    with Mp3ConcatWriter(str(path)) as writer:
+        # 100 mil frames (40 min): a posição no arquivo não é proporcional ao tempo
+        for _ in range(200):
+            writer.append(vbr_frames(500))
+        assert len(writer.toc_times) <= TOC_MAX_SAMPLES
+
+    _, tag, frames, total_bytes, toc = read_xing(path)
+    assert (tag, frames) == (b'Xing', 100_000)
+    assert toc[0] == 0
+    assert list(toc) == sorted(toc)
+    assert toc[-1] > 240
+
+
+def test_abort_removes_the_partial_file(tmp_path):
+    path = tmp_path / 'partial.mp3'
+    with pytest.raises(RuntimeError):
+        with Mp3ConcatWriter(str(path)) as writer:
+            writer.append(mp3_frames(3))
+            raise RuntimeError('falhou no meio')
+    assert not path.exists()
+
+
+def test_ordered_writer_releases_chunks_in_order(tmp_path):
+    path = tmp_path / 'ordered.mp3'
+    with Mp3ConcatWriter(str(path)) as writer:
+        ordered = OrderedChunkWriter(writer)
+        ordered.add(2, mp3_frames(1, marker=2))
+        ordered.add(1, mp3_frames(1, marker=1))
+        assert writer.frames == 0 and len(ordered.pending) == 2
+        ordered.add(0, mp3_frames(1, marker=0))
+        assert writer.frames == 3 and not ordered.pending
+        ordered.add(3, mp3_frames(1, marker=3))
+
+    data = path.read_bytes()
+    assert [data[offset + 4] for offset, _ in list(iter_frames(data))[1:]] == [0, 1, 2, 3]
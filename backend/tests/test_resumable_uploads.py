@@ -0,0 +1,140 @@
+"""
+UploadSessionStore: partes em ordem, checksums por parte e do arquivo, retomada e expiração
+"""
+
+import io
+import os
+import hashlib
+
+import pytest
+
+from resumable_uploads import UploadSessionStore, UploadError
+
+CHUNK_SIZE = 1000
+DATA = os.urandom(2500)          # 3 partes: 1000, 1000 e 500 bytes
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def part(index: int) -> bytes:
+    return DATA[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadSessionStore(str(tmp_path / 'sessions'), chunk_size=CHUNK_SIZE, max_bytes=10_000, ttl_seconds=60)
+
+
+@pytest.fixture
+def upload_id(store):
+    return store.create('../capítulo 1.mp3', len(DATA), sha256(DATA))['upload_id']
+
+
+def send(store, upload_id, index, data=None, length=None, checksum=None):
+    data = part(index) if data is None else data
+    return store.write_chunk(upload_id, index, io.BytesIO(data),
+                             len(data) if length is None else length, checksum or sha256(data))
+
+
+def status_of(call, *args, **kwargs):
+    with pytest.raises(UploadError) as error:
+        call(*args, **kwargs)
+    return error.value.status
+
+
+def test_create_validates_the_request(store):
+    assert status_of(store.create, 'a.mp3', 10_001) == 413
+    assert status_of(store.create, 'a.mp3', 10, 'nao-e-hash') == 400
+    assert status_of(store.create, '', 10) == 400
+    assert status_of(store.create, 'a.mp3', -1) == 400
+    # Só o nome do arquivo é guardado, sem diretórios
+    assert store.create('../x/a.mp3', 10)['filename'] == 'a.mp3'
+
+
+def test_full_upload_is_moved_to_the_destination(store, upload_id, tmp_path):
+    for index in range(3):
+        session = send(store, upload_id, index)
+    assert session['offset'] == len(DATA)
+
+    dest_dir = tmp_path / 'dest'
+    dest_dir.mkdir()
+    path = store.complete(upload_id, str(dest_dir))
+    assert os.path.dirname(path) == str(dest_dir)
+    assert path.endswith('_capítulo 1.mp3')
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    assert status_of(store.get, upload_id) == 404
+
+
+def test_describe_tells_where_to_resume(store, upload_id):
+    send(store, upload_id, 0)
+    described = store.describe(store.get(upload_id))
+    assert (described['offset'], described['next_chunk'], described['chunks_total']) == (1000, 1, 3)
+
+
+def test_out_of_order_chunk_is_rejected(store, upload_id):
+    assert status_of(send, store, upload_id, 1) == 409
+    assert status_of(send, store, upload_id, 3) == 416
+    assert store.get(upload_id)['offset'] == 0
+
+
+def test_repeated_chunk_is_accepted_only_with_the_same_content(store, upload_id):
+    send(store, upload_id, 0)
+    send(store, upload_id, 1)
+    # A resposta se perdeu e o cliente reenvia: sem efeito
+    assert send(store, upload_id, 0)['offset'] == 2000
+    assert status_of(send, store, upload_id, 0, data=bytes(CHUNK_SIZE)) == 409
+
+
+def test_wrong_length_and_missing_checksum(store, upload_id):
+    assert status_of(send, store, upload_id, 0, data=part(0)[:999]) == 400
+    assert status_of(store.write_chunk, upload_id, 0, io.BytesIO(part(0)), CHUNK_SIZE, None) == 400
+    assert status_of(store.write_chunk, upload_id, 0, io.BytesIO(part(0)), CHUNK_SIZE, 'abc') == 400
+
+
+def test_corrupted_or_truncated_chunk_is_discarded(store, upload_id):
+    send(store, upload_id, 0)
+    assert status_of(send, store, upload_id, 1, checksum=sha256(b'outra coisa')) == 400
+    # Corpo menor que o Content-Length (conexão caiu no meio)
+    assert status_of(send, store, upload_id, 1, data=part(1)[:400], length=CHUNK_SIZE) == 400
+
+    assert store.get(upload_id)['offset'] == 1000
+    assert os.path.getsize(os.path.join(store.root, upload_id, 'data.part')) == 1000
+    # A retomada funciona normalmente depois das falhas
+    send(store, upload_id, 1)
+    send(store, upload_id, 2)
+    assert store.get(upload_id)['offset'] == len(DATA)
+
+
+def test_complete_checks_size_and_hash(store, tmp_path):
+    incomplete = store.create('a.mp3', len(DATA))['upload_id']
+    send(store, incomplete, 0)
+    assert status_of(store.complete, incomplete, str(tmp_path)) == 409
+
+    wrong_hash = store.create('b.mp3', len(DATA), sha256(b'outro arquivo'))['upload_id']
+    for index in range(3):
+        send(store, wrong_hash, index)
+    assert status_of(store.complete, wrong_hash, str(tmp_path)) == 400
+    assert store.get(wrong_hash)['offset'] == len(DATA)
+
+
+def test_abort_and_unknown_sessions(store, upload_id):
+    store.abort(upload_id)
+    assert not os.path.exists(os.path.join(store.root, upload_id))
+    assert status_of(store.get, upload_id) == 404
+    assert status_of(send, store, upload_id, 0) == 404
+    # Ids fora do formato nunca viram caminho no disco
+    assert status_of(store.get, '../../etc') == 404
+
+
+def test_purge_removes_only_abandoned_sessions(store):
+    old = store.create('a.mp3', 10)
+    new = store.create('b.mp3', 10)
+    now = old['updated_at'] + 61
+    new['updated_at'] = now
+    store._save(new)
+
+    assert store.purge_expired(now) == [old['upload_id']]
+    assert os.listdir(store.root) == [new['upload_id']]
@@ -0,0 +1,106 @@
+"""
+Limpeza e reconstrução de parágrafos do texto extraído de documentos
+O estado (parágrafo em aberto) é mantido entre chamadas, então o texto pode chegar
+em pedaços (ex: página a página de um PDF) com o mesmo resultado de uma vez só.
+"""
+
+import re
+
+# Versão das regras de limpeza: entra na chave do cache de extração (mudou a regra, muda a versão)
+TEXT_CLEANUP_VERSION = 2
+
+# Pontuação que fecha um parágrafo
+PARAGRAPH_END = ('.', '!', '?', ':', ';')
+
+# Linha que é só um título: "Capítulo 1", "CAPÍTULO XII - O Retorno", "Chapter One", "Prólogo"...
+CHAPTER_NUMBER_WORDS = (
+    r'(?:um|uma|dois|duas|tr[êe]s|quatro|cinco|seis|sete|oito|nove|dez|onze|doze|treze|'
+    r'quatorze|catorze|quinze|dezesseis|dezessete|dezoito|dezenove|vinte|primeiro|segundo|terceiro|'
+    r'one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|'
+    r'sixteen|seventeen|eighteen|nineteen|twenty)'
+)
+CHAPTER_HEADING_RE = re.compile(
+    r'^[ \t]*(?:'
+    r'(?:cap[íi]tulo|chapter|parte|part|livro|book)[ \t]+(?:\d+|(?-i:[IVXLCDM]+)\b|' + CHAPTER_NUMBER_WORDS + r'\b)'
+    r'(?:[ \t]*[-–—:.][^\n]{0,80})?'
+    r'|pr[óo]logo|ep[íi]logo|prologue|epilogue|introdu[çc][ãa]o|introduction'
+    r')[ \t]*$',
+    re.IGNORECASE | re.MULTILINE
+)
+# Nenhum título passa disso: linhas maiores nem chegam a ser testadas com o regex
+HEADING_MAX_CHARS = 120
+
+
+class LineJoiner:
+    r"""
+    Junta as linhas quebradas pelo PDF em parágrafos, numa única passada:
+    - linhas vazias são ignoradas e espaços repetidos viram um só
+    - linha terminada em . ! ? : ; fecha o parágrafo
+    - linha terminada em hífen é emendada sem espaço ("exem-" + "plo")
+    - linha que é um título de capítulo (CHAPTER_HEADING_RE) vira um parágrafo próprio, para
+      não ser emendada na frase seguinte ("Capítulo 1" + "Era uma vez...")
+    - caso contrário, a frase continua na próxima linha
+    O parágrafo em aberto é uma lista de pedaços (juntada uma vez ao fechar),
+    em vez de concatenar strings a cada linha.
+
+    Espaços: ' '.join(line.split()) em vez de um re.compile(r'\s+') pré-compilado. O resultado é
+    o mesmo (str.split() e \s usam a mesma definição Unicode de espaço, e o split já faz o strip),
+    mas o split/join roda em C sem a máquina de regex: ~4x mais rápido nessa etapa
+    (ver a variante "regex compilada" do bench_text_cleanup.py).
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def feed(self, text: str) -> list:
+        """Processa mais texto e retorna os parágrafos que ficaram completos"""
+        completed = []
+        parts = self.parts
+
+        for line in text.replace('\r', '').split('\n'):
+            # strip + colapso de espaços (str.split sem argumento usa os mesmos brancos que \s)
+            words = line.split()
+            if not words:
+                continue
+            line = ' '.join(words)
+
+            if len(line) <= HEADING_MAX_CHARS and CHAPTER_HEADING_RE.match(line):
+                if parts:
+                    completed.append(''.join(parts))
+                completed.append(line)
+                parts = []
+                continue
+
+            if not parts:
+                parts.append(line)
+                continue
+
+            # O último pedaço é sempre uma linha (não vazia): o fim dele é o fim do parágrafo
+            last = parts[-1]
+            if last.endswith(PARAGRAPH_END):
+                completed.append(''.join(parts))
+                parts = [line]
+            elif last.endswith('-'):
+                # Trata hifenização: "exem- plo" -> "exemplo"
+                parts[-1] = last[:-1]
+                parts.append(line)
+            else:
+                # Junta com espaço
+                parts.append(' ')
+                parts.append(line)
+
+        self.parts = parts
+        return completed
+
+    def close(self) -> list:
+        """Retorna o último parágrafo em aberto"""
+        parts, self.parts = self.parts, []
+        return [''.join(parts)] if parts else []
+
+
+def clean_extracted_text(text: str) -> str:
+    """Limpa o texto inteiro; parágrafos separados por uma única quebra de linha"""
+    joiner = LineJoiner()
+    cleaned_lines = joiner.feed(text) + joiner.close()
+    # Reconstrói o texto com espaçamento simples (resolve o "pula uma linha")
+    return "\n".join(cleaned_lines)
@@ -108,7 +108,7 @@ function SortableBook({ book, startEdit, handleDelete, setManagingTracks }) {
                     overflow: 'hidden'
                 }}>
                     {book.cover_url ? (
-                        <img src={book.cover_url} alt="" style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
+                        <img src={book.cover_urls?.thumb || book.cover_url} alt="" style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
                     ) : (
                         <div style={{ width: '100%', height: '100%', display: 'flex', alignItems: 'center', justifyContent: 'center' }}>
                             <FileAudio size={40} color="rgba(255,255,255,0.1)" />
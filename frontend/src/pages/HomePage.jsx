@@ -31,6 +31,9 @@ import {
     CircleNotch
 } from "@phosphor-icons/react"
 
+// Audiobooks por página na home (o resto vem pelo "Carregar mais", com o next_cursor da API)
+const AUDIOBOOKS_PAGE_SIZE = 24
+
 export default function HomePage({ user, isAdmin }) {
     const [text, setText] = useState("")
     const [voice, setVoice] = useState("pt-BR-AntonioNeural")
@@ -276,6 +279,9 @@ export default function HomePage({ user, isAdmin }) {
 
     const [audiobooks, setAudiobooks] = useState([])
     const [loadingBooks, setLoadingBooks] = useState(true)
+    // Paginação por cursor: a home carrega uma página por vez em vez do catálogo inteiro
+    const [nextCursor, setNextCursor] = useState(null)
+    const [loadingMoreBooks, setLoadingMoreBooks] = useState(false)
     const fileInputRef = useRef(null)
 
     const loadCategories = async () => {
@@ -288,15 +294,21 @@ export default function HomePage({ user, isAdmin }) {
         }
     }
 
-    const loadAudiobooks = async () => {
+    const loadAudiobooks = async (cursor = null) => {
+        const params = new URLSearchParams({ limit: AUDIOBOOKS_PAGE_SIZE })
+        if (cursor) params.set('cursor', cursor)
+        if (cursor) setLoadingMoreBooks(true)
         try {
-            const res = await fetch(`${API_URL}/api/audiobooks`)
+            const res = await fetch(`${API_URL}/api/audiobooks?${params}`)
             const data = await res.json()
-            setAudiobooks(data.audiobooks || [])
+            const page = data.audiobooks || []
+            setAudiobooks(prev => cursor ? [...prev, ...page] : page)
+            setNextCursor(data.next_cursor || null)
         } catch (e) {
             console.error('Erro ao carregar audiobooks:', e)
         } finally {
             setLoadingBooks(false)
+            setLoadingMoreBooks(false)
         }
     }
 
@@ -305,6 +317,16 @@ export default function HomePage({ user, isAdmin }) {
         loadCategories()
     }, [])
 
+    // O seletor de projeto da publicação precisa de todos os projetos, não só das páginas já carregadas
+    const [publishProjects, setPublishProjects] = useState([])
+    useEffect(() => {
+        if (!isPublishModalOpen) return
+        fetch(`${API_URL}/api/audiobooks`)
+            .then(res => res.json())
+            .then(data => setPublishProjects(data.audiobooks || []))
+            .catch(e => console.error('Erro ao carregar projetos:', e))
+    }, [isPublishModalOpen])
+
     const handleFileUpload = async (e) => {
         const file = e.target.files?.[0]
         if (!file) return
@@ -351,7 +373,7 @@ export default function HomePage({ user, isAdmin }) {
             const initialEstimation = Math.max(5, text.length * 0.01)
             setTimeLeft(initialEstimation)
 
-            // 2. Polling de Status
+            // 2. Acompanhamento do status
             const startTime = Date.now()
             let estimatedTotalSeconds = initialEstimation
 
@@ -372,48 +394,81 @@ export default function HomePage({ user, isAdmin }) {
                 })
             }, 10)
 
-            const pollInterval = setInterval(async () => {
-                try {
-                    const statusRes = await fetch(`${API_URL.replace(/\/$/, '')}/api/generate/status/${job_id}`)
+            const baseUrl = API_URL.replace(/\/$/, '')
+            let finished = false
+            let pollInterval = null
+            let events = null
 
-                    if (statusRes.status === 404) {
-                        clearInterval(pollInterval)
-                        clearInterval(visualTimer)
-                        setIsLoading(false)
-                        return
-                    }
+            const stopTracking = () => {
+                finished = true
+                if (events) events.close()
+                if (pollInterval) clearInterval(pollInterval)
+                clearInterval(visualTimer)
+            }
 
-                    const statusData = await statusRes.json()
-                    const backendProgress = statusData.progress || 0
-
-                    if (statusData.status === 'done') {
-                        clearInterval(pollInterval)
-                        clearInterval(visualTimer)
-                        setGenerationProgress(100)
-                        setTimeLeft(0)
-
-                        const downloadUrl = `${API_URL.replace(/\/$/, '')}/api/generate/download/${job_id}`
-                        const audioBlob = await fetch(downloadUrl).then(r => r.blob())
-                        const url = URL.createObjectURL(audioBlob)
-                        setAudioUrl(url)
-                        setIsLoading(false)
-                    } else if (statusData.status === 'error') {
-                        clearInterval(pollInterval)
-                        clearInterval(visualTimer)
-                        setIsLoading(false)
-                        showToast.error(`Erro na geração: ${statusData.error}`)
-                    } else if (backendProgress > 5) {
-                        // RECALCULA A ESTIMATIVA REAL BASEADA NA VELOCIDADE DO BACKEND
-                        const elapsedMs = Date.now() - startTime
-                        const currentEstimatedTotalMs = (elapsedMs / backendProgress) * 100
-
-                        // Atualiza a variável que o visualTimer usa para calcular os frames
-                        estimatedTotalSeconds = currentEstimatedTotalMs / 1000
+            const handleStatus = async (statusData) => {
+                if (finished) return
+                const backendProgress = statusData.progress || 0
+
+                if (statusData.status === 'done') {
+                    stopTracking()
+                    setGenerationProgress(100)
+                    setTimeLeft(0)
+
+                    const downloadUrl = `${baseUrl}/api/generate/download/${job_id}`
+                    const audioBlob = await fetch(downloadUrl).then(r => r.blob())
+                    const url = URL.createObjectURL(audioBlob)
+                    setAudioUrl(url)
+                    setIsLoading(false)
+                } else if (statusData.status === 'error' || statusData.status === 'cancelled') {
+                    stopTracking()
+                    setIsLoading(false)
+                    showToast.error(`Erro na geração: ${statusData.error || statusData.status}`)
+                } else if (backendProgress > 5) {
+                    // RECALCULA A ESTIMATIVA REAL BASEADA NA VELOCIDADE DO BACKEND
+                    const elapsedMs = Date.now() - startTime
+                    const currentEstimatedTotalMs = (elapsedMs / backendProgress) * 100
+
+                    // Atualiza a variável que o visualTimer usa para calcular os frames
+                    estimatedTotalSeconds = currentEstimatedTotalMs / 1000
+                }
+            }
+
+            // Fallback: polling do status (navegadores sem EventSource ou stream interrompido)
+            const startPolling = () => {
+                if (finished || pollInterval) return
+                pollInterval = setInterval(async () => {
+                    try {
+                        const statusRes = await fetch(`${baseUrl}/api/generate/status/${job_id}`)
+
+                        if (statusRes.status === 404) {
+                            stopTracking()
+                            setIsLoading(false)
+                            return
+                        }
+
+                        await handleStatus(await statusRes.json())
+                    } catch (e) {
+                        console.error("Erro no polling:", e)
                     }
-                } catch (e) {
-                    console.error("Erro no polling:", e)
+                }, 3000)
+            }
+
+            // 3. Eventos enviados pelo servidor (SSE) em vez de polling
+            if (typeof EventSource !== 'undefined') {
+                events = new EventSource(`${baseUrl}/api/generate/events/${job_id}`)
+                const onEvent = (e) => handleStatus(JSON.parse(e.data))
+                events.addEventListener('progress', onEvent)
+                events.addEventListener('ready', onEvent)
+                events.addEventListener('failed', onEvent)
+                events.addEventListener('cancelled', onEvent)
+                events.onerror = () => {
+                    // O EventSource reconecta sozinho; se o servidor fechou de vez, cai para o polling
+                    if (!finished && events.readyState === EventSource.CLOSED) startPolling()
                 }
-            }, 3000)
+            } else {
+                startPolling()
+            }
 
         } catch (e) {
             setIsLoading(false)
@@ -816,7 +871,7 @@ export default function HomePage({ user, isAdmin }) {
                                             <span style={{ fontSize: '12px', fontWeight: '600', color: !selectedProjectId ? '#FCFBF8' : '#666' }}>Novo Projeto</span>
                                         </motion.div>
 
-                                        {audiobooks.map(proj => (
+                                        {publishProjects.map(proj => (
                                             <motion.div
                                                 key={proj.id}
                                                 whileHover={{ scale: 1.02 }}
@@ -828,7 +883,7 @@ export default function HomePage({ user, isAdmin }) {
                                                     cursor: 'pointer', textAlign: 'center', display: 'flex', gap: '12px', alignItems: 'center'
                                                 }}
                                             >
-                                                {proj.cover_url && <img src={proj.cover_url} style={{ width: '40px', height: '40px', borderRadius: '8px', objectFit: 'cover' }} alt="" />}
+                                                {proj.cover_url && <img src={proj.cover_urls?.thumb || proj.cover_url} style={{ width: '40px', height: '40px', borderRadius: '8px', objectFit: 'cover' }} alt="" />}
                                                 <span style={{ fontSize: '12px', fontWeight: '600', color: selectedProjectId === proj.id ? '#FCFBF8' : '#888', textAlign: 'left', overflow: 'hidden', textOverflow: 'ellipsis', whiteSpace: 'nowrap' }}>
                                                     {proj.title}
                                                 </span>
@@ -1373,7 +1428,7 @@ export default function HomePage({ user, isAdmin }) {
                                     }}
                                 >
                                     {book.cover_url ? (
-                                        <img src={book.cover_url} alt={book.title} style={{ width: '100%', height: 'auto', display: 'block' }} />
+                                        <img src={book.cover_urls?.card || book.cover_url} alt={book.title} loading="lazy" style={{ width: '100%', height: 'auto', display: 'block' }} />
                                     ) : (
                                         <div style={{ width: '100%', height: '200px', background: 'linear-gradient(135deg, #2546C7 0%, #1a3399 100%)', display: 'flex', alignItems: 'center', justifyContent: 'center' }}>
                                             <span style={{ fontSize: '48px' }}>🎧</span>
@@ -1401,6 +1456,31 @@ export default function HomePage({ user, isAdmin }) {
                             ))}
                         </div>
                     )}
+
+                    {!loadingBooks && nextCursor && (
+                        <div style={{ display: 'flex', justifyContent: 'center', marginTop: '32px' }}>
+                            <button
+                                onClick={() => loadAudiobooks(nextCursor)}
+                                disabled={loadingMoreBooks}
+                                style={{
+                                    padding: '12px 28px',
+                                    borderRadius: '999px',
+                                    border: '1px solid rgba(255,255,255,0.15)',
+                                    background: 'rgba(255,255,255,0.04)',
+                                    color: '#FCFBF8',
+                                    fontSize: '14px',
+                                    fontWeight: '600',
+                                    cursor: loadingMoreBooks ? 'default' : 'pointer',
+                                    display: 'flex',
+                                    alignItems: 'center',
+                                    gap: '8px'
+                                }}
+                            >
+                                {loadingMoreBooks && <CircleNotch size={16} className="animate-spin" />}
+                                {loadingMoreBooks ? 'Carregando...' : 'Carregar mais'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             </div >
         </>